@@ -13,7 +13,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 # Import your app's configuration and models
 from app.core.config import settings
 from app.db.database import Base
-from app.db.models import User  # Import all your models here
+from app.db.models import User, RevokedToken, RefreshToken, OAuthState, AuditEvent  # Import all your models here
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
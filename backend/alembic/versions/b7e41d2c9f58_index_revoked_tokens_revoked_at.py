@@ -0,0 +1,29 @@
+"""Index revoked_tokens.revoked_at
+
+Revision ID: b7e41d2c9f58
+Revises: f2c6d8a41e93
+Create Date: 2026-10-18 02:53:11.603481
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e41d2c9f58'
+down_revision: Union[str, Sequence[str], None] = 'f2c6d8a41e93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Workers sync the denylist by revoked_at window instead of by id
+    op.create_index(op.f('ix_revoked_tokens_revoked_at'), 'revoked_tokens', ['revoked_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_revoked_tokens_revoked_at'), table_name='revoked_tokens')
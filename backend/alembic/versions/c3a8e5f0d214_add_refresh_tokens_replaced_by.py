@@ -0,0 +1,29 @@
+"""Add refresh_tokens.replaced_by
+
+Revision ID: c3a8e5f0d214
+Revises: b7e41d2c9f58
+Create Date: 2026-10-18 02:56:52.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a8e5f0d214'
+down_revision: Union[str, Sequence[str], None] = 'b7e41d2c9f58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Successor of a rotated token, for the concurrent-refresh grace window
+    op.add_column('refresh_tokens', sa.Column('replaced_by', sa.UUID(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('refresh_tokens', 'replaced_by')
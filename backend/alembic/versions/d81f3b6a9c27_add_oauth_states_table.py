@@ -0,0 +1,35 @@
+"""Add oauth_states table
+
+Revision ID: d81f3b6a9c27
+Revises: a4d2f81c6e05
+Create Date: 2026-10-18 14:26:07.331845
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f3b6a9c27'
+down_revision: Union[str, Sequence[str], None] = 'a4d2f81c6e05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('oauth_states',
+    sa.Column('state', sa.String(length=128), nullable=False),
+    sa.Column('data', sa.Text(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('state')
+    )
+    op.create_index(op.f('ix_oauth_states_expires_at'), 'oauth_states', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_oauth_states_expires_at'), table_name='oauth_states')
+    op.drop_table('oauth_states')
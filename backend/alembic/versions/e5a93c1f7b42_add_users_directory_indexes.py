@@ -0,0 +1,56 @@
+"""Add users directory indexes
+
+Revision ID: e5a93c1f7b42
+Revises: d81f3b6a9c27
+Create Date: 2026-10-18 19:12:45.604218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a93c1f7b42'
+down_revision: Union[str, Sequence[str], None] = 'd81f3b6a9c27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Keyset pages of GET /users seek on (sort column, id). On Postgres the sort
+# column uses the "C" collation (byte order, so a prefix filter is a single
+# index range) and the remaining UserPublic columns are INCLUDEd, so a page
+# is an index-only scan. Built CONCURRENTLY to avoid locking users.
+INDEXES = (
+    ('ix_users_email_directory', 'email', ['full_name', 'is_active']),
+    ('ix_users_full_name_directory', 'full_name', ['email', 'is_active']),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_context().dialect.name != 'postgresql':
+        for name, column, _ in INDEXES:
+            op.create_index(name, 'users', [column, 'id'], unique=False)
+        return
+    with op.get_context().autocommit_block():
+        for name, column, include in INDEXES:
+            op.create_index(
+                name,
+                'users',
+                [sa.text(f'{column} COLLATE "C"'), 'id'],
+                unique=False,
+                postgresql_include=include,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_context().dialect.name != 'postgresql':
+        for name, _, _ in INDEXES:
+            op.drop_index(name, table_name='users')
+        return
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.drop_index(name, table_name='users', postgresql_concurrently=True)
@@ -0,0 +1,68 @@
+"""Add audit_events table and users.last_login_at
+
+Revision ID: f2c6d8a41e93
+Revises: e5a93c1f7b42
+Create Date: 2026-10-18 20:41:09.117350
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6d8a41e93'
+down_revision: Union[str, Sequence[str], None] = 'e5a93c1f7b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Monthly partitions created up front; the app keeps creating the next ones
+# (app/core/audit.py). The default partition only catches stragglers.
+MONTHS_AHEAD = 2
+
+
+def _month_starts(count: int) -> list[datetime]:
+    now = datetime.now(timezone.utc)
+    year, month = now.year, now.month
+    starts = []
+    for _ in range(count + 1):
+        starts.append(datetime(year, month, 1, tzinfo=timezone.utc))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return starts
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('last_login_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_table('audit_events',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('occurred_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('event', sa.String(length=32), nullable=False),
+    sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=True),
+    sa.Column('ip', sa.String(length=45), nullable=True),
+    sa.Column('user_agent', sa.String(length=256), nullable=True),
+    sa.Column('request_id', sa.String(length=128), nullable=True),
+    sa.PrimaryKeyConstraint('id', 'occurred_at'),
+    postgresql_partition_by='RANGE (occurred_at)',
+    )
+    op.create_index('ix_audit_events_user_id_occurred_at', 'audit_events', ['user_id', 'occurred_at'], unique=False)
+    if op.get_context().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE TABLE audit_events_default PARTITION OF audit_events DEFAULT')
+    starts = _month_starts(MONTHS_AHEAD + 1)
+    for start, end in zip(starts, starts[1:]):
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS audit_events_{start:%Y_%m} PARTITION OF audit_events "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Dropping the parent drops every partition with it
+    op.drop_index('ix_audit_events_user_id_occurred_at', table_name='audit_events')
+    op.drop_table('audit_events')
+    op.drop_column('users', 'last_login_at')
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import re
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable
+
+import httpx
+
+from app.core.http import get_http_client
+
+logger = logging.getLogger(__name__)
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def cache_lifetime(headers: httpx.Headers, default: float) -> float:
+    """
+    Returns how long (seconds) a response may be cached according to its
+    Cache-Control/Age/Expires headers, or default when they say nothing.
+    """
+    cache_control = headers.get("cache-control", "").lower()
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return 0.0
+    match = _MAX_AGE.search(cache_control)
+    if match:
+        age = headers.get("age", "0")
+        return max(0.0, int(match.group(1)) - (int(age) if age.isdigit() else 0))
+    expires = headers.get("expires")
+    if expires:
+        try:
+            return max(0.0, parsedate_to_datetime(expires).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0.0
+    return default
+
+
+class OIDCMetadataCache:
+    """
+    Prefetched OpenID Connect discovery document and JWKS.
+
+    start() loads both before the app serves traffic, then a background
+    task refreshes them as their HTTP cache headers allow. A failed refresh
+    keeps serving the last good copy and retries after retry_interval.
+    """
+
+    def __init__(
+        self,
+        discovery_url: str,
+        min_refresh: float,
+        max_refresh: float,
+        default_refresh: float,
+        retry_interval: float,
+        timeout: float,
+        on_update: Callable[[dict, dict], None] | None = None,
+    ):
+        self.discovery_url = discovery_url
+        self.min_refresh = min_refresh
+        self.max_refresh = max_refresh
+        self.default_refresh = default_refresh
+        self.retry_interval = retry_interval
+        self.timeout = timeout
+        self.on_update = on_update
+        self.metadata: dict | None = None
+        self.jwks: dict | None = None
+        self.loaded_at: float | None = None
+        self.next_refresh_at: float | None = None
+        self._task: asyncio.Task | None = None
+
+    async def _fetch(self, client: httpx.AsyncClient, url: str) -> tuple[dict, float]:
+        response = await client.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json(), cache_lifetime(response.headers, self.default_refresh)
+
+    async def refresh(self) -> float:
+        """
+        Fetches discovery metadata and JWKS. Returns seconds until the next
+        refresh is due. Raises on failure, leaving the cached copy untouched.
+        """
+        client = get_http_client()
+        metadata, metadata_ttl = await self._fetch(client, self.discovery_url)
+        jwks_uri = metadata.get("jwks_uri")
+        if not jwks_uri:
+            raise ValueError('Discovery document has no "jwks_uri"')
+        jwks, jwks_ttl = await self._fetch(client, jwks_uri)
+
+        self.metadata, self.jwks = metadata, jwks
+        self.loaded_at = time.time()
+        if self.on_update:
+            self.on_update(metadata, jwks)
+        return min(max(min(metadata_ttl, jwks_ttl), self.min_refresh), self.max_refresh)
+
+    async def _refresh_loop(self, delay: float) -> None:
+        while True:
+            self.next_refresh_at = time.time() + delay
+            await asyncio.sleep(delay)
+            try:
+                delay = await self.refresh()
+            except Exception as exc:
+                logger.warning("OIDC metadata refresh failed, keeping last good copy: %s", exc)
+                delay = self.retry_interval
+
+    async def start(self) -> None:
+        """
+        Warms the cache and starts the background refresh task. A failed
+        warm-up is logged, not raised; the OAuth client then falls back to
+        fetching lazily.
+        """
+        try:
+            delay = await self.refresh()
+            logger.info("Prefetched OIDC metadata from %s", self.discovery_url)
+        except Exception as exc:
+            logger.warning("OIDC metadata warm-up failed: %s", exc)
+            delay = self.retry_interval
+        self._task = asyncio.create_task(self._refresh_loop(delay))
+
+    async def stop(self) -> None:
+        """
+        Cancels the background refresh task.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,184 @@
+import hashlib
+import logging
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from app.core.config import settings
+from app.db.database import DbSession, use_primary
+from app.db.models import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+# --- Helpers ---
+
+def _hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _new_row(user_id: uuid.UUID, family_id: uuid.UUID, row_id: uuid.UUID | None = None) -> tuple[str, RefreshToken]:
+    token = secrets.token_urlsafe(32)
+    row = RefreshToken(
+        id=row_id or uuid.uuid4(),
+        user_id=user_id,
+        family_id=family_id,
+        token_hash=_hash(token),
+        expires_at=datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    return token, row
+
+def _invalid_refresh_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+    )
+
+def _claim_statement(token_hash: str, now: datetime, successor_id: uuid.UUID):
+    # Marks the token used and returns its owner in one statement; only one
+    # of two concurrent refreshes with the same token can win the row
+    return (
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == token_hash,
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > now,
+        )
+        .values(revoked_at=now, replaced_by=successor_id)
+        .returning(RefreshToken.user_id, RefreshToken.family_id)
+    )
+
+def _grace_statement(token_hash: str, now: datetime):
+    # Owner of a token rotated less than the grace window ago whose
+    # successor is still unused, i.e. the family's previous token
+    successor = aliased(RefreshToken)
+    return (
+        select(RefreshToken.user_id, RefreshToken.family_id)
+        .join(successor, successor.id == RefreshToken.replaced_by)
+        .where(
+            RefreshToken.token_hash == token_hash,
+            RefreshToken.revoked_at >= now - timedelta(seconds=settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS),
+            successor.revoked_at.is_(None),
+            successor.expires_at > now,
+        )
+    )
+
+def _revoke_family_statement(token_hash: str, now: datetime, reused: bool = False):
+    # One UPDATE finds the token's family and revokes it, so it always runs
+    # on the primary (a lookup first could hit a lagging replica and miss
+    # a token issued a moment ago). reused: only if the token was spent.
+    owner = select(RefreshToken.family_id).where(RefreshToken.token_hash == token_hash)
+    if reused:
+        owner = owner.where(RefreshToken.revoked_at.is_not(None))
+    return (
+        update(RefreshToken)
+        .where(RefreshToken.family_id == owner.scalar_subquery(), RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+        .returning(RefreshToken.family_id)
+    )
+
+def _log_reuse(revoked: list) -> None:
+    if revoked:
+        logger.warning("Refresh token reuse detected; revoking family %s", revoked[0].family_id)
+
+# --- Sync implementation (psycopg2 Session) ---
+
+def issue_refresh_token_sync(db: Session, user_id: uuid.UUID) -> str:
+    token, row = _new_row(user_id, uuid.uuid4())
+    db.add(row)
+    db.commit()
+    return token
+
+def rotate_refresh_token_sync(db: Session, token: str) -> tuple[uuid.UUID, str] | None:
+    use_primary(db)
+    now = datetime.now(timezone.utc)
+    successor_id = uuid.uuid4()
+    claimed = db.execute(_claim_statement(_hash(token), now, successor_id)).first()
+    if claimed is None and settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS > 0:
+        claimed = db.execute(_grace_statement(_hash(token), now)).first()
+        if claimed is not None:
+            logger.info("Refresh token replayed within the grace window; family %s", claimed.family_id)
+            successor_id = None
+    if claimed is None:
+        _handle_unclaimable_sync(db, token, now)
+        return None
+    user_id, family_id = claimed
+    new_token, row = _new_row(user_id, family_id, successor_id)
+    db.add(row)
+    db.commit()
+    return user_id, new_token
+
+def _handle_unclaimable_sync(db: Session, token: str, now: datetime) -> None:
+    _log_reuse(db.execute(_revoke_family_statement(_hash(token), now, reused=True)).all())
+    db.commit()
+
+def revoke_refresh_token_sync(db: Session, token: str) -> None:
+    db.execute(_revoke_family_statement(_hash(token), datetime.now(timezone.utc)))
+    db.commit()
+
+# --- Async service ---
+
+async def issue_refresh_token(db: DbSession, user_id: uuid.UUID) -> str:
+    """
+    Creates a refresh token for a fresh login (new family) and returns the
+    raw token. Only its hash is stored.
+    """
+    if not isinstance(db, AsyncSession):
+        return await run_in_threadpool(issue_refresh_token_sync, db, user_id)
+    token, row = _new_row(user_id, uuid.uuid4())
+    db.add(row)
+    await db.commit()
+    return token
+
+async def rotate_refresh_token(db: DbSession, token: str) -> tuple[uuid.UUID, str]:
+    """
+    Spends a refresh token and returns (user_id, replacement token).
+
+    The happy path is one indexed UPDATE ... RETURNING on token_hash plus
+    the insert of the replacement. Presenting an already-rotated token is
+    treated as theft: its whole family is revoked. The exception is the
+    family's previous token within REFRESH_TOKEN_REUSE_GRACE_SECONDS of
+    its rotation (another tab refreshed first), which gets a replacement
+    of its own.
+
+    Raises:
+        HTTPException: 401 if the token is unknown, expired, or reused
+    """
+    if not isinstance(db, AsyncSession):
+        rotated = await run_in_threadpool(rotate_refresh_token_sync, db, token)
+        if rotated is None:
+            raise _invalid_refresh_token()
+        return rotated
+
+    use_primary(db)
+    now = datetime.now(timezone.utc)
+    successor_id = uuid.uuid4()
+    claimed = (await db.execute(_claim_statement(_hash(token), now, successor_id))).first()
+    if claimed is None and settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS > 0:
+        claimed = (await db.execute(_grace_statement(_hash(token), now))).first()
+        if claimed is not None:
+            logger.info("Refresh token replayed within the grace window; family %s", claimed.family_id)
+            successor_id = None
+    if claimed is None:
+        _log_reuse((await db.execute(_revoke_family_statement(_hash(token), now, reused=True))).all())
+        await db.commit()
+        raise _invalid_refresh_token()
+
+    user_id, family_id = claimed
+    new_token, row = _new_row(user_id, family_id, successor_id)
+    db.add(row)
+    await db.commit()
+    return user_id, new_token
+
+async def revoke_refresh_token(db: DbSession, token: str) -> None:
+    """
+    Revokes a refresh token and every token rotated from the same login.
+    """
+    if not isinstance(db, AsyncSession):
+        return await run_in_threadpool(revoke_refresh_token_sync, db, token)
+    await db.execute(_revoke_family_statement(_hash(token), datetime.now(timezone.utc)))
+    await db.commit()
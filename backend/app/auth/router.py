@@ -1,36 +1,84 @@
-from fastapi import APIRouter, Depends, HTTPException, Response, Request, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Response, Request, status
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from app.db.database import DbSession, get_db
 from app.core.config import settings
 from app.auth.service import (
+    STATE_COOKIE,
     get_google_authorization_url,
     handle_google_callback,
     create_user_token,
 )
-from app.auth.schemas import AuthURL, LoginResponse
-from app.core.security import TokenDep
+from app.auth.refresh import issue_refresh_token, revoke_refresh_token, rotate_refresh_token
+from app.auth.schemas import (
+    AuthURL,
+    BatchTokenValidationRequest,
+    BatchTokenValidationResponse,
+    LoginResponse,
+    TokenRefreshRequest,
+    TokenRefreshResponse,
+    TokenValidationResponse,
+    TokenValidationResult,
+)
+from app.core.audit import audit_log
+from app.core.responses import json_response, model_response
+from app.core.revocation import revocation_list
+from app.core.tracing import tracer
+from app.core.security import TokenDep, create_access_token, decode_access_token, token_error_reason
+from jose import JWTError
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+REFRESH_COOKIE = "refresh_token"
+
+def _set_auth_cookies(response: Response, access_token: str, refresh_token: str) -> None:
+    """
+    Sets the secure access and refresh token cookies on a response.
+    """
+    for key, value, max_age in (
+        ("access_token", access_token, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60),
+        (REFRESH_COOKIE, refresh_token, settings.REFRESH_TOKEN_EXPIRE_DAYS * 86_400),
+    ):
+        response.set_cookie(
+            key=key,
+            value=value,
+            httponly=True,
+            secure=settings.ENVIRONMENT == "production",  # Only secure in production
+            samesite="lax",
+            max_age=max_age,
+            path="/",
+            domain=settings.COOKIE_DOMAIN if hasattr(settings, 'COOKIE_DOMAIN') else None
+        )
+
 # --- Get Google Login URL --- 
 @router.get("/login/google", response_model=AuthURL)
-def google_login():
+async def google_login(request: Request, response: Response):
     """
     Returns the Google OAuth authorization URL for frontend to redirect users.
+    The login's state lives server-side; the browser only gets a small
+    cookie naming it, so the callback can be served by any worker.
     
     Returns:
         AuthURL: Contains the authorization_url for Google OAuth
     """
     try:
-        # Use environment variable for callback URL
-        redirect_uri = f"{settings.BACKEND_URL}/api/v1/auth/callback/google"
-        auth_url = get_google_authorization_url(redirect_uri)
+        # Public base URL from settings, path from the mounted callback route
+        redirect_uri = f"{settings.BACKEND_URL}{request.app.url_path_for('google_callback')}"
+        auth_url, state = await get_google_authorization_url(redirect_uri)
+        response.set_cookie(
+            key=STATE_COOKIE,
+            value=state,
+            httponly=True,
+            secure=settings.ENVIRONMENT == "production",
+            samesite="lax",
+            max_age=settings.OAUTH_STATE_TTL_SECONDS,
+            path="/",
+            domain=settings.COOKIE_DOMAIN or None,
+        )
         return AuthURL(authorization_url=auth_url)
     except Exception as e:
-        logger.error(f"Failed to generate Google login URL: {str(e)}")
+        logger.error("Failed to generate Google login URL: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to generate authorization URL"
@@ -39,7 +87,7 @@ def google_login():
 @router.get("/callback/google")
 async def google_callback(
     request: Request,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     """
     Handles the callback from Google OAuth.
@@ -48,7 +96,7 @@ async def google_callback(
     1. Exchanges the authorization code for tokens
     2. Retrieves user info from Google
     3. Creates or updates user in database
-    4. Sets secure authentication cookie
+    4. Sets secure access and refresh token cookies
     5. Redirects user to frontend dashboard
     
     Args:
@@ -59,8 +107,10 @@ async def google_callback(
         RedirectResponse: Redirects to frontend with success/error status
     """
     try:
-        user = await handle_google_callback(request, db)
+        user = await handle_google_callback(request)
         token = create_user_token(user)
+        with tracer.start_span("auth.issue_refresh_token"):
+            refresh_token = await issue_refresh_token(db, user.id)
         
         # Create redirect response to frontend
         redirect_response = RedirectResponse(
@@ -68,34 +118,77 @@ async def google_callback(
             status_code=status.HTTP_307_TEMPORARY_REDIRECT
         )
         
-        # Set secure cookie with token
-        redirect_response.set_cookie(
-            key="access_token",
-            value=token,
-            httponly=True,
-            secure=settings.ENVIRONMENT == "production",  # Only secure in production
-            samesite="lax",
-            max_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,  # Convert to seconds
-            path="/",
-            domain=settings.COOKIE_DOMAIN if hasattr(settings, 'COOKIE_DOMAIN') else None
-        )
+        # Set secure cookies with tokens
+        with tracer.start_span("auth.set_cookies"):
+            _set_auth_cookies(redirect_response, token, refresh_token)
+            redirect_response.delete_cookie(STATE_COOKIE, path="/", domain=settings.COOKIE_DOMAIN or None)
+        if settings.AUDIT_ENABLED:
+            audit_log.record("login", user.id, request)
         
-        logger.info(f"User {user.email} successfully authenticated via Google OAuth")
+        # Per-phase timings of the callback, visible in browser dev tools
+        timings = getattr(request.state, "oauth_timings", {})
+        if timings:
+            redirect_response.headers["Server-Timing"] = ", ".join(
+                f"{phase};dur={duration}" for phase, duration in timings.items()
+            )
+
+        logger.info(
+            "User %s successfully authenticated via Google OAuth",
+            user.email,
+            extra={"event": "auth.login_succeeded", "user_id": str(user.id), "timings_ms": timings},
+        )
         return redirect_response
         
     except HTTPException:
         # Re-raise HTTP exceptions (these are already handled by the service layer)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in Google callback: {str(e)}")
+        logger.error("Unexpected error in Google callback: %s", e)
         # Redirect to frontend with error
         return RedirectResponse(
             url=f"{settings.FRONTEND_URL}/login?error=authentication_failed",
             status_code=status.HTTP_307_TEMPORARY_REDIRECT
         )
 
+# --- Refresh Access Token --- 
+@router.post("/refresh", response_model=TokenRefreshResponse)
+async def refresh_access_token(
+    request: Request,
+    response: Response,
+    body: TokenRefreshRequest | None = Body(default=None),
+    db: DbSession = Depends(get_db)
+):
+    """
+    Exchanges a refresh token for a new access token without going back
+    through Google. The refresh token is rotated on every use.
+    
+    Args:
+        request: FastAPI request object (refresh token cookie)
+        response: FastAPI response object
+        body: Optional refresh token for clients that don't use cookies
+        db: Database session
+    
+    Returns:
+        TokenRefreshResponse: New access token and replacement refresh token
+    """
+    presented = (body.refresh_token if body else None) or request.cookies.get(REFRESH_COOKIE)
+    if not presented:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Missing refresh token"
+        )
+    
+    user_id, refresh_token = await rotate_refresh_token(db, presented)
+    access_token = create_access_token(data={"sub": str(user_id)})
+    _set_auth_cookies(response, access_token, refresh_token)
+    return TokenRefreshResponse(
+        access_token=access_token,
+        refresh_token=refresh_token,
+        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    )
+
 # --- Validate Token --- 
-@router.get("/validate", response_model=dict)
+@router.get("/validate", response_model=TokenValidationResponse)
 async def validate_token(token_data: TokenDep):
     """
     Validates the current access token and returns token payload.
@@ -109,43 +202,109 @@ async def validate_token(token_data: TokenDep):
         token_data: Decoded JWT token data
     
     Returns:
-        dict: Token payload containing user information
+        TokenValidationResponse: Token payload containing user information
     """
-    return {
+    result = {
         "valid": True,
         "user_id": token_data.get("sub"),
         "expires_at": token_data.get("exp")
     }
+    if settings.FAST_JSON_ENABLED:
+        # Already shaped like TokenValidationResponse; skip re-validation
+        return json_response(result)
+    return result
+
+# --- Validate Tokens (batch) --- 
+@router.post("/validate/batch", response_model=BatchTokenValidationResponse)
+async def validate_tokens_batch(body: BatchTokenValidationRequest):
+    """
+    Validates many tokens in one request, for gateways that would otherwise
+    call /validate once per token.
+    
+    Args:
+        body: The tokens to validate (at most VALIDATE_BATCH_MAX_SIZE)
+    
+    Returns:
+        BatchTokenValidationResponse: One result per token, in request order
+    """
+    if len(body.tokens) > settings.VALIDATE_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.VALIDATE_BATCH_MAX_SIZE} tokens per batch"
+        )
+    
+    results = []
+    for token in body.tokens:
+        try:
+            payload = decode_access_token(token)
+        except JWTError as exc:
+            results.append(TokenValidationResult(valid=False, error=token_error_reason(exc)))
+            continue
+        results.append(TokenValidationResult(
+            valid=True,
+            user_id=payload.get("sub"),
+            expires_at=payload.get("exp"),
+        ))
+    response = BatchTokenValidationResponse(results=results)
+    if settings.FAST_JSON_ENABLED:
+        return model_response(response)
+    return response
 
 # --- Logout --- 
 @router.post("/logout")
-def logout(response: Response, token_data: TokenDep = None):
+async def logout(
+    request: Request,
+    response: Response,
+    token_data: TokenDep = None,
+    db: DbSession = Depends(get_db)
+):
     """
-    Logs out the user by clearing the access token cookie.
+    Logs out the user by revoking the access and refresh tokens
+    server-side and clearing their cookies.
     
     Args:
+        request: FastAPI request object (refresh token cookie)
         response: FastAPI response object
         token_data: Optional token data (if user is authenticated)
+        db: Database session
     
     Returns:
         dict: Success message
     """
+    # Revoke the access token first: it is the one that works right now.
+    # If either revocation can't be saved the client must not be told it
+    # is logged out (its cookies are kept, so it can retry)
     try:
-        # Clear the access token cookie
+        if token_data and token_data.get("jti"):
+            await revocation_list.revoke(db, token_data["jti"], token_data["exp"])
+        refresh_token = request.cookies.get(REFRESH_COOKIE)
+        if refresh_token:
+            await revoke_refresh_token(db, refresh_token)
+    except Exception as e:
+        logger.error("Failed to revoke tokens on logout: %s", e, extra={"event": "auth.logout_failed"})
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Logout could not be completed, please retry"
+        )
+
+    # Clear the token cookies
+    for key in ("access_token", REFRESH_COOKIE):
         response.delete_cookie(
-            key="access_token",
+            key=key,
             path="/",
             domain=settings.COOKIE_DOMAIN if hasattr(settings, 'COOKIE_DOMAIN') else None,
             secure=settings.ENVIRONMENT == "production",
             samesite="lax"
         )
-        
-        if token_data:
+
+    if token_data:
+        try:
             user_id = token_data.get("sub")
-            logger.info(f"User {user_id} successfully logged out")
-        
-        return {"message": "Successfully logged out"}
-    except Exception as e:
-        logger.error(f"Error during logout: {str(e)}")
-        # Still return success even if logging fails
-        return {"message": "Successfully logged out"}
+            if settings.AUDIT_ENABLED:
+                audit_log.record("logout", user_id, request)
+            logger.info("User %s successfully logged out", user_id, extra={"event": "auth.logout_succeeded"})
+        except Exception as e:
+            # The tokens are revoked; a failed audit/log record doesn't undo that
+            logger.error("Error recording logout: %s", e)
+
+    return {"message": "Successfully logged out"}
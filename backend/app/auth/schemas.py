@@ -1,5 +1,5 @@
 from pydantic import BaseModel, HttpUrl
-from typing import Optional
+from typing import List, Optional
 
 # --- Schema Layer ---
 class AuthURL(BaseModel):
@@ -24,6 +24,39 @@ class TokenValidationResponse(BaseModel):
     user_id: Optional[str] = None
     expires_at: Optional[int] = None
 
+class TokenValidationResult(TokenValidationResponse):
+    """
+    Schema for one token's result in a batch validation.
+    """
+    error: Optional[str] = None
+
+class BatchTokenValidationRequest(BaseModel):
+    """
+    Schema for a batch token validation request.
+    """
+    tokens: List[str]
+
+class BatchTokenValidationResponse(BaseModel):
+    """
+    Schema for batch token validation response, in request order.
+    """
+    results: List[TokenValidationResult]
+
+class TokenRefreshRequest(BaseModel):
+    """
+    Schema for a refresh request from clients that don't use the cookie.
+    """
+    refresh_token: Optional[str] = None
+
+class TokenRefreshResponse(BaseModel):
+    """
+    Schema for a successful token refresh.
+    """
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expires_in: int
+
 class LogoutResponse(BaseModel):
     """
     Schema for logout response.
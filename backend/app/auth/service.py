@@ -1,67 +1,241 @@
+import hashlib
+import hmac
+import time
+from functools import lru_cache
 from typing import Dict
-from sqlalchemy.orm import Session
-from authlib.integrations.starlette_client import OAuth, OAuthError
 from fastapi import HTTPException
+from app.auth.oidc import OIDCMetadataCache
+from app.auth.state import get_state_store
 from app.core.config import settings
+from app.core.http import get_http_timeout, shared_transport
+from app.core.metrics import oauth_callback_coalesced_total, oauth_callback_phase_seconds
+from app.core.singleflight import SingleFlight
+from app.core.tracing import traced, tracer
+from app.db.database import session_scope
 from app.db.models import User
-from app.users.service import get_user_by_email, create_user
+from app.users.service import upsert_user
 from app.users.schemas import UserCreate
 from app.core.security import create_access_token
 
+# authlib (and the joserfc/cryptography stack under it) is only needed on
+# the login and callback paths, so it is imported there, on first use,
+# instead of when a worker boots.
+
 # --- Initialize OAuth  Client --- 
-oauth = OAuth()
-oauth.register(
-    name="google",
-    client_id=settings.GOOGLE_CLIENT_ID,
-    client_secret=settings.GOOGLE_CLIENT_SECRET,
-    server_metadata_url="https://accounts.google.com/.well-known/openid-configuration",
-    client_kwargs={
-        "scope": "openid email profile",
-    }
-)
+@lru_cache()
+def get_google_client():
+    """
+    Registers the Google OAuth client on first use and returns it.
+    """
+    from authlib.integrations.starlette_client import OAuth
+
+    oauth = OAuth()
+    oauth.register(
+        name="google",
+        client_id=settings.GOOGLE_CLIENT_ID,
+        client_secret=settings.GOOGLE_CLIENT_SECRET,
+        server_metadata_url=settings.GOOGLE_DISCOVERY_URL,
+        client_kwargs={
+            "scope": "openid email profile",
+            # Token/userinfo calls share the process-wide keep-alive pool
+            "transport": shared_transport,
+            "timeout": get_http_timeout(),
+        }
+    )
+    return oauth.create_client('google')
+
+# --- Prefetched discovery metadata and JWKS ---
+def _apply_google_metadata(metadata: dict, jwks: dict) -> None:
+    """
+    Hands refreshed metadata to the authlib client; "_loaded_at" and
+    "jwks" stop it from fetching either document itself.
+    """
+    google_client = get_google_client()
+    google_client.server_metadata.update(metadata, jwks=jwks, _loaded_at=time.time())
+
+@lru_cache()
+def get_google_metadata() -> OIDCMetadataCache:
+    """
+    Returns the process-wide discovery/JWKS cache for Google.
+    """
+    return OIDCMetadataCache(
+        discovery_url=settings.GOOGLE_DISCOVERY_URL,
+        min_refresh=settings.OIDC_METADATA_MIN_REFRESH_SECONDS,
+        max_refresh=settings.OIDC_METADATA_MAX_REFRESH_SECONDS,
+        default_refresh=settings.OIDC_METADATA_DEFAULT_REFRESH_SECONDS,
+        retry_interval=settings.OIDC_METADATA_RETRY_SECONDS,
+        timeout=settings.OIDC_METADATA_TIMEOUT_SECONDS,
+        on_update=_apply_google_metadata,
+    )
 # --- Method to get the google auth url --- 
-def get_google_authorization_url(redirect_uri: str) -> str:
+# Cookie tying a pending login to the browser that started it
+STATE_COOKIE = "oauth_state"
+
+async def get_google_authorization_url(redirect_uri: str) -> tuple[str, str]:
     """
-    Generates the Google OAuth authorization URL.
+    Generates the Google OAuth authorization URL and stores the login's
+    state, nonce and redirect_uri server-side.
+
+    Returns:
+        tuple: (authorization_url, state)
     """
-    google_client = oauth.create_client('google')
+    google_client = get_google_client()
     if not google_client:
         raise HTTPException(status_code=500, detail="Google OAuth client not configured")
     
-    authorization_url, state = google_client.create_authorization_url(
-        "https://accounts.google.com/o/oauth2/v2/auth",
-        redirect_uri=redirect_uri
+    # Authorization endpoint comes from the (prefetched) discovery document
+    rv = await google_client.create_authorization_url(redirect_uri=redirect_uri)
+    state_data = {"redirect_uri": redirect_uri}
+    for key in ("nonce", "code_verifier"):
+        if rv.get(key):
+            state_data[key] = rv[key]
+    await get_state_store().save(rv["state"], state_data, settings.OAUTH_STATE_TTL_SECONDS)
+    return rv["url"], rv["state"]
+
+def _check_callback(request) -> tuple[str, str]:
+    """
+    Returns the callback's (state, code) after checking Google reported no
+    error and the state belongs to this browser.
+
+    Raises:
+        OAuthError: On a provider error, a missing code or a foreign state
+    """
+    from authlib.integrations.base_client import MismatchingStateError, OAuthError
+
+    params = request.query_params
+    if params.get("error"):
+        raise OAuthError(error=params["error"], description=params.get("error_description"))
+    state, code = params.get("state"), params.get("code")
+    if not state:
+        raise MismatchingStateError()
+    if settings.OAUTH_STATE_BIND_COOKIE and not hmac.compare_digest(
+        request.cookies.get(STATE_COOKIE, ""), state
+    ):
+        raise MismatchingStateError()
+    if not code:
+        raise OAuthError(error="invalid_request", description="Missing authorization code")
+    return state, code
+
+async def exchange_google_code(google_client, state: str, code: str) -> dict:
+    """
+    Consumes the pending login named by state and exchanges the code for
+    tokens. Does what authlib's authorize_access_token does, with the state
+    coming from the server-side store instead of the session.
+
+    Raises:
+        OAuthError: If the state is unknown, expired or already used
+    """
+    from authlib.integrations.base_client import MismatchingStateError
+
+    state_data = await get_state_store().pop(state)
+    if state_data is None:
+        raise MismatchingStateError()
+
+    token_params = {"code": code, "redirect_uri": state_data["redirect_uri"]}
+    if state_data.get("code_verifier"):
+        token_params["code_verifier"] = state_data["code_verifier"]
+    token = await google_client.fetch_access_token(**token_params)
+    if "id_token" in token and state_data.get("nonce"):
+        # Verified locally: signature against the cached JWKS, aud, iss,
+        # exp, at_hash and the nonce of this login
+        with tracer.start_span("oauth.verify_id_token"):
+            token["userinfo"] = await google_client.parse_id_token(token, nonce=state_data["nonce"])
+    return token
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+# --- Single-flight: duplicate callbacks share one exchange / one upsert ---
+# Replays of a code (same state, same browser) join the in-flight exchange
+# or, within the replay window, reuse its result instead of exchanging the
+# code again. Across workers the one-time state already stops a second
+# exchange; the upsert's ON CONFLICT keeps concurrent logins safe there.
+@lru_cache()
+def _code_flights() -> SingleFlight:
+    return SingleFlight(
+        remember=settings.OAUTH_CODE_REPLAY_WINDOW_SECONDS if settings.OAUTH_STATE_BIND_COOKIE else 0
     )
-    return authorization_url
+
+_user_flights = SingleFlight()
+
+async def _resolve_google_identity(google_client, state: str, code: str, timings: dict) -> dict:
+    """
+        Exchanges the code and returns the verified {email , name} claims
+    """
+    started = time.perf_counter()
+    with tracer.start_span("oauth.exchange_code"):
+        token = await exchange_google_code(google_client, state, code)
+    timings["token_exchange"] = _elapsed_ms(started)
+
+    if settings.GOOGLE_USERINFO_SOURCE == "userinfo":
+        user_info = None
+    else:
+        # Claims of the id_token verified during the exchange
+        user_info = token.get("userinfo")
+    # Userinfo endpoint round trip in "userinfo" mode, or when the claims
+    # are missing (no id_token, or no email in it)
+    if not user_info or not user_info.get("email"):
+        started = time.perf_counter()
+        with tracer.start_span("oauth.userinfo"):
+            user_info = await google_client.userinfo(token=token)
+        timings["userinfo"] = _elapsed_ms(started)
+    if not user_info:
+        raise HTTPException(status_code=400, detail="Failed to fetch user info")
+    return {"email": user_info.get("email"), "name": user_info.get("name")}
+
+async def _upsert_google_user(user: UserCreate) -> User:
+    # Own session: the shared task may outlive the request that started it
+    async with session_scope() as db:
+        return await upsert_user(db, user)
 
 # ---- Method to handle_google_callback ----
-async def handle_google_callback(request , db: Session ) -> User : 
+@traced("oauth.handle_callback")
+async def handle_google_callback(request) -> User : 
     """
         Handles the Google OAuth Callback : 
-        1. Exchanges code for access token 
+        1. Exchanges code for access token (once per code)
         2. Fetches user info 
-        3. Creates or retrieves user in DB 
+        3. Creates or updates the user in DB (single upsert , once per
+           email across concurrent callbacks)
         4. Returns the user object 
+        Per-phase timings (ms) are left in request.state.oauth_timings
     """
+    from authlib.integrations.base_client import OAuthError
+
+    timings = {}
+    request.state.oauth_timings = timings
     try:
-        google_client = oauth.create_client('google')
+        google_client = get_google_client()
         if not google_client:
             raise HTTPException(status_code=500, detail="Google OAuth client not configured")
-            
-        token = await google_client.authorize_access_token(request)
-        user_info = token.get("userinfo")
-        if not user_info:
-            raise HTTPException(status_code=400, detail="Failed to fetch user info")
-        email = user_info.get("email")
-        full_name = user_info.get("name")
-        user = get_user_by_email(db, email)
-        if not user:
-            user = create_user(db, UserCreate(email=email, full_name=full_name))
+
+        state, code = _check_callback(request)
+        started = time.perf_counter()
+        code_key = hashlib.sha256(f"{state}:{code}".encode()).hexdigest()
+        user_info, shared = await _code_flights().do(
+            code_key, lambda: _resolve_google_identity(google_client, state, code, timings)
+        )
+        if shared:
+            timings["coalesced_exchange"] = _elapsed_ms(started)
+            oauth_callback_coalesced_total.inc("exchange")
+
+        started = time.perf_counter()
+        user, shared = await _user_flights.do(
+            user_info["email"],
+            lambda: _upsert_google_user(UserCreate(email=user_info["email"], full_name=user_info["name"])),
+        )
+        timings["db"] = _elapsed_ms(started)
+        if shared:
+            oauth_callback_coalesced_total.inc("user")
         return user
     except OAuthError as oauth_error:
         raise HTTPException(status_code=400, detail=f"OAuth error: {str(oauth_error)}")
     except Exception as exc:
         raise HTTPException(status_code=400, detail=f"Failed to handle Google callback: {str(exc)}")
+    finally:
+        # Phases that completed are recorded even if a later one failed
+        for phase, duration in timings.items():
+            oauth_callback_phase_seconds.observe(duration / 1000, phase)
     
 def create_user_token(user: User) -> str:
     """
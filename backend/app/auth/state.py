@@ -0,0 +1,168 @@
+import json
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.shared_store import SharedStore, get_shared_store
+from app.db.database import session_scope
+from app.db.models import OAuthState
+
+# Upper bound on pending logins held by the in-memory backend
+_MEMORY_MAX_PENDING = 100_000
+# Minimum seconds between sweeps of expired rows (database backend)
+_DB_PRUNE_INTERVAL = 300.0
+
+
+class OAuthStateStore(ABC):
+    """
+    Server-side storage for pending OAuth logins, keyed by the state
+    parameter. Entries expire after ttl seconds and pop() hands each one
+    out at most once, so a state can't be replayed.
+    """
+
+    @abstractmethod
+    async def save(self, state: str, data: dict, ttl: float) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def pop(self, state: str) -> dict | None:
+        raise NotImplementedError
+
+
+class MemoryStateStore(OAuthStateStore):
+    """
+    Per-process store. Only correct with a single worker (or sticky
+    routing), since the callback must land where the login started.
+    """
+
+    def __init__(self, maxsize: int = _MEMORY_MAX_PENDING, ttl: float = 600):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def save(self, state: str, data: dict, ttl: float) -> None:
+        self._cache.set(state, data, ttl=ttl)
+
+    async def pop(self, state: str) -> dict | None:
+        data = self._cache.get(state)
+        if data is not None:
+            self._cache.delete(state)
+        return data
+
+
+class SharedStateStore(OAuthStateStore):
+    """
+    Store on the shared backend (SHARED_STORE_URL: Redis, or memory:// as a
+    local stand-in). pop() is a single atomic GETDEL.
+    """
+
+    prefix = "oauth_state:"
+
+    def __init__(self, store: SharedStore):
+        self._store = store
+
+    async def save(self, state: str, data: dict, ttl: float) -> None:
+        await self._store.set(self.prefix + state, json.dumps(data), ttl=ttl)
+
+    async def pop(self, state: str) -> dict | None:
+        value = await self._store.pop(self.prefix + state)
+        return json.loads(value) if value is not None else None
+
+
+# --- Database backend: sync implementation (psycopg2 Session) ---
+
+def _save_sync(db: Session, row: OAuthState, prune) -> None:
+    if prune is not None:
+        db.execute(prune)
+    db.add(row)
+    db.commit()
+
+def _pop_sync(db: Session, statement):
+    row = db.execute(statement).first()
+    db.commit()
+    return row
+
+
+class DatabaseStateStore(OAuthStateStore):
+    """
+    Store in the oauth_states table. pop() is one DELETE ... RETURNING, so
+    concurrent callbacks with the same state can't both consume it.
+    Expired rows are swept from save() every few minutes.
+    """
+
+    def __init__(self):
+        self._last_prune = 0.0
+
+    def _prune_statement(self):
+        now = time.monotonic()
+        if now - self._last_prune < _DB_PRUNE_INTERVAL:
+            return None
+        self._last_prune = now
+        return delete(OAuthState).where(OAuthState.expires_at <= datetime.now(timezone.utc))
+
+    async def save(self, state: str, data: dict, ttl: float) -> None:
+        row = OAuthState(
+            state=state,
+            data=json.dumps(data),
+            expires_at=datetime.now(timezone.utc) + timedelta(seconds=ttl),
+        )
+        prune = self._prune_statement()
+        async with session_scope() as db:
+            if not isinstance(db, AsyncSession):
+                return await run_in_threadpool(_save_sync, db, row, prune)
+            if prune is not None:
+                await db.execute(prune)
+            db.add(row)
+            await db.commit()
+
+    async def pop(self, state: str) -> dict | None:
+        statement = (
+            delete(OAuthState)
+            .where(OAuthState.state == state)
+            .returning(OAuthState.data, OAuthState.expires_at)
+        )
+        async with session_scope() as db:
+            if not isinstance(db, AsyncSession):
+                row = await run_in_threadpool(_pop_sync, db, statement)
+            else:
+                row = (await db.execute(statement)).first()
+                await db.commit()
+        if row is None:
+            return None
+        expires_at = row.expires_at
+        # SQLite hands back naive datetimes; everything is stored in UTC
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if expires_at <= datetime.now(timezone.utc):
+            return None
+        return json.loads(row.data)
+
+
+def create_state_store(backend: str) -> OAuthStateStore:
+    """
+    Builds the store named by OAUTH_STATE_BACKEND.
+    """
+    if backend == "memory":
+        return MemoryStateStore(ttl=settings.OAUTH_STATE_TTL_SECONDS)
+    if backend == "database":
+        return DatabaseStateStore()
+    if backend == "shared":
+        store = get_shared_store()
+        if store is None:
+            raise RuntimeError("OAUTH_STATE_BACKEND=shared requires SHARED_STORE_URL")
+        return SharedStateStore(store)
+    raise ValueError(f"Unsupported OAUTH_STATE_BACKEND: {backend}")
+
+
+@lru_cache()
+def get_state_store() -> OAuthStateStore:
+    """
+    Returns the process-wide OAuth state store.
+    """
+    return create_state_store(settings.OAUTH_STATE_BACKEND)
@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import bindparam, insert, text, update
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.log import request_id_var
+from app.core.metrics import Counter, GaugeCallback, Histogram, registry
+from app.db.database import DbSession, session_scope, use_primary
+from app.db.models import AuditEvent, User
+
+logger = logging.getLogger(__name__)
+
+# Monthly partitions kept ahead of the clock (Postgres only)
+_PARTITION_MONTHS_AHEAD = 2
+# Seconds between partition checks
+_PARTITION_CHECK_INTERVAL = 86_400.0
+
+audit_events_dropped_total = registry.register(Counter(
+    "audit_events_dropped_total", "Audit events dropped because the audit queue was full",
+))
+audit_flush_seconds = registry.register(Histogram(
+    "audit_flush_seconds", "Time to write one batch of audit events",
+))
+
+
+def _month_start(year: int, month: int) -> datetime:
+    # Normalises month overflow (13 -> January of the next year)
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+def _is_transient(exc: Exception) -> bool:
+    """
+    True for failures worth retrying the same batch on (connection lost,
+    pool exhausted, server going away); False for errors the data itself
+    causes, which would fail again on every retry.
+    """
+    if isinstance(exc, sa_exc.DBAPIError):
+        return exc.connection_invalidated or isinstance(exc, (sa_exc.OperationalError, sa_exc.InterfaceError))
+    return isinstance(exc, (sa_exc.TimeoutError, ConnectionError, TimeoutError, OSError))
+
+
+# Core executemany: no matched-rowcount check, so a login queued for a
+# user deleted since then updates nothing instead of failing the batch
+_users = User.__table__
+_last_login_statement = (
+    update(_users)
+    .where(_users.c.id == bindparam("user_id"))
+    .values(last_login_at=bindparam("at"))
+)
+
+
+def _partition_statements(now: datetime) -> list:
+    statements = []
+    for offset in range(_PARTITION_MONTHS_AHEAD + 1):
+        start = _month_start(now.year, now.month + offset)
+        end = _month_start(now.year, now.month + offset + 1)
+        statements.append(text(
+            f"CREATE TABLE IF NOT EXISTS audit_events_{start:%Y_%m} PARTITION OF audit_events "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+    return statements
+
+
+# --- Sync writes (psycopg2 Session) ---
+
+def _execute_sync(db: Session, statements: list) -> None:
+    for statement, params in statements:
+        db.execute(statement, params)
+    db.commit()
+
+
+class AuditLog:
+    """
+    Login/logout audit trail, written off the request path.
+
+    record() only appends to an in-memory buffer. A background task
+    flushes the buffer as one multi-row INSERT when it reaches batch_size
+    or every flush_interval seconds, and in the same transaction sets
+    users.last_login_at once per user (the latest login of the batch,
+    however many there were). The buffer is bounded: past max_queue
+    events new ones are dropped and counted rather than growing memory
+    while the database is down.
+    """
+
+    def __init__(self):
+        self.batch_size = 500
+        self.max_queue = 50_000
+        self.flush_interval = 1.0
+        self._events: list[dict] = []
+        self._last_logins: dict[uuid.UUID, datetime] = {}
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._partitions_checked = 0.0
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def record(self, event: str, user_id: uuid.UUID | str | None, request=None) -> None:
+        """
+        Queues an audit event. Never blocks and never touches the DB.
+        """
+        if len(self._events) >= self.max_queue:
+            audit_events_dropped_total.inc()
+            logger.error("Audit queue full, dropped %s event", event, extra={"event": "audit.dropped"})
+            return
+        if isinstance(user_id, str):
+            user_id = uuid.UUID(user_id)
+        ip = user_agent = None
+        if request is not None:
+            ip = request.client.host if request.client else None
+            user_agent = request.headers.get("user-agent", "")[:256] or None
+        occurred_at = datetime.now(timezone.utc)
+        self._events.append({
+            "id": uuid.uuid4(),
+            "occurred_at": occurred_at,
+            "event": event,
+            "user_id": user_id,
+            "ip": ip,
+            "user_agent": user_agent,
+            "request_id": request_id_var.get(),
+        })
+        if event == "login" and user_id is not None:
+            self._last_logins[user_id] = occurred_at
+        if len(self._events) >= self.batch_size:
+            self._wakeup.set()
+
+    def _statements(self, events: list[dict], last_logins: dict) -> list:
+        statements = [(insert(AuditEvent), events)]
+        if last_logins:
+            statements.append((_last_login_statement, [
+                {"user_id": user_id, "at": at} for user_id, at in last_logins.items()
+            ]))
+        return statements
+
+    async def flush(self) -> int:
+        """
+        Writes everything buffered so far. Returns the number of events
+        written. If the database is unreachable the batch goes back to the
+        front of the buffer (space permitting); a batch the database
+        rejects is dropped and counted, since retrying it would block every
+        later event. Either way the error is raised.
+        """
+        async with self._flush_lock:
+            events, self._events = self._events, []
+            last_logins, self._last_logins = self._last_logins, {}
+            if not events:
+                return 0
+            statements = self._statements(events, last_logins)
+            try:
+                with audit_flush_seconds.time():
+                    async with session_scope() as db:
+                        # Partition DDL is a text() statement; keep it off replicas
+                        use_primary(db)
+                        await self._ensure_partitions(db)
+                        if not isinstance(db, AsyncSession):
+                            await run_in_threadpool(_execute_sync, db, statements)
+                        else:
+                            for statement, params in statements:
+                                await db.execute(statement, params)
+                            await db.commit()
+            except Exception as exc:
+                if _is_transient(exc):
+                    self._requeue(events, last_logins)
+                else:
+                    audit_events_dropped_total.inc(amount=len(events))
+                    logger.error(
+                        "Audit batch rejected by the database, dropped %d events: %s", len(events), exc,
+                        extra={"event": "audit.dropped"},
+                    )
+                raise
+            return len(events)
+
+    def _requeue(self, events: list[dict], last_logins: dict) -> None:
+        room = self.max_queue - len(self._events)
+        if room < len(events):
+            audit_events_dropped_total.inc(amount=len(events) - room)
+        self._events[:0] = events[:max(0, room)]
+        for user_id, at in last_logins.items():
+            if self._last_logins.get(user_id, at) <= at:
+                self._last_logins[user_id] = at
+
+    async def _ensure_partitions(self, db: DbSession) -> None:
+        """
+        Creates this month's and the next months' partitions (Postgres),
+        at most once a day per worker.
+        """
+        loop_time = asyncio.get_running_loop().time()
+        if self._partitions_checked and loop_time - self._partitions_checked < _PARTITION_CHECK_INTERVAL:
+            return
+        self._partitions_checked = loop_time
+        if db.get_bind().dialect.name != "postgresql":
+            return
+        statements = [(statement, None) for statement in _partition_statements(datetime.now(timezone.utc))]
+        if not isinstance(db, AsyncSession):
+            await run_in_threadpool(_execute_sync, db, statements)
+        else:
+            for statement, _ in statements:
+                await db.execute(statement)
+            await db.commit()
+
+    # --- Background flush ---
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as exc:
+                logger.warning("Audit log flush failed: %s", exc)
+
+    def start(self, flush_interval: float, batch_size: int, max_queue: int) -> None:
+        """
+        Starts flushing every flush_interval seconds or batch_size events.
+        """
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        # asyncio primitives belong to one loop; the app may be started on a
+        # new one (tests, in-process restarts)
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Cancels the background task and writes what is still buffered.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as exc:
+            logger.error("Final audit log flush failed, %d events lost: %s", len(self._events), exc)
+
+
+audit_log = AuditLog()
+
+registry.register(GaugeCallback(
+    "audit_queue_depth", "Audit events waiting to be written", lambda: {(): len(audit_log)},
+))
@@ -1,5 +1,7 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
+import ipaddress
 from functools import lru_cache
+from typing import Literal
 
 
 class Settings(BaseSettings):
@@ -9,15 +11,192 @@ class Settings(BaseSettings):
     """
     # Database
     DATABASE_URL: str
+    # When True, routes run on an asyncpg-backed AsyncSession; set to False
+    # to fall back to the psycopg2 Session (queries run in a threadpool).
+    DATABASE_ASYNC: bool = True
+    # Optional explicit async URL; derived from DATABASE_URL when unset
+    ASYNC_DATABASE_URL: str | None = None
+    # Comma-separated read replica URLs (sync driver form); reads go to a
+    # replica, writes and read-after-write to DATABASE_URL
+    DATABASE_REPLICA_URLS: str = ""
+    
+    # Connection pool (applied to the primary and every replica)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1_800
+    # Pre-ping costs a round trip per checkout; pool_recycle below the
+    # server/proxy idle timeout usually makes it unnecessary
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_USE_LIFO: bool = False
+    DB_CONNECT_TIMEOUT_SECONDS: float = 10.0
+    # Server-side statement_timeout; 0 leaves the server default
+    DB_STATEMENT_TIMEOUT_MS: int = 0
     
     # JWT Authentication
     SECRET_KEY: str
+    # HS256 signs with SECRET_KEY; ES256/RS256 sign with rotating kid-tagged
+    # key pairs published at /.well-known/jwks.json
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Rotating refresh tokens (single use, stored hashed)
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    # Replaying the immediately previous token this soon after its rotation
+    # (two tabs refreshing at once) gets a new token instead of revoking
+    # the family; 0 treats every replay as theft
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS: int = 10
+    # Asymmetric signing keys: shared PEM directory (required with several
+    # workers), rotation period, early publication of the next key, and how
+    # often workers reload the directory (also the JWKS max-age)
+    JWT_KEYS_DIR: str | None = None
+    JWT_KEY_ROTATION_SECONDS: int = 7 * 86_400
+    JWT_KEY_PREPUBLISH_SECONDS: int = 86_400
+    JWT_KEY_REFRESH_SECONDS: int = 300
+    # Token revocation: how often workers pull new denylist entries, and
+    # how often expired rows are deleted (seconds)
+    REVOCATION_SYNC_SECONDS: float = 5.0
+    REVOCATION_PRUNE_SECONDS: int = 3_600
+    # Each sync re-reads revocations this far back before the previous one,
+    # so rows committed late (or seen through clock skew) are not missed
+    REVOCATION_SYNC_LOOKBACK_SECONDS: float = 60.0
+    # Max tokens per POST /auth/validate/batch
+    VALIDATE_BATCH_MAX_SIZE: int = 100
+    # Fast JSON responses: orjson for plain dict results, hot routes build
+    # their JSON directly, and UserPublic is built from DB rows without
+    # re-validating them. Off = FastAPI's default serialization
+    FAST_JSON_ENABLED: bool = True
+    # Verified-token cache (skips jwt.decode for repeated tokens)
+    TOKEN_CACHE_ENABLED: bool = True
+    TOKEN_CACHE_MAXSIZE: int = 10_000
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+    
+    # User profile cache (in-process tier + optional shared tier)
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_MAXSIZE: int = 10_000
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_SHARED: bool = True
+    USER_CACHE_SHARED_TTL_SECONDS: int = 300
+    
+    # User directory (GET /users): page size cap, rows per round trip of
+    # /users/export, and the token subs (user ids) allowed to read it
+    USERS_PAGE_MAX_SIZE: int = 500
+    USERS_EXPORT_BATCH_SIZE: int = 1_000
+    USERS_DIRECTORY_ADMIN_IDS: str = ""
+    
+    # Shared store for cross-worker state: "memory://" (local stand-in)
+    # or "redis://host:6379/0". Disabled when unset.
+    SHARED_STORE_URL: str | None = None
     
     # Google OAuth 2.0
     GOOGLE_CLIENT_ID: str
     GOOGLE_CLIENT_SECRET: str
+    # OIDC issuer; point at a local stand-in provider in tests
+    GOOGLE_ISSUER_URL: str = "https://accounts.google.com"
+    # Where the callback reads email/name from: "id_token" uses the claims
+    # of the ID token verified during the code exchange (userinfo endpoint
+    # only when they carry no email), "userinfo" always calls the endpoint
+    GOOGLE_USERINFO_SOURCE: Literal["id_token", "userinfo"] = "id_token"
+    
+    # Pending OAuth logins (state/nonce/PKCE) kept server-side so the
+    # callback can land on any worker: "database" (oauth_states table),
+    # "shared" (SHARED_STORE_URL) or "memory" (single worker only)
+    OAUTH_STATE_BACKEND: Literal["memory", "database", "shared"] = "database"
+    OAUTH_STATE_TTL_SECONDS: int = 600
+    # Require the callback's state to match the cookie set at login
+    OAUTH_STATE_BIND_COOKIE: bool = True
+    # A repeated callback for an already exchanged code (same state and
+    # browser) reuses the first result for this long instead of failing
+    OAUTH_CODE_REPLAY_WINDOW_SECONDS: int = 30
+    
+    # OIDC discovery/JWKS warm-up and background refresh (seconds)
+    OIDC_WARMUP_ENABLED: bool = True
+    OIDC_METADATA_MIN_REFRESH_SECONDS: int = 300
+    OIDC_METADATA_MAX_REFRESH_SECONDS: int = 86_400
+    OIDC_METADATA_DEFAULT_REFRESH_SECONDS: int = 3_600
+    OIDC_METADATA_RETRY_SECONDS: int = 30
+    OIDC_METADATA_TIMEOUT_SECONDS: float = 5.0
+    
+    # Outbound HTTP (shared keep-alive pool for all OAuth/OIDC traffic)
+    HTTP_HTTP2: bool = True
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    HTTP_CONNECT_RETRIES: int = 1
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    HTTP_READ_TIMEOUT_SECONDS: float = 10.0
+    HTTP_WRITE_TIMEOUT_SECONDS: float = 10.0
+    HTTP_POOL_TIMEOUT_SECONDS: float = 5.0
+    
+    # Admission control: per route group, at most MAX_CONCURRENCY requests
+    # run and MAX_QUEUE wait (up to QUEUE_TIMEOUT); the rest get a 503 with
+    # Retry-After. Keep the login budget below the DB pool size
+    # (DB_POOL_SIZE + DB_MAX_OVERFLOW) so reads always find a connection.
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_LOGIN_MAX_CONCURRENCY: int = 10
+    ADMISSION_LOGIN_MAX_QUEUE: int = 50
+    ADMISSION_READ_MAX_CONCURRENCY: int = 100
+    ADMISSION_READ_MAX_QUEUE: int = 200
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 2.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+    
+    # Rate limiting: sliding window of RATE_LIMIT_WINDOW_SECONDS, limits
+    # per client IP or per token sub (0 disables a rule). At most
+    # RATE_LIMIT_MAX_KEYS clients are tracked per rule (LRU eviction).
+    # RATE_LIMIT_SHARED counts in SHARED_STORE_URL across all workers.
+    # Off by default: size the limits for your traffic first, and list
+    # trusted callers (gateways, other services) in RATE_LIMIT_ALLOWLIST
+    # (comma-separated IPs or CIDR networks), which are never limited.
+    # The per-sub limit only counts verified tokens on /validate.
+    RATE_LIMIT_ENABLED: bool = False
+    RATE_LIMIT_ALLOWLIST: str = ""
+    RATE_LIMIT_WINDOW_SECONDS: int = 60
+    RATE_LIMIT_LOGIN_PER_IP: int = 30
+    RATE_LIMIT_CALLBACK_PER_IP: int = 30
+    RATE_LIMIT_VALIDATE_PER_IP: int = 1_200
+    RATE_LIMIT_VALIDATE_PER_SUB: int = 600
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+    RATE_LIMIT_SHARED: bool = False
+    
+    # Audit log of logins/logouts: buffered in memory and written in
+    # batches every FLUSH_INTERVAL or BATCH_SIZE events; past MAX_QUEUE
+    # buffered events new ones are dropped (and counted)
+    AUDIT_ENABLED: bool = True
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 1.0
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_MAX_QUEUE: int = 50_000
+    
+    # Logging: JSON lines (or text) written by a background thread
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"
+    # Records beyond this many waiting are dropped (and counted)
+    LOG_QUEUE_SIZE: int = 10_000
+    # Fraction kept per high-volume event, "event=rate,...",
+    # e.g. "auth.login_succeeded=0.1,auth.logout_succeeded=0.1"
+    LOG_SAMPLE_RATES: str = ""
+    
+    # Profiling (off by default): profiles PROFILING_SAMPLE_RATE of requests
+    # plus any request sending "X-Profile: <PROFILING_TOKEN>", as
+    # collapsed stacks (flamegraphs) or cProfile .prof files in
+    # PROFILING_DIR; the slowest/latest PROFILING_TOP_N are kept and served
+    # on /debug/profiles (same header required)
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_TOKEN: str = ""
+    PROFILING_FORMAT: Literal["collapsed", "cprofile"] = "collapsed"
+    PROFILING_DIR: str = "/tmp/oauth-profiles"
+    PROFILING_TOP_N: int = 20
+    
+    # Tracing: spans for the request, OAuth calls, JWT minting and user
+    # queries, with W3C traceparent propagated in and out. "memory" keeps
+    # recent spans in process (tests), "file" appends JSON lines to
+    # TRACING_FILE_PATH, "none" records nothing
+    TRACING_EXPORTER: Literal["none", "memory", "file"] = "none"
+    TRACING_SAMPLE_RATE: float = 1.0
+    TRACING_FILE_PATH: str = "spans.jsonl"
+    
+    # Metrics (Prometheus text format on METRICS_PATH)
+    METRICS_ENABLED: bool = True
+    METRICS_PATH: str = "/metrics"
     
     # URLs
     BACKEND_URL: str = "http://127.0.0.1:8000"
@@ -27,6 +206,22 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = "development"
     COOKIE_DOMAIN: str = None
     
+    @property
+    def database_replica_urls(self) -> list[str]:
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+    
+    @property
+    def users_directory_admin_ids(self) -> set[str]:
+        return {value.strip() for value in self.USERS_DIRECTORY_ADMIN_IDS.split(",") if value.strip()}
+    
+    @property
+    def rate_limit_allowlist(self) -> list[ipaddress.IPv4Network | ipaddress.IPv6Network]:
+        return [ipaddress.ip_network(value.strip(), strict=False) for value in self.RATE_LIMIT_ALLOWLIST.split(",") if value.strip()]
+    
+    @property
+    def GOOGLE_DISCOVERY_URL(self) -> str:
+        return f"{self.GOOGLE_ISSUER_URL.rstrip('/')}/.well-known/openid-configuration"
+    
     # Pydantic model configuration
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
 
@@ -41,6 +236,25 @@ def get_settings() -> Settings:
     return Settings()
 
 
-# Create a single instance of settings to be used across the application
-settings = get_settings()
+class LazyObject:
+    """
+    Stands in for the object returned by factory (a cached getter) and
+    calls it on first attribute access, so importing a module never reads
+    the environment or builds clients. Assignments go through to the real
+    object (handy in tests).
+    """
+
+    __slots__ = ("_factory",)
+
+    def __init__(self, factory):
+        object.__setattr__(self, "_factory", factory)
+
+    def __getattr__(self, name: str):
+        return getattr(self._factory(), name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(self._factory(), name, value)
+
 
+# Single settings object used across the application (built lazily)
+settings = LazyObject(get_settings)
@@ -0,0 +1,105 @@
+import logging
+
+import httpx
+
+from app.core.config import settings
+from app.core.tracing import inject_traceparent, tracer
+
+logger = logging.getLogger(__name__)
+
+
+_pool: httpx.AsyncHTTPTransport | None = None
+_client: httpx.AsyncClient | None = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_http_timeout() -> httpx.Timeout:
+    """
+    Returns the outbound timeouts configured in Settings.
+    """
+    return httpx.Timeout(
+        connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS,
+        read=settings.HTTP_READ_TIMEOUT_SECONDS,
+        write=settings.HTTP_WRITE_TIMEOUT_SECONDS,
+        pool=settings.HTTP_POOL_TIMEOUT_SECONDS,
+    )
+
+
+def _get_pool() -> httpx.AsyncHTTPTransport:
+    """
+    Returns the keep-alive connection pool, creating it on first use.
+    """
+    global _pool
+    if _pool is None:
+        http2 = settings.HTTP_HTTP2
+        if http2 and not _http2_available():
+            logger.warning("HTTP_HTTP2 is enabled but 'h2' is not installed; using HTTP/1.1")
+            http2 = False
+        _pool = httpx.AsyncHTTPTransport(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            retries=settings.HTTP_CONNECT_RETRIES,
+        )
+    return _pool
+
+
+class SharedTransport(httpx.AsyncBaseTransport):
+    """
+    Routes requests through the process-wide connection pool. Short-lived
+    clients (authlib opens one per OAuth call) can use it without closing
+    the pool when they exit. Each request gets a CLIENT span and carries
+    the trace context in a traceparent header.
+    """
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attributes = {
+            "http.request.method": request.method,
+            "server.address": request.url.host,
+            "url.path": request.url.path,
+        }
+        with tracer.start_span(f"{request.method} {request.url.host}", attributes, "CLIENT") as span:
+            inject_traceparent(request.headers)
+            response = await _get_pool().handle_async_request(request)
+            span.set_attribute("http.response.status_code", response.status_code)
+            return response
+
+    async def aclose(self) -> None:
+        # Owned by the process; closed by close_http_client() on shutdown
+        pass
+
+
+shared_transport = SharedTransport()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide async HTTP client backed by the shared pool.
+    """
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(transport=shared_transport, timeout=get_http_timeout())
+    return _client
+
+
+async def close_http_client() -> None:
+    """
+    Closes the shared client and its connection pool. Called on shutdown.
+    """
+    global _client, _pool
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    if _pool is not None:
+        await _pool.aclose()
+        _pool = None
@@ -0,0 +1,285 @@
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwk
+
+logger = logging.getLogger(__name__)
+
+# Algorithms signed with a rotating key pair (everything else uses SECRET_KEY)
+ASYMMETRIC_ALGORITHMS = ("ES256", "RS256")
+# Minimum seconds between reloads triggered by an unknown kid
+_MISS_RELOAD_INTERVAL = 5.0
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    """
+    One kid-tagged key pair. Signs tokens during [not_before, not_after)
+    and verifies them until retain_until.
+    """
+    kid: str
+    algorithm: str
+    private_pem: str
+    public_jwk: dict
+    not_before: float
+    not_after: float
+    retain_until: float
+
+
+def _generate_private_pem(algorithm: str) -> str:
+    if algorithm == "ES256":
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    else:
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+def _public_jwk(private_pem: str, algorithm: str, kid: str) -> dict:
+    private_key = serialization.load_pem_private_key(private_pem.encode(), password=None)
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    ).decode()
+    public = jwk.construct(public_pem, algorithm).to_dict()
+    public.update({"kid": kid, "alg": algorithm, "use": "sig"})
+    return public
+
+
+class KeyRing:
+    """
+    Time-bucketed signing keys with scheduled rotation.
+
+    Each rotation period has its own key, kid "<alg>-<period start>". The
+    next period's key is created prepublish seconds early so verifiers that
+    cache the JWKS already know it when it starts signing. Old keys stay
+    published until every token they signed has expired.
+
+    With keys_dir set, keys are PEM files shared by all workers: whichever
+    worker first needs a period's key creates it atomically and the others
+    load it. Without keys_dir keys live in memory and only suit a single
+    worker.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        rotation_interval: float,
+        prepublish: float,
+        token_lifetime: float,
+        keys_dir: str | None = None,
+    ):
+        self.algorithm = algorithm
+        self.rotation_interval = rotation_interval
+        self.prepublish = prepublish
+        self.token_lifetime = token_lifetime
+        self.keys_dir = Path(keys_dir) if keys_dir else None
+        self._keys: dict[str, SigningKey] = {}
+        self._pems: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._last_miss_reload = 0.0
+        # Current-period kid last reported missing by signing_key()
+        self._lagging_kid: str | None = None
+        self._task: asyncio.Task | None = None
+
+    # --- Periods ---
+    def _period_start(self, now: float) -> int:
+        return int(now // self.rotation_interval * self.rotation_interval)
+
+    def _kid(self, period_start: int) -> str:
+        return f"{self.algorithm.lower()}-{period_start}"
+
+    def _make_key(self, kid: str, period_start: int, private_pem: str) -> SigningKey:
+        not_after = period_start + self.rotation_interval
+        return SigningKey(
+            kid=kid,
+            algorithm=self.algorithm,
+            private_pem=private_pem,
+            public_jwk=_public_jwk(private_pem, self.algorithm, kid),
+            not_before=period_start,
+            not_after=not_after,
+            retain_until=not_after + self.token_lifetime,
+        )
+
+    # --- Storage ---
+    def _load_or_create_pem(self, kid: str) -> str:
+        if kid in self._pems:
+            return self._pems[kid]
+        if self.keys_dir is None:
+            pem = _generate_private_pem(self.algorithm)
+        else:
+            path = self.keys_dir / f"{kid}.pem"
+            if not path.exists():
+                self._create_pem_file(path)
+            pem = path.read_text()
+        self._pems[kid] = pem
+        return pem
+
+    def _create_pem_file(self, path: Path) -> None:
+        # Write to a temp file, then hard-link into place: the link fails if
+        # another worker won the race, and readers never see a partial file
+        self.keys_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.keys_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as handle:
+                handle.write(_generate_private_pem(self.algorithm))
+            os.chmod(tmp, 0o600)
+            try:
+                os.link(tmp, path)
+                logger.info("Created signing key %s", path.stem)
+            except FileExistsError:
+                pass
+        finally:
+            os.unlink(tmp)
+
+    def _existing_kids(self) -> list[str]:
+        if self.keys_dir is None or not self.keys_dir.exists():
+            return list(self._pems)
+        prefix = f"{self.algorithm.lower()}-"
+        return [p.stem for p in self.keys_dir.glob(f"{prefix}*.pem")]
+
+    # --- Rotation ---
+    def refresh(self, now: float | None = None) -> None:
+        """
+        Ensures the current (and, near the boundary, next) period's key
+        exists, picks up keys created by other workers and drops keys past
+        their retention.
+        """
+        now = time.time() if now is None else now
+        current = self._period_start(now)
+        periods = {current}
+        if current + self.rotation_interval - now <= self.prepublish:
+            periods.add(current + self.rotation_interval)
+        with self._lock:
+            for kid in self._existing_kids():
+                try:
+                    periods.add(int(kid.rsplit("-", 1)[1]))
+                except ValueError:
+                    continue
+            keys = {}
+            for period_start in sorted(periods):
+                kid = self._kid(period_start)
+                key = self._keys.get(kid)
+                if key is None:
+                    if period_start + self.rotation_interval + self.token_lifetime <= now:
+                        self._drop(kid)
+                        continue
+                    key = self._make_key(kid, period_start, self._load_or_create_pem(kid))
+                if key.retain_until <= now:
+                    self._drop(kid)
+                    continue
+                keys[kid] = key
+            self._keys = keys
+
+    def _drop(self, kid: str) -> None:
+        self._pems.pop(kid, None)
+        if self.keys_dir is not None:
+            try:
+                (self.keys_dir / f"{kid}.pem").unlink()
+                logger.info("Removed expired signing key %s", kid)
+            except FileNotFoundError:
+                pass
+
+    # --- Lookup ---
+    def _load_before_start(self, now: float | None = None) -> None:
+        # Scripts and tests use the ring without start(): load inline
+        logger.info("Loading signing keys inline (background rotation not started)")
+        self.refresh(now)
+
+    def signing_key(self) -> SigningKey:
+        """
+        Returns the key that signs new tokens right now.
+
+        Rotation is the background task's job: once started, a period's key
+        it has not loaded yet is not created here (key generation and file
+        I/O would block the caller); the newest key already in use keeps
+        signing meanwhile. Before start() the keys are loaded inline.
+        """
+        now = time.time()
+        kid = self._kid(self._period_start(now))
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        if self._task is None:
+            self._load_before_start(now)
+            return self._keys[kid]
+        key = max(
+            (key for key in self._keys.values() if key.not_before <= now),
+            key=lambda key: key.not_before,
+        )
+        if self._lagging_kid != kid:
+            self._lagging_kid = kid
+            logger.warning("Signing key %s not rotated in yet, still signing with %s", kid, key.kid)
+        return key
+
+    def verification_key(self, kid: str | None) -> SigningKey | None:
+        """
+        Returns the published key for kid, None if unknown. A miss reloads
+        the keys in case another worker just created it: on the event loop
+        the reload runs in a worker thread (file reads and key generation
+        would block the loop) and a later lookup finds the key; called from
+        a thread, it reloads inline and looks again.
+        """
+        if kid is None:
+            return None
+        key = self._keys.get(kid)
+        now = time.monotonic()
+        if key is None and now - self._last_miss_reload >= _MISS_RELOAD_INTERVAL:
+            self._last_miss_reload = now
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self._refresh_logged()
+                return self._keys.get(kid)
+            loop.run_in_executor(None, self._refresh_logged)
+        return key
+
+    def jwks(self) -> dict:
+        """
+        Returns the public JWKS of every retained key.
+        """
+        if not self._keys and self._task is None:
+            self._load_before_start()
+        return {"keys": [key.public_jwk for key in self._keys.values()]}
+
+    # --- Background rotation ---
+    def _refresh_logged(self) -> None:
+        try:
+            self.refresh()
+        except Exception as exc:
+            logger.warning("Signing key refresh failed: %s", exc)
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self._refresh_logged)
+
+    def start(self, interval: float) -> None:
+        """
+        Loads the keys and refreshes them every interval seconds in the background.
+        """
+        self.refresh()
+        self._task = asyncio.create_task(self._run(interval))
+
+    async def stop(self) -> None:
+        """
+        Cancels the background refresh task.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,206 @@
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+from app.core.metrics import Counter, registry
+
+# --- Request id of the request being handled (set by RequestIdMiddleware) ---
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = b"x-request-id"
+# Incoming ids are echoed into logs and headers, so only accept sane ones
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+# Chatty client libraries (one INFO line per outbound request)
+_QUIET_LOGGERS = ("httpx", "httpcore")
+
+log_records_dropped_total = registry.register(Counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full",
+))
+
+
+class RequestIdMiddleware:
+    """
+    Plain ASGI middleware giving every request an id: the caller's
+    X-Request-ID if it looks valid, otherwise a new one. The id is attached
+    to every log record emitted while handling the request and echoed in
+    the response's X-Request-ID header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                candidate = value.decode("latin-1")
+                if _VALID_REQUEST_ID.match(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append((REQUEST_ID_HEADER, request_id.encode()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Stamps the current request id on each record. Runs in the thread that
+    logged, before the record crosses the queue.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of high-volume events. A record opts in by
+    passing extra={"event": name}; rates maps event names to the fraction
+    kept (0..1). Warnings and errors are never sampled.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rates.get(getattr(record, "event", None))
+        return rate is None or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: ts, level, logger, message, request_id, any
+    extra= fields, and exc for tracebacks.
+    """
+
+    converter = time.gmtime
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks the caller and defers formatting.
+
+    The stock prepare() formats the message on the calling thread; here
+    msg/args travel as-is and are interpolated by the listener thread.
+    Only exception tracebacks are rendered up front, since they reference
+    live frames. When the queue is full the record is dropped and counted.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped_total.inc()
+
+
+_listener: QueueListener | None = None
+
+
+def parse_sample_rates(value: str) -> dict[str, float]:
+    """
+    Parses "event=rate,event=rate" (e.g. "auth.login_succeeded=0.1").
+    """
+    rates = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, rate = item.split("=", 1)
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+def setup_logging(level: str, fmt: str, queue_size: int, sample_rates: dict[str, float]) -> None:
+    """
+    Routes the root logger through a bounded queue to a background
+    listener thread that formats (JSON or text) and writes to stdout, so
+    request handlers never wait on log I/O.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if fmt == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+        ))
+
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(ContextFilter())
+    handler.addFilter(SamplingFilter(sample_rates))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level.upper())
+    for name in _QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """
+    Flushes queued records and stops the listener thread. Records logged
+    afterwards (late shutdown messages) are written synchronously.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        output = _listener.handlers[0]
+        output.addFilter(ContextFilter())
+        logging.getLogger().handlers = [output]
+        _listener = None
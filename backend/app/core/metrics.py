@@ -0,0 +1,262 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+# Default latency buckets (seconds), roughly Prometheus client defaults
+# with finer resolution below 10ms for JWT/DB timings
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """
+    Monotonic counter, optionally split by labels.
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in items
+        ]
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram, optionally split by labels. observe() is a
+    bisect plus two additions, cheap enough for every request.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labelvalues)
+            if series is None:
+                series = self._values[labelvalues] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *labelvalues: str) -> "_Timer":
+        """
+        Context manager observing the elapsed time of its block.
+        """
+        return _Timer(self, labelvalues)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._values.items()]
+        lines = []
+        for labels, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labelvalues: tuple[str, ...]):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labelvalues)
+
+
+class GaugeCallback:
+    """
+    Gauge computed at scrape time. fn returns {label values tuple: value}.
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        fn: Callable[[], dict[tuple[str, ...], float]],
+        labelnames: Iterable[str] = (),
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in self.fn().items()
+        ]
+
+
+class Registry:
+    """
+    Holds every metric of this process and renders the Prometheus text
+    exposition format. Each worker keeps its own registry, so scrape every
+    worker (or run one worker per container) for complete numbers.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram | GaugeCallback] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            try:
+                lines.extend(metric.samples())
+            except Exception:
+                # A failing callback gauge must not break the whole scrape
+                continue
+        return "\n".join(lines) + "\n"
+
+
+def _route_template(scope) -> str:
+    """
+    Returns the matched route's template (/users/{user_id}), prefixes
+    included.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    # Depending on the FastAPI version, a router included with a prefix
+    # matches on the path minus that prefix: the prefix is whatever comes
+    # before the part the route's own pattern matches
+    path = scope["path"]
+    for index, char in enumerate(path):
+        if char == "/" and route.path_regex.match(path[index:]):
+            return path[:index] + route.path
+    return route.path
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware recording latency and status per route.
+
+    Requests are labelled by their route template (/users/{id}, not the
+    raw path) so label cardinality stays bounded; paths that match no
+    route share the "unmatched" label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router records the match in the (shared) scope
+            label = _route_template(scope)
+            method = scope["method"]
+            http_request_duration_seconds.observe(time.perf_counter() - started, method, label)
+            http_requests_total.inc(method, label, str(status_code))
+
+
+registry = Registry()
+
+# --- HTTP ---
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status"),
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route"),
+))
+
+# --- JWT ---
+jwt_encode_seconds = registry.register(Histogram(
+    "jwt_encode_seconds", "Time spent signing access tokens",
+))
+jwt_decode_seconds = registry.register(Histogram(
+    "jwt_decode_seconds", "Time spent verifying access tokens (cache misses only)",
+))
+
+# --- OAuth callback ---
+oauth_callback_phase_seconds = registry.register(Histogram(
+    "oauth_callback_phase_seconds", "Google callback time per phase", ("phase",),
+))
+oauth_callback_coalesced_total = registry.register(Counter(
+    "oauth_callback_coalesced_total", "Callbacks that joined another callback's exchange or upsert", ("kind",),
+))
+
+# --- Database ---
+db_queries_total = registry.register(Counter(
+    "db_queries_total", "SQL statements executed", ("engine",),
+))
+db_query_duration_seconds = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement execution time", ("engine",),
+))
+db_pool_checkout_wait_seconds = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ("engine",),
+))
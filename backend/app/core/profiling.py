@@ -0,0 +1,242 @@
+import cProfile
+import hmac
+import heapq
+import io
+import itertools
+import logging
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter as StackCounter, deque
+from datetime import datetime, timezone
+
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+# Stack sampling period of the collapsed format (seconds)
+_SAMPLE_INTERVAL = 0.001
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread (the event loop) from a helper thread
+    and counts identical stacks, giving collapsed-stack lines
+    ("root;caller;callee count") for flamegraph.pl or speedscope.
+    While the loop holds the GIL the sampler only runs every switch
+    interval (5ms), so very short requests may get no samples.
+    """
+
+    def __init__(self, thread_id: int, interval: float = _SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: StackCounter[str] = StackCounter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stopped.set()
+        self._thread.join()
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    """
+    Profiles written to directory, plus an in-memory index of the top_n
+    slowest and the top_n most recent. A file is deleted once its profile
+    has left both lists, so the directory stays bounded.
+    """
+
+    def __init__(self, directory: str, top_n: int):
+        self.directory = directory
+        self.top_n = top_n
+        self._slowest: list[tuple[float, int, dict]] = []
+        self._recent: deque[dict] = deque()
+        self._by_id: dict[str, dict] = {}
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def add(self, record: dict, content: bytes) -> None:
+        """
+        Writes the profile file and indexes it. Blocking; run it off the
+        event loop.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(record["file"], "wb") as handle:
+            handle.write(content)
+        with self._lock:
+            self._by_id[record["id"]] = record
+            self._recent.append(record)
+            evicted = []
+            if len(self._recent) > self.top_n:
+                evicted.append(self._recent.popleft())
+            entry = (record["duration_ms"], next(self._order), record)
+            if len(self._slowest) < self.top_n:
+                heapq.heappush(self._slowest, entry)
+            else:
+                evicted.append(heapq.heappushpop(self._slowest, entry)[2])
+            kept = {item["id"] for item in self._recent} | {item[2]["id"] for item in self._slowest}
+            dropped = [item for item in evicted if item["id"] not in kept]
+            for item in dropped:
+                self._by_id.pop(item["id"], None)
+        for item in dropped:
+            try:
+                os.remove(item["file"])
+            except OSError:
+                pass
+
+    def get(self, profile_id: str) -> dict | None:
+        return self._by_id.get(profile_id)
+
+    def listing(self) -> dict:
+        with self._lock:
+            slowest = [item[2] for item in sorted(self._slowest, key=lambda item: -item[0])]
+            recent = list(reversed(self._recent))
+        return {"slowest": slowest, "recent": recent}
+
+
+def render_profile(record: dict, limit: int = 60) -> str:
+    """
+    Returns a profile as text: collapsed stacks as-is, cProfile output as
+    the top functions by cumulative time.
+    """
+    if record["format"] == "collapsed":
+        with open(record["file"], encoding="utf-8") as handle:
+            return handle.read()
+    out = io.StringIO()
+    pstats.Stats(record["file"], stream=out).sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+class ProfilingMiddleware:
+    """
+    Plain ASGI middleware profiling a sampled fraction of requests, and
+    any request whose X-Profile header carries the profiling token.
+
+    Profiles cover the event-loop thread only (threadpool work such as
+    sync DB sessions shows up as waiting) and include whatever other
+    requests ran concurrently, so profile under light load when you can.
+    One request is profiled at a time; profiled responses get an
+    X-Profile-Id header.
+    """
+
+    def __init__(self, app, store: ProfileStore, sample_rate: float, token: str, fmt: str):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.token = token.encode()
+        self.fmt = fmt
+        self._busy = False
+
+    def _trigger(self, scope) -> str | None:
+        # Reading profiles must not push real ones out of the recent list
+        if scope["path"].startswith("/debug/"):
+            return None
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER and hmac.compare_digest(value, self.token):
+                    return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        trigger = self._trigger(scope) if scope["type"] == "http" and not self._busy else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        self._busy = True
+        profile_id = uuid.uuid4().hex[:16]
+        response_status = 500
+        started_at = datetime.now(timezone.utc).isoformat()
+
+        async def send_wrapper(message):
+            nonlocal response_status
+            if message["type"] == "http.response.start":
+                response_status = message["status"]
+                message.setdefault("headers", []).append((PROFILE_ID_HEADER, profile_id.encode()))
+            await send(message)
+
+        if self.fmt == "collapsed":
+            profiler = StackSampler(threading.get_ident())
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            if self.fmt == "collapsed":
+                content = profiler.stop().encode()
+            else:
+                profiler.disable()
+                content = None
+            self._busy = False
+            record = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": response_status,
+                "duration_ms": round(duration * 1000, 3),
+                "trigger": trigger,
+                "format": self.fmt,
+                "started_at": started_at,
+                "file": os.path.join(
+                    self.store.directory,
+                    f"{profile_id}.{'collapsed' if self.fmt == 'collapsed' else 'prof'}",
+                ),
+            }
+            try:
+                if content is None:
+                    content = await run_in_threadpool(_marshal_stats, profiler)
+                await run_in_threadpool(self.store.add, record, content)
+            except Exception as exc:
+                logger.warning("Failed to save profile %s: %s", profile_id, exc)
+
+
+def _marshal_stats(profiler: cProfile.Profile) -> bytes:
+    # Same bytes dump_stats() would write, readable by pstats/snakeviz
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+
+def require_profiling_token(request: Request) -> None:
+    """
+    Dependency guarding the profile endpoints: the X-Profile header must
+    carry PROFILING_TOKEN.
+    """
+    token = settings.PROFILING_TOKEN.encode()
+    presented = request.headers.get("x-profile", "").encode()
+    if not token or not hmac.compare_digest(presented, token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed")
@@ -0,0 +1,339 @@
+import ipaddress
+import json
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+
+from app.core.config import settings
+from app.core.metrics import Counter, GaugeCallback, registry
+from app.core.shared_store import SharedStore, get_shared_store
+from jose import JWTError
+
+logger = logging.getLogger(__name__)
+
+# Throttled routes (matched against the full path)
+LOGIN_ROUTE = re.compile(r"/auth/login/google$")
+CALLBACK_ROUTE = re.compile(r"/auth/callback/google$")
+VALIDATE_ROUTE = re.compile(r"/auth/validate(/batch)?$")
+# Per-sub limits only apply where the caller's own token is the subject:
+# the batch route carries other users' tokens in its body, so it is only
+# limited per IP (and by VALIDATE_BATCH_MAX_SIZE)
+VALIDATE_SINGLE_ROUTE = re.compile(r"/auth/validate$")
+
+rate_limited_total = registry.register(Counter(
+    "rate_limited_total", "Requests rejected by the rate limiter", ("rule", "key"),
+))
+
+
+class _Window:
+    """
+    Counters of one key: hits in the current fixed window and the one
+    before it. Three slots per key, whatever the request rate.
+    """
+
+    __slots__ = ("index", "previous", "current")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.previous = 0
+        self.current = 0
+
+
+def _estimate(previous: int, current: int, elapsed: float, window: float) -> float:
+    # Sliding window approximation: the previous window's hits are weighted
+    # by how much of it still overlaps the last `window` seconds
+    return previous * (1 - elapsed / window) + current
+
+
+class SlidingWindowLimiter:
+    """
+    Per-key sliding-window counter (two fixed windows, weighted).
+
+    Memory is bounded: at most max_keys keys are tracked and the least
+    recently seen one is evicted first. A key idle for two windows has no
+    effect on decisions any more, so idle keys are what gets evicted in
+    practice. Only used from the event loop, so no locking.
+    """
+
+    def __init__(self, limit: int, window: float, max_keys: int):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self.evictions = 0
+        self._keys: OrderedDict[str, _Window] = OrderedDict()
+
+    def check(self, key: str, now: float | None = None) -> float:
+        """
+        Returns 0 if one more request for key is allowed, otherwise the
+        seconds until the caller should retry. Counts nothing.
+        """
+        now = time.time() if now is None else now
+        index = int(now // self.window)
+        entry = self._keys.get(key)
+        if entry is None:
+            previous = current = 0
+        elif index == entry.index:
+            previous, current = entry.previous, entry.current
+        else:
+            previous, current = (entry.current if index == entry.index + 1 else 0), 0
+
+        elapsed = now - index * self.window
+        if _estimate(previous, current, elapsed, self.window) >= self.limit:
+            return self.window - elapsed
+        return 0.0
+
+    def record(self, key: str, now: float | None = None) -> None:
+        """
+        Counts one request for key.
+        """
+        now = time.time() if now is None else now
+        index = int(now // self.window)
+        entry = self._keys.get(key)
+        if entry is None:
+            entry = _Window(index)
+            self._keys[key] = entry
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._keys.move_to_end(key)
+            if index != entry.index:
+                entry.previous = entry.current if index == entry.index + 1 else 0
+                entry.current = 0
+                entry.index = index
+        entry.current += 1
+
+    def hit(self, key: str, now: float | None = None) -> float:
+        """
+        check() and, if allowed, record() in one step. Rejected hits are
+        not counted.
+        """
+        retry_after = self.check(key, now)
+        if not retry_after:
+            self.record(key, now)
+        return retry_after
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class SharedWindowLimiter:
+    """
+    Same sliding window kept in the shared store, so every worker sees the
+    same counts: one counter per key and fixed window, bumped with an
+    atomic INCR and expiring after two windows. check() and record() are
+    separate round trips, so requests racing on other workers can overshoot
+    the limit by the number in flight.
+
+    If the store is unreachable the decision falls back to the local
+    limiter instead of failing the request.
+    """
+
+    prefix = "ratelimit:"
+
+    def __init__(self, store: SharedStore, local: SlidingWindowLimiter):
+        self._store = store
+        self._local = local
+        self.limit = local.limit
+        self.window = local.window
+
+    async def check(self, key: str) -> float:
+        now = time.time()
+        index = int(now // self.window)
+        base = f"{self.prefix}{key}:"
+        try:
+            current = int(await self._store.get(f"{base}{index}") or 0)
+            previous = int(await self._store.get(f"{base}{index - 1}") or 0)
+        except Exception as e:
+            logger.warning("Shared rate limit store failed, using local counts: %s", e)
+            return self._local.check(key, now)
+        elapsed = now - index * self.window
+        if _estimate(previous, current, elapsed, self.window) >= self.limit:
+            return self.window - elapsed
+        return 0.0
+
+    async def record(self, key: str) -> None:
+        now = time.time()
+        try:
+            await self._store.incr(f"{self.prefix}{key}:{int(now // self.window)}", ttl=self.window * 2)
+        except Exception as e:
+            logger.warning("Shared rate limit store failed, using local counts: %s", e)
+            self._local.record(key, now)
+
+
+class RateLimitRule:
+    """
+    One limit: requests to paths matching pattern, counted per client IP
+    ("ip") or per access-token subject ("sub").
+    """
+
+    def __init__(
+        self,
+        name: str,
+        pattern: re.Pattern,
+        key: str,
+        local: SlidingWindowLimiter,
+        shared: SharedWindowLimiter | None = None,
+    ):
+        self.name = name
+        self.pattern = pattern
+        self.key = key
+        self.local = local
+        self.shared = shared
+        self.rejected = 0
+
+    async def check(self, client: str) -> float:
+        """
+        Returns 0 if client may make one more request, otherwise the
+        Retry-After seconds. Counts nothing; see record().
+        """
+        key = f"{self.name}:{client}"
+        if self.shared is not None:
+            return await self.shared.check(key)
+        return self.local.check(key)
+
+    async def record(self, client: str) -> None:
+        """
+        Counts a request from client.
+        """
+        key = f"{self.name}:{client}"
+        if self.shared is not None:
+            await self.shared.record(key)
+        else:
+            self.local.record(key)
+
+    def stats(self) -> dict:
+        return {
+            "key": self.key,
+            "limit": self.local.limit,
+            "window_seconds": self.local.window,
+            "shared": self.shared is not None,
+            "tracked_keys": len(self.local),
+            "evictions": self.local.evictions,
+            "rejected": self.rejected,
+        }
+
+
+def _bearer_subject(scope) -> str | None:
+    """
+    Returns `sub` of a valid bearer token, or None. The token is verified
+    (through the verified-token cache, so the route's own check is then a
+    cache hit): with an unverified sub anyone could exhaust another user's
+    bucket. Requests without a valid token only count against the per-IP
+    limit.
+    """
+    from app.core.security import decode_access_token
+
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return None
+            try:
+                sub = decode_access_token(token).get("sub")
+            except JWTError:
+                return None
+            return str(sub) if sub is not None else None
+    return None
+
+
+def _allowlisted(client: str | None, allowlist) -> bool:
+    if client is None or not allowlist:
+        return False
+    try:
+        address = ipaddress.ip_address(client)
+    except ValueError:
+        return False
+    return any(address in network for network in allowlist)
+
+
+class RateLimitMiddleware:
+    """
+    Plain ASGI middleware applying every matching rule to a request; the
+    first rule over its limit answers 429 with Retry-After. A request is
+    counted against its rules only once all of them allow it, so a client
+    rejected by one rule doesn't use up its budget in the others. Runs
+    before admission control, so throttled clients never take a slot.
+    Clients in allowlist (IP networks) are never limited.
+
+    The client IP is scope["client"]; behind a proxy run uvicorn with
+    --proxy-headers (and --forwarded-allow-ips) so it is the real one.
+    """
+
+    def __init__(self, app, rules: list[RateLimitRule], allowlist=()):
+        self.app = app
+        self.rules = rules
+        self.allowlist = list(allowlist)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        client = scope["client"][0] if scope.get("client") else None
+        if _allowlisted(client, self.allowlist):
+            await self.app(scope, receive, send)
+            return
+
+        matched = []
+        for rule in self.rules:
+            if not rule.pattern.search(path):
+                continue
+            key = client if rule.key == "ip" else _bearer_subject(scope)
+            if key is None:
+                continue
+            retry_after = await rule.check(key)
+            if retry_after:
+                rule.rejected += 1
+                rate_limited_total.inc(rule.name, rule.key)
+                await self._reject(send, retry_after)
+                return
+            matched.append((rule, key))
+        for rule, key in matched:
+            await rule.record(key)
+        await self.app(scope, receive, send)
+
+    async def _reject(self, send, retry_after: float) -> None:
+        body = json.dumps({"detail": "Too many requests"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def create_rate_limit_rules() -> list[RateLimitRule]:
+    """
+    Builds the per-route rules from Settings (a limit of 0 disables that
+    rule) and publishes the tracked-keys gauge.
+    """
+    shared = get_shared_store() if settings.RATE_LIMIT_SHARED else None
+    if settings.RATE_LIMIT_SHARED and shared is None:
+        raise RuntimeError("RATE_LIMIT_SHARED requires SHARED_STORE_URL")
+
+    rules = []
+    for name, pattern, key, limit in (
+        ("login_ip", LOGIN_ROUTE, "ip", settings.RATE_LIMIT_LOGIN_PER_IP),
+        ("callback_ip", CALLBACK_ROUTE, "ip", settings.RATE_LIMIT_CALLBACK_PER_IP),
+        ("validate_ip", VALIDATE_ROUTE, "ip", settings.RATE_LIMIT_VALIDATE_PER_IP),
+        ("validate_sub", VALIDATE_SINGLE_ROUTE, "sub", settings.RATE_LIMIT_VALIDATE_PER_SUB),
+    ):
+        if limit <= 0:
+            continue
+        local = SlidingWindowLimiter(limit, settings.RATE_LIMIT_WINDOW_SECONDS, settings.RATE_LIMIT_MAX_KEYS)
+        remote = SharedWindowLimiter(shared, local) if shared is not None else None
+        rules.append(RateLimitRule(name, pattern, key, local, remote))
+
+    registry.register(GaugeCallback(
+        "rate_limit_tracked_keys", "Client keys tracked in memory per rate limit rule",
+        lambda: {(rule.name,): len(rule.local) for rule in rules}, ("rule",),
+    ))
+    return rules
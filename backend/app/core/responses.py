@@ -0,0 +1,67 @@
+import json
+from datetime import date, time
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is used instead
+    orjson = None
+
+ORJSON_AVAILABLE = orjson is not None
+
+
+def _default(value: Any) -> str:
+    # ISO 8601 for dates and times, as orjson writes them
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serializes plain JSON data (dicts, lists, str/int/float/bool/None,
+    UUID and datetime) to compact UTF-8 bytes.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson (stdlib json without it).
+
+    Used as the app's default_response_class for routes that return plain
+    dicts without a response_model. Routes that do declare a response_model
+    are better off with FastAPI's own path, which serializes straight from
+    pydantic-core; an explicit default_response_class turns that path off,
+    so hot routes with a model return model_response() instead.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(content: Any, status_code: int = 200, headers: dict | None = None) -> Response:
+    """
+    Response for data already shaped like the route's response_model,
+    skipping FastAPI's validate-then-serialize pass.
+    """
+    return Response(dumps(content), status_code=status_code, headers=headers, media_type="application/json")
+
+
+def model_response(model: BaseModel, status_code: int = 200, headers: dict | None = None) -> Response:
+    """
+    Response for a model instance, serialized once with its own pydantic
+    serializer (no re-validation against the response_model).
+    """
+    return Response(
+        model.__pydantic_serializer__.to_json(model),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
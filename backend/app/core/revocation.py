@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.database import DbSession, dialect_insert, session_scope
+from app.db.models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+def _epoch(value: datetime) -> float:
+    # SQLite hands back naive datetimes; everything is stored in UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+# --- Sync queries (psycopg2 Session) ---
+
+def _insert_sync(db: Session, statement) -> None:
+    db.execute(statement)
+    db.commit()
+
+def _fetch_since_sync(db: Session, statement) -> list:
+    return db.execute(statement).all()
+
+def _prune_sync(db: Session, statement) -> int:
+    result = db.execute(statement)
+    db.commit()
+    return result.rowcount
+
+
+class RevocationList:
+    """
+    Denylist of revoked token ids (jti).
+
+    The revoked_tokens table is the source of truth; every worker mirrors
+    the unexpired entries in a hash set so is_revoked() is an O(1) lookup
+    with no DB access. Each sync re-reads the rows revoked since `lookback`
+    seconds before the previous sync, and entries are pruned once their
+    exp has passed.
+    """
+
+    def __init__(self):
+        self._revoked: dict[str, float] = {}
+        self._synced_at: float | None = None
+        self.lookback = 60.0
+        self._task: asyncio.Task | None = None
+
+    def is_revoked(self, jti: str | None) -> bool:
+        """
+        Returns True if jti has been revoked and has not expired yet.
+        """
+        return jti is not None and jti in self._revoked
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    async def revoke(self, db: DbSession, jti: str, expires_at: float) -> None:
+        """
+        Persists a revocation and applies it to this worker immediately.
+        Other workers pick it up on their next sync.
+        """
+        self._revoked[jti] = expires_at
+        statement = (
+            dialect_insert(db)(RevokedToken)
+            .values(jti=jti, expires_at=datetime.fromtimestamp(expires_at, timezone.utc))
+            .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+        )
+        if not isinstance(db, AsyncSession):
+            await run_in_threadpool(_insert_sync, db, statement)
+        else:
+            await db.execute(statement)
+            await db.commit()
+
+    async def sync(self, db: DbSession) -> int:
+        """
+        Pulls revocations recorded since the last sync and drops expired
+        entries from the in-memory set. Returns the number of new entries.
+
+        Rows become visible when their transaction commits, not in id or
+        revoked_at order, so a high-water mark would skip a row committed
+        after a newer one. Instead the last `lookback` seconds before the
+        previous sync are read again (known jtis are skipped); this also
+        absorbs clock skew between the workers and the database.
+        """
+        started = time.time()
+        statement = select(RevokedToken.jti, RevokedToken.expires_at)
+        if self._synced_at is None:
+            statement = statement.where(RevokedToken.expires_at > datetime.fromtimestamp(started, timezone.utc))
+        else:
+            cutoff = datetime.fromtimestamp(self._synced_at - self.lookback, timezone.utc)
+            statement = statement.where(RevokedToken.revoked_at >= cutoff)
+        if not isinstance(db, AsyncSession):
+            rows = await run_in_threadpool(_fetch_since_sync, db, statement)
+        else:
+            rows = (await db.execute(statement)).all()
+        self._synced_at = started
+
+        now = time.time()
+        added = 0
+        for jti, expires_at in rows:
+            exp = _epoch(expires_at)
+            if exp > now and jti not in self._revoked:
+                self._revoked[jti] = exp
+                added += 1
+        self._prune_memory(now)
+        return added
+
+    def _prune_memory(self, now: float) -> None:
+        expired = [jti for jti, exp in self._revoked.items() if exp <= now]
+        for jti in expired:
+            del self._revoked[jti]
+
+    async def prune(self, db: DbSession) -> int:
+        """
+        Deletes rows whose token has expired. Returns the number removed.
+        """
+        statement = delete(RevokedToken).where(RevokedToken.expires_at <= datetime.now(timezone.utc))
+        if not isinstance(db, AsyncSession):
+            return await run_in_threadpool(_prune_sync, db, statement)
+        result = await db.execute(statement)
+        await db.commit()
+        return result.rowcount
+
+    # --- Background sync ---
+    async def _run(self, interval: float, prune_every: int) -> None:
+        ticks = 0
+        while True:
+            await asyncio.sleep(interval)
+            ticks += 1
+            try:
+                async with session_scope() as db:
+                    await self.sync(db)
+                    if ticks % prune_every == 0:
+                        await self.prune(db)
+            except Exception as exc:
+                logger.warning("Revocation list sync failed: %s", exc)
+
+    async def start(self, interval: float, prune_interval: float, lookback: float = 60.0) -> None:
+        """
+        Loads current revocations, then syncs every interval seconds and
+        prunes expired rows every prune_interval seconds.
+        """
+        self.lookback = lookback
+        try:
+            async with session_scope() as db:
+                await self.sync(db)
+        except Exception as exc:
+            logger.warning("Initial revocation list load failed: %s", exc)
+        prune_every = max(1, int(prune_interval // interval))
+        self._task = asyncio.create_task(self._run(interval, prune_every))
+
+    async def stop(self) -> None:
+        """
+        Cancels the background sync task.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+revocation_list = RevocationList()
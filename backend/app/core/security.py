@@ -1,14 +1,52 @@
+import hashlib
+import time
+import uuid
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Annotated
-from jose import JWTError, jwt
+from jose import ExpiredSignatureError, JWTError, jwt
+from jose.exceptions import JWTClaimsError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.core.config import settings
+from app.core.cache import TTLCache
+from app.core.config import LazyObject, settings
+from app.core.keys import ASYMMETRIC_ALGORITHMS, KeyRing
+from app.core.metrics import jwt_decode_seconds, jwt_encode_seconds
+from app.core.revocation import revocation_list
+from app.core.tracing import traced
 
 # Initialize HTTPBearer for token extraction
 security = HTTPBearer()
 
+@lru_cache()
+def get_key_ring() -> KeyRing:
+    """
+    Rotating key pairs for ES256/RS256 (unused with HS256).
+    """
+    return KeyRing(
+        algorithm=settings.ALGORITHM,
+        rotation_interval=settings.JWT_KEY_ROTATION_SECONDS,
+        prepublish=settings.JWT_KEY_PREPUBLISH_SECONDS,
+        token_lifetime=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        keys_dir=settings.JWT_KEYS_DIR,
+    )
+
+@lru_cache()
+def get_token_cache() -> TTLCache:
+    """
+    Verified-token cache: sha256(token) -> decoded payload.
+    """
+    return TTLCache(
+        maxsize=settings.TOKEN_CACHE_MAXSIZE,
+        ttl=settings.TOKEN_CACHE_TTL_SECONDS,
+    )
+
+# Built from Settings on first use, not at import
+key_ring = LazyObject(get_key_ring)
+token_cache = LazyObject(get_token_cache)
 
+
+@traced("jwt.create_access_token")
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     """
     Generates a JWT access token with specified expiration time.
@@ -28,13 +66,94 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
     
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
-    )
+    # jti identifies the token in the revocation list
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
+    with jwt_encode_seconds.time():
+        if settings.ALGORITHM in ASYMMETRIC_ALGORITHMS:
+            signing_key = key_ring.signing_key()
+            return jwt.encode(
+                to_encode,
+                signing_key.private_pem,
+                algorithm=signing_key.algorithm,
+                headers={"kid": signing_key.kid},
+            )
+        encoded_jwt = jwt.encode(
+            to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+        )
     return encoded_jwt
 
 
+def _verify_signature(token: str) -> dict:
+    """
+    Runs the full jwt.decode, picking the public key by the token's kid
+    when signing with a key pair.
+    """
+    with jwt_decode_seconds.time():
+        if settings.ALGORITHM in ASYMMETRIC_ALGORITHMS:
+            verification_key = key_ring.verification_key(jwt.get_unverified_header(token).get("kid"))
+            if verification_key is None:
+                raise JWTError("Unknown signing key")
+            return jwt.decode(token, verification_key.public_jwk, algorithms=[verification_key.algorithm])
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+
+class TokenRevokedError(JWTError):
+    """
+    Raised for a validly signed token whose jti has been revoked.
+    """
+
+
+def _verify_cached(token: str) -> dict:
+    if not settings.TOKEN_CACHE_ENABLED:
+        return _verify_signature(token)
+
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        return dict(payload)
+
+    payload = _verify_signature(token)
+    # Never keep an entry past the token's own expiry
+    exp = payload.get("exp")
+    ttl = exp - time.time() if exp is not None else None
+    token_cache.set(key, payload, ttl=ttl)
+    return dict(payload)
+
+
+def decode_access_token(token: str) -> dict:
+    """
+    Decodes and verifies a JWT, serving repeated tokens from the
+    verified-token cache instead of re-running the signature check,
+    then rejects it if its jti is in the (in-memory) revocation list.
+
+    Args:
+        token: The encoded JWT
+
+    Returns:
+        dict: The decoded JWT payload
+
+    Raises:
+        JWTError: If token is invalid, expired or revoked
+    """
+    payload = _verify_cached(token)
+    if revocation_list.is_revoked(payload.get("jti")):
+        raise TokenRevokedError("Token has been revoked")
+    return payload
+
+
+def token_error_reason(exc: JWTError) -> str:
+    """
+    Maps a decode failure to a short machine-readable reason.
+    """
+    if isinstance(exc, TokenRevokedError):
+        return "revoked"
+    if isinstance(exc, ExpiredSignatureError):
+        return "expired"
+    if isinstance(exc, JWTClaimsError):
+        return "invalid_claims"
+    return "invalid_token"
+
+
 async def verify_access_token(
     credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)]
 ) -> dict:
@@ -58,12 +177,7 @@ async def verify_access_token(
     )
 
     try:
-        payload = jwt.decode(
-            credentials.credentials,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
-        return payload
+        return decode_access_token(credentials.credentials)
     except JWTError:
         raise credentials_exception
 
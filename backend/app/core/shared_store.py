@@ -0,0 +1,154 @@
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+from app.core.config import settings
+
+
+class SharedStore(ABC):
+    """
+    Minimal key/value interface for state shared between workers.
+
+    Implementations store raw strings with an optional TTL in seconds.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> str | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: float | None = None) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def pop(self, key: str) -> str | None:
+        """
+        Atomically returns and deletes key, so only one caller gets it.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def incr(self, key: str, ttl: float | None = None) -> int:
+        """
+        Atomically increments the integer at key (0 if missing) and returns
+        the new value. ttl is applied when the key is created.
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemorySharedStore(SharedStore):
+    """
+    Local stand-in for a shared backend. Only shared within one process,
+    which is enough for tests and single-worker development.
+    """
+
+    def __init__(self):
+        self._data: dict[str, tuple[float | None, str]] = {}
+
+    def _alive(self, key: str) -> tuple[float | None, str] | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, _ = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    async def get(self, key: str) -> str | None:
+        entry = self._alive(key)
+        return entry[1] if entry else None
+
+    async def set(self, key: str, value: str, ttl: float | None = None) -> None:
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._data[key] = (expires_at, value)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    async def pop(self, key: str) -> str | None:
+        entry = self._alive(key)
+        if entry is None:
+            return None
+        del self._data[key]
+        return entry[1]
+
+    async def incr(self, key: str, ttl: float | None = None) -> int:
+        entry = self._alive(key)
+        if entry is None:
+            entry = (time.monotonic() + ttl if ttl else None, "0")
+        value = int(entry[1]) + 1
+        self._data[key] = (entry[0], str(value))
+        return value
+
+
+class RedisSharedStore(SharedStore):
+    """
+    Redis-backed store. Requires the optional `redis` package.
+    """
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError(
+                "SHARED_STORE_URL points at Redis but the 'redis' package is not installed"
+            ) from exc
+        self._client = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> str | None:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: str, ttl: float | None = None) -> None:
+        await self._client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._client.delete(*keys)
+
+    async def pop(self, key: str) -> str | None:
+        # GETDEL (Redis >= 6.2) is atomic across clients
+        return await self._client.getdel(key)
+
+    async def incr(self, key: str, ttl: float | None = None) -> int:
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.incr(key)
+            if ttl:
+                # NX (Redis >= 7) keeps the expiry set by the first increment
+                pipe.pexpire(key, int(ttl * 1000), nx=True)
+            value, *_ = await pipe.execute()
+        return value
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def create_shared_store(url: str) -> SharedStore:
+    """
+    Builds a store from a URL: "memory://" for the local stand-in,
+    "redis://" or "rediss://" for Redis.
+    """
+    if url.startswith("memory://"):
+        return InMemorySharedStore()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSharedStore(url)
+    raise ValueError(f"Unsupported SHARED_STORE_URL scheme: {url}")
+
+
+@lru_cache()
+def get_shared_store() -> SharedStore | None:
+    """
+    Returns the process-wide shared store, or None when SHARED_STORE_URL
+    is not configured.
+    """
+    if not settings.SHARED_STORE_URL:
+        return None
+    return create_shared_store(settings.SHARED_STORE_URL)
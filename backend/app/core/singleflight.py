@@ -0,0 +1,50 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.core.cache import TTLCache
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one execution.
+
+    The first caller for a key starts fn() as its own task; callers that
+    arrive while it runs await the same task and get the same result or
+    exception. The task is shielded, so a caller that goes away (client
+    disconnect) doesn't cancel the work for the others.
+
+    With remember > 0 a successful result is also served to callers that
+    arrive up to remember seconds after it finished.
+    """
+
+    def __init__(self, remember: float = 0, maxsize: int = 10_000):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self._recent = TTLCache(maxsize=maxsize, ttl=remember) if remember > 0 else None
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """
+        Runs fn() once per key at a time. Returns (result, shared), where
+        shared is True if this caller reused another caller's execution.
+        """
+        if self._recent is not None:
+            result = self._recent.get(key)
+            if result is not None:
+                return result, True
+        task = self._inflight.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task), shared
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if task.cancelled():
+            return
+        # Retrieve the exception even if every waiter has gone away
+        if task.exception() is None and self._recent is not None:
+            self._recent.set(key, task.result())
+
+    def __len__(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,310 @@
+import functools
+import inspect
+import json
+import logging
+import queue
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+from app.core.metrics import Counter, _route_template, registry
+
+logger = logging.getLogger(__name__)
+
+# --- W3C Trace Context (https://www.w3.org/TR/trace-context/) ---
+TRACEPARENT_HEADER = b"traceparent"
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+spans_dropped_total = registry.register(Counter(
+    "spans_dropped_total", "Finished spans dropped because the export queue was full",
+))
+
+
+class Span:
+    """
+    One timed operation, shaped like an OpenTelemetry span: 128-bit trace
+    id, 64-bit span id, parent span id, kind, nanosecond start/end times,
+    attributes and a status. Unsampled spans still carry ids (so the trace
+    context keeps propagating) but are never exported.
+    """
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "kind", "sampled",
+        "start_ns", "end_ns", "attributes", "status", "status_message",
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: str | None, sampled: bool, kind: str):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.kind = kind
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+        self.attributes: dict[str, Any] = {}
+        self.status = "UNSET"
+        self.status_message: str | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, exc: BaseException) -> None:
+        self.status = "ERROR"
+        self.status_message = f"{type(exc).__name__}: {exc}"
+
+    @property
+    def duration_ms(self) -> float | None:
+        return None if self.end_ns is None else (self.end_ns - self.start_ns) / 1e6
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.status_message},
+        }
+
+
+# --- Exporters ---
+
+class SpanExporter(ABC):
+    """
+    Receives every finished, sampled span. export() is called on the
+    request path, so implementations must not block.
+    """
+
+    @abstractmethod
+    def export(self, span: Span) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    """
+    Keeps the last maxlen finished spans, for tests and local debugging.
+    """
+
+    def __init__(self, maxlen: int = 10_000):
+        self.spans: deque[Span] = deque(maxlen=maxlen)
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def find(self, name: str) -> list[Span]:
+        return [span for span in self.spans if span.name == name]
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+
+class FileSpanExporter(SpanExporter):
+    """
+    Appends spans as JSON lines to path from a background thread. Spans
+    wait in a bounded queue; when it is full they are dropped and counted.
+    """
+
+    def __init__(self, path: str, queue_size: int = 10_000):
+        self.path = path
+        self._queue: queue.Queue[Span | None] = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            spans_dropped_total.inc()
+
+    def _run(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as handle:
+            while True:
+                span = self._queue.get()
+                if span is None:
+                    return
+                handle.write(json.dumps(span.to_dict(), default=str) + "\n")
+                if self._queue.empty():
+                    handle.flush()
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+
+# --- Tracer ---
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+def parse_traceparent(value: str) -> tuple[str, str, bool] | None:
+    """
+    Returns (trace_id, parent span id, sampled) from a traceparent header,
+    or None if it is malformed.
+    """
+    match = _TRACEPARENT.match(value.strip())
+    if match is None or match.group(1) == _INVALID_TRACE_ID or match.group(2) == _INVALID_SPAN_ID:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+class Tracer:
+    """
+    Creates spans in the current context. Root spans are sampled at
+    sample_rate; children follow their parent (and a remote parent's
+    sampled flag), so a trace is recorded whole or not at all.
+    """
+
+    def __init__(self, exporter: SpanExporter | None = None, sample_rate: float = 1.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    @contextmanager
+    def start_span(
+        self,
+        name: str,
+        attributes: dict | None = None,
+        kind: str = "INTERNAL",
+        remote_parent: tuple[str, str, bool] | None = None,
+    ) -> Iterator[Span]:
+        """
+        Runs the block inside a new span, child of the current one (or of
+        remote_parent, parsed from an incoming traceparent). Exceptions
+        mark the span as failed and propagate.
+        """
+        parent = _current_span.get()
+        if remote_parent is not None:
+            trace_id, parent_id, sampled = remote_parent
+        elif parent is not None:
+            trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = self.exporter is not None and random.random() < self.sample_rate
+        span = Span(name, trace_id, parent_id, sampled and self.exporter is not None, kind)
+        if attributes:
+            span.attributes.update(attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.set_error(exc)
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+            exporter = self.exporter
+            if span.sampled and exporter is not None:
+                exporter.export(span)
+
+
+tracer = Tracer()
+
+
+def configure_tracing(exporter: SpanExporter | None, sample_rate: float) -> None:
+    """
+    Installs the exporter used by every span from now on (None disables
+    recording; trace context still propagates).
+    """
+    if tracer.exporter is not None and tracer.exporter is not exporter:
+        tracer.exporter.shutdown()
+    tracer.exporter = exporter
+    tracer.sample_rate = sample_rate
+
+
+def create_exporter(name: str, path: str) -> SpanExporter | None:
+    """
+    Builds the exporter named by TRACING_EXPORTER.
+    """
+    if name == "none":
+        return None
+    if name == "memory":
+        return InMemorySpanExporter()
+    if name == "file":
+        return FileSpanExporter(path)
+    raise ValueError(f"Unsupported TRACING_EXPORTER: {name}")
+
+
+def traced(name: str):
+    """
+    Decorator running a sync or async function inside a span.
+    """
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.start_span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.start_span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def inject_traceparent(headers) -> None:
+    """
+    Adds the current span's traceparent to outbound request headers.
+    """
+    span = _current_span.get()
+    if span is not None:
+        headers["traceparent"] = span.traceparent()
+
+
+class TracingMiddleware:
+    """
+    Plain ASGI middleware opening a SERVER span per request, continuing
+    the caller's trace when it sends a valid traceparent header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        remote_parent = None
+        for name, value in scope["headers"]:
+            if name == TRACEPARENT_HEADER:
+                remote_parent = parse_traceparent(value.decode("latin-1"))
+                break
+
+        attributes = {"http.request.method": scope["method"], "url.path": scope["path"]}
+        with tracer.start_span(f"{scope['method']} {scope['path']}", attributes, "SERVER", remote_parent) as span:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.status = "ERROR"
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # Name by route template once routing has run (low cardinality)
+                span.name = f"{scope['method']} {_route_template(scope)}"
@@ -1,23 +1,344 @@
-from sqlalchemy import create_engine 
-from sqlalchemy.orm import sessionmaker
+import random
+import time
+from contextlib import asynccontextmanager
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Delete, Insert, Update, create_engine, event
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine, URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlalchemy.ext.declarative import declarative_base
-from app.core.config import settings 
+from app.core.config import settings
+from app.core.metrics import (
+    GaugeCallback, db_pool_checkout_wait_seconds, db_queries_total,
+    db_query_duration_seconds, registry,
+)
+
+# --- Async driver for each sync driver we support ---
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+# --- Either flavour of session a route may receive ---
+DbSession = AsyncSession | Session
+
+
+def to_async_url(url: str) -> str:
+    """
+        Returns url with its driver swapped for the async equivalent
+    """
+    parsed = make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+def get_async_database_url() -> str:
+    """
+        Returns the async database URL , derived from DATABASE_URL
+        when ASYNC_DATABASE_URL is not set explicitly
+    """
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    return to_async_url(settings.DATABASE_URL)
+
+
+class TimedQueuePool(QueuePool):
+    """
+        QueuePool that records how long each checkout waited for a connection
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait_seconds.observe(time.perf_counter() - started, self.logging_name or "")
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+        AsyncAdaptedQueuePool that records checkout wait , see TimedQueuePool
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait_seconds.observe(time.perf_counter() - started, self.logging_name or "")
+
+
+def _engine_kwargs(url: URL, name: str) -> dict:
+    """
+        Pool and connection settings from Settings for one engine
+    """
+    kwargs = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if url.get_backend_name() == "sqlite":
+        return kwargs
+    kwargs.update(
+        poolclass=TimedAsyncQueuePool if url.get_driver_name() == "asyncpg" else TimedQueuePool,
+        # The pool's logging name doubles as its metrics label
+        pool_logging_name=name,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_use_lifo=settings.DB_POOL_USE_LIFO,
+    )
+    # Connect/statement timeouts are spelled differently per driver
+    if url.get_driver_name() == "asyncpg":
+        connect_args = {"timeout": settings.DB_CONNECT_TIMEOUT_SECONDS}
+        if settings.DB_STATEMENT_TIMEOUT_MS:
+            connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+    else:
+        connect_args = {"connect_timeout": int(settings.DB_CONNECT_TIMEOUT_SECONDS)}
+        if settings.DB_STATEMENT_TIMEOUT_MS:
+            connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+    kwargs["connect_args"] = connect_args
+    return kwargs
+
+
+def _instrument(sync_engine: Engine, name: str) -> None:
+    """
+        Counts and times every statement run on sync_engine
+    """
+    # The start time lives on the statement's execution context, which is
+    # dropped with it, so statements that fail leave nothing behind
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_started", None)
+        if started is None:
+            return
+        db_queries_total.inc(name)
+        db_query_duration_seconds.observe(time.perf_counter() - started, name)
+
+
+def _create_engine(url: str, name: str) -> Engine:
+    created = create_engine(url, **_engine_kwargs(make_url(url), name))
+    _instrument(created, name)
+    return created
+
+
+def _create_async_engine(url: str, name: str) -> AsyncEngine:
+    created = create_async_engine(url, **_engine_kwargs(make_url(url), name))
+    _instrument(created.sync_engine, name)
+    return created
+
+
+class RoutingSession(Session):
+    """
+        Sends reads to a read replica and writes to the primary.
+
+        Each session sticks to one replica. Once a session has written (or
+        flushed) every later statement goes to the primary too, so it
+        reads its own writes despite replication lag. use_primary() pins
+        a session to the primary up front.
+    """
+
+    def __init__(self, *args, primary: Engine, replicas: list[Engine], **kwargs):
+        super().__init__(*args, **kwargs)
+        self.primary = primary
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if isinstance(clause, (Insert, Update, Delete)):
+            self.info["use_primary"] = True
+        if self.info.get("use_primary") or clause is None:
+            return self.primary
+        if "replica" not in self.info:
+            self.info["replica"] = random.choice(self.replicas)
+        return self.info["replica"]
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _flush_to_primary(session, flush_context, instances):
+    session.info["use_primary"] = True
+
+
+def use_primary(db: DbSession) -> None:
+    """
+        Sends every later statement of db to the primary , for reads that
+        must not see a lagging replica (token revocation , reuse checks)
+    """
+    db.info["use_primary"] = True
+
+
+class _Engines:
+    """
+        Engines and session factories for the primary and the replicas ,
+        built from Settings by init_engines()
+    """
+
+    def __init__(self):
+        # --- Sync engine , replicas and SessionLocal ---
+        self.engine = _create_engine(settings.DATABASE_URL, "primary")
+        self.replica_engines = [
+            _create_engine(url, f"replica_{index}") for index, url in enumerate(settings.database_replica_urls)
+        ]
+        if self.replica_engines:
+            self.SessionLocal = sessionmaker(
+                autocommit=False , autoflush=False , expire_on_commit=False , bind=self.engine ,
+                class_=RoutingSession , primary=self.engine , replicas=self.replica_engines ,
+            )
+        else:
+            self.SessionLocal = sessionmaker(
+                autocommit=False , autoflush=False , expire_on_commit=False , bind=self.engine
+            )
+
+        # --- Async engine and AsyncSessionLocal (async mode only) ---
+        self.async_engine = None
+        self.async_replica_engines = []
+        self.AsyncSessionLocal = None
+        if settings.DATABASE_ASYNC:
+            self.async_engine = _create_async_engine(get_async_database_url(), "primary")
+            self.async_replica_engines = [
+                _create_async_engine(to_async_url(url), f"replica_{index}")
+                for index, url in enumerate(settings.database_replica_urls)
+            ]
+            if self.async_replica_engines:
+                # The routing session runs inside AsyncSession and binds the
+                # sync facades of the async engines
+                self.AsyncSessionLocal = async_sessionmaker(
+                    bind=self.async_engine, autoflush=False, expire_on_commit=False,
+                    sync_session_class=RoutingSession,
+                    primary=self.async_engine.sync_engine,
+                    replicas=[replica.sync_engine for replica in self.async_replica_engines],
+                )
+            else:
+                self.AsyncSessionLocal = async_sessionmaker(
+                    bind=self.async_engine, autoflush=False, expire_on_commit=False
+                )
+
+    def serving(self) -> list:
+        if settings.DATABASE_ASYNC:
+            return [self.async_engine, *self.async_replica_engines]
+        return [self.engine, *self.replica_engines]
+
+
+_engines: _Engines | None = None
+
+def init_engines() -> _Engines:
+    """
+        Builds the engines and session factories on first call (lifespan
+        startup , or the first session opened outside the app) ; creating
+        an engine imports its DB driver , so this stays out of import time
+    """
+    global _engines
+    if _engines is None:
+        _engines = _Engines()
+    return _engines
+
+def get_engine() -> Engine:
+    """
+        Returns the primary sync engine (migrations , scripts , create_all)
+    """
+    return init_engines().engine
+
+async def dispose_engines() -> None:
+    """
+        Closes every pooled connection. Called on shutdown
+    """
+    global _engines
+    if _engines is None:
+        return
+    engines, _engines = _engines, None
+    for sync_engine in (engines.engine, *engines.replica_engines):
+        sync_engine.dispose()
+    if engines.async_engine is not None:
+        for async_pool_engine in (engines.async_engine, *engines.async_replica_engines):
+            await async_pool_engine.dispose()
 
-# --- Create the SQLAlchemy engine ---
-engine = create_engine(settings.DATABASE_URL , pool_pre_ping=True)
-# --- Create the SessionLocal ----
-SessionLocal = sessionmaker(autocommit=False , autoflush=False , bind=engine)
 # --- Create the Base DB ----
 Base = declarative_base()
 
-def get_db():
+@asynccontextmanager
+async def session_scope():
+    """
+        Opens a database session outside of a request (background tasks).
+        Yields an AsyncSession when DATABASE_ASYNC is enabled , otherwise
+        a synchronous Session
     """
-        FastAPI dependency that provides a database session to an endpoint 
+    engines = init_engines()
+    if settings.DATABASE_ASYNC:
+        async with engines.AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = engines.SessionLocal()
+        try:
+            yield db
+        finally:
+            # Close rolls back and returns the connection: blocking I/O
+            await run_in_threadpool(db.close)
+
+async def get_db():
     """
-    db = SessionLocal()
-    try:
-        yield db 
-    finally:
-        db.close()
-    
+        FastAPI dependency that provides a database session to an endpoint.
+        Yields an AsyncSession when DATABASE_ASYNC is enabled , otherwise
+        a synchronous Session
+    """
+    async with session_scope() as db:
+        yield db
+
+def dialect_insert(db: DbSession):
+    """
+        Returns the dialect-specific insert() (ON CONFLICT support) for db
+    """
+    return sqlite_insert if db.get_bind().dialect.name == "sqlite" else pg_insert
+
+def _serving_engines() -> list:
+    # Nothing to report before the engines exist
+    return _engines.serving() if _engines is not None else []
+
+def _engine_name(index: int) -> str:
+    return "primary" if index == 0 else f"replica_{index - 1}"
+
+def pool_stats() -> dict:
+    """
+        Returns checkout/overflow counters for every pool serving requests
+    """
+    stats = {}
+    for index, pool_engine in enumerate(_serving_engines()):
+        pool = pool_engine.pool
+        entry = {"status": pool.status()}
+        for counter in ("size", "checkedin", "checkedout", "overflow"):
+            if hasattr(pool, counter):
+                entry[counter] = getattr(pool, counter)()
+        stats[_engine_name(index)] = entry
+    return stats
+
+def _pool_checked_out() -> dict:
+    return {
+        (_engine_name(index),): pool_engine.pool.checkedout()
+        for index, pool_engine in enumerate(_serving_engines())
+        if hasattr(pool_engine.pool, "checkedout")
+    }
+
+def _pool_saturation() -> dict:
+    # Checked-out connections over the most the pool will ever open;
+    # unbounded pools (max_overflow < 0) have no meaningful saturation
+    saturation = {}
+    if settings.DB_MAX_OVERFLOW < 0:
+        return saturation
+    for index, pool_engine in enumerate(_serving_engines()):
+        pool = pool_engine.pool
+        if isinstance(pool, QueuePool):
+            capacity = pool.size() + settings.DB_MAX_OVERFLOW
+            saturation[(_engine_name(index),)] = pool.checkedout() / capacity if capacity else 0.0
+    return saturation
 
+registry.register(GaugeCallback(
+    "db_pool_checked_out", "Connections currently checked out", _pool_checked_out, ("engine",),
+))
+registry.register(GaugeCallback(
+    "db_pool_saturation", "Checked-out connections / (pool_size + max_overflow)", _pool_saturation, ("engine",),
+))
@@ -1,15 +1,85 @@
 import uuid 
-from sqlalchemy import Column , String , Boolean 
+from sqlalchemy import BigInteger , Boolean , Column , DateTime , ForeignKey , Index , Integer , String , Text , func 
 from sqlalchemy.dialects.postgresql import UUID 
 from app.db.database import Base 
 
 class User(Base):
     """
     Database model for a User.
+    The user directory's keyset indexes ((email, id) and (full_name, id),
+    "C" collation on Postgres) are created by migration only.
     """
     __tablename__ = "users"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     email = Column(String, unique=True, index=True, nullable=False)
     full_name = Column(String, index=True)
-    is_active = Column(Boolean, default=True)
\ No newline at end of file
+    is_active = Column(Boolean, default=True)
+    # Written in batches by the audit log (one update per user per flush)
+    last_login_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class RevokedToken(Base):
+    """
+    Denylist entry for an access token revoked before its exp.
+    Workers sync new entries incrementally by revoked_at.
+    """
+    __tablename__ = "revoked_tokens"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    jti = Column(String, unique=True, nullable=False)
+    expires_at = Column(DateTime(timezone=True), index=True, nullable=False)
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now(), index=True, nullable=False)
+
+
+class RefreshToken(Base):
+    """
+    A single-use refresh token, stored as its sha256 hash.
+    Tokens rotated from the same login share a family_id, so reuse of a
+    rotated token can revoke the whole family. replaced_by points at the
+    token a rotation issued (NULL if it was revoked instead).
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    family_id = Column(UUID(as_uuid=True), index=True, nullable=False)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    replaced_by = Column(UUID(as_uuid=True), nullable=True)
+
+
+class OAuthState(Base):
+    """
+    Pending OAuth login (state -> redirect_uri/nonce/PKCE verifier),
+    consumed exactly once by the callback on whichever worker receives it.
+    """
+    __tablename__ = "oauth_states"
+
+    state = Column(String(128), primary_key=True)
+    data = Column(Text, nullable=False)
+    expires_at = Column(DateTime(timezone=True), index=True, nullable=False)
+
+
+class AuditEvent(Base):
+    """
+    Compliance record of a login or logout, written in batches by the
+    audit log. On Postgres the table is range-partitioned by month on
+    occurred_at, so the partition key is part of the primary key.
+    """
+    __tablename__ = "audit_events"
+    __table_args__ = (
+        Index("ix_audit_events_user_id_occurred_at", "user_id", "occurred_at"),
+        {"postgresql_partition_by": "RANGE (occurred_at)"},
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    occurred_at = Column(DateTime(timezone=True), primary_key=True, nullable=False)
+    event = Column(String(32), nullable=False)
+    # No foreign key: the trail outlives deleted users
+    user_id = Column(UUID(as_uuid=True), nullable=True)
+    ip = Column(String(45), nullable=True)
+    user_agent = Column(String(256), nullable=True)
+    request_id = Column(String(128), nullable=True)
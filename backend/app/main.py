@@ -1,30 +1,247 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-
-from app.core.config import settings
-from app.api.v1.routers import api_router 
-
-app = FastAPI(
-    title="Mission OAuth SaaS API",
-    version="1.0.0",
-    description="FastAPI + Google OAuth + Postgres backend",
-    docs_url="/docs" if settings.ENVIRONMENT == "development" else None,
-    redoc_url="/redoc" if settings.ENVIRONMENT == "development" else None,
-)
-
-# ── CORS ───────────────────────────────────────────────
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[settings.FRONTEND_URL],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# ── Include all v1 routes ──────────────────────────────
-app.include_router(api_router, prefix="/api/v1")
-
-# ── Health check ───────────────────────────────────────
-@app.get("/health", tags=["System"])
-def health_check():
-    return {"status": "ok", "service": "Mission OAuth SaaS API"}
\ No newline at end of file
+
+# Application modules are imported inside create_app() and the lifespan,
+# so importing app.main has no side effects: no Settings, no engines, no
+# OAuth client. `uvicorn app.main:app` still works through __getattr__
+# below; `uvicorn --factory app.main:create_app` skips it.
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from app.auth.service import get_google_metadata
+    from app.core.audit import audit_log
+    from app.core.config import settings
+    from app.core.http import close_http_client
+    from app.core.keys import ASYMMETRIC_ALGORITHMS
+    from app.core.log import parse_sample_rates, setup_logging, stop_logging
+    from app.core.revocation import revocation_list
+    from app.core.security import key_ring
+    from app.core.tracing import configure_tracing, create_exporter
+    from app.db.database import dispose_engines, init_engines
+
+    # ── Startup: move log I/O off the request path ──
+    setup_logging(
+        settings.LOG_LEVEL,
+        settings.LOG_FORMAT,
+        settings.LOG_QUEUE_SIZE,
+        parse_sample_rates(settings.LOG_SAMPLE_RATES),
+    )
+    # ── Startup: DB engines and pools ──
+    init_engines()
+    # ── Startup: span exporter ──
+    configure_tracing(
+        create_exporter(settings.TRACING_EXPORTER, settings.TRACING_FILE_PATH),
+        settings.TRACING_SAMPLE_RATE,
+    )
+    # ── Startup: warm OIDC discovery metadata and JWKS ──
+    if settings.OIDC_WARMUP_ENABLED:
+        await get_google_metadata().start()
+    # ── Startup: load signing keys and schedule their rotation ──
+    if settings.ALGORITHM in ASYMMETRIC_ALGORITHMS:
+        key_ring.start(settings.JWT_KEY_REFRESH_SECONDS)
+    # ── Startup: load the token denylist and keep it in sync ──
+    await revocation_list.start(
+        settings.REVOCATION_SYNC_SECONDS,
+        settings.REVOCATION_PRUNE_SECONDS,
+        settings.REVOCATION_SYNC_LOOKBACK_SECONDS,
+    )
+    # ── Startup: batched audit log writer ──
+    if settings.AUDIT_ENABLED:
+        audit_log.start(
+            settings.AUDIT_FLUSH_INTERVAL_SECONDS,
+            settings.AUDIT_BATCH_SIZE,
+            settings.AUDIT_MAX_QUEUE,
+        )
+    yield
+    # ── Shutdown (audit first: its final flush needs the DB) ──
+    await audit_log.stop()
+    await revocation_list.stop()
+    await key_ring.stop()
+    await get_google_metadata().stop()
+    await close_http_client()
+    await dispose_engines()
+    configure_tracing(None, settings.TRACING_SAMPLE_RATE)
+    stop_logging()
+
+def create_app() -> FastAPI:
+    """
+    Builds the application: settings, middleware stack and routes.
+    Engines, the OAuth client and background tasks start in the lifespan.
+    """
+    from fastapi import Depends, HTTPException
+    from fastapi.responses import JSONResponse, PlainTextResponse
+    from fastapi.middleware.cors import CORSMiddleware
+
+    from app.core.config import settings
+    from app.core.admission import AdmissionControlMiddleware, create_admission_groups
+    from app.api.v1.routers import api_router
+    from app.core.keys import ASYMMETRIC_ALGORITHMS
+    from app.core.log import RequestIdMiddleware
+    from app.core.metrics import MetricsMiddleware, registry
+    from app.core.responses import ORJSON_AVAILABLE, FastJSONResponse
+    from app.core.profiling import ProfileStore, ProfilingMiddleware, render_profile, require_profiling_token
+    from app.core.ratelimit import RateLimitMiddleware, create_rate_limit_rules
+    from app.core.security import key_ring, token_cache
+    from app.core.tracing import TracingMiddleware
+    from app.db.database import pool_stats
+    from app.users.cache import user_cache
+
+    # ── orjson for plain dict results (see FastJSONResponse) ──
+    response_options = {}
+    if settings.FAST_JSON_ENABLED and ORJSON_AVAILABLE:
+        response_options["default_response_class"] = FastJSONResponse
+
+    app = FastAPI(
+        title="Mission OAuth SaaS API",
+        version="1.0.0",
+        description="FastAPI + Google OAuth + Postgres backend",
+        docs_url="/docs" if settings.ENVIRONMENT == "development" else None,
+        redoc_url="/redoc" if settings.ENVIRONMENT == "development" else None,
+        lifespan=lifespan,
+        **response_options,
+    )
+
+    # ── Profiling (innermost: times the app, not the limiters) ──
+    profile_store = ProfileStore(settings.PROFILING_DIR, settings.PROFILING_TOP_N)
+    if settings.PROFILING_ENABLED:
+        app.add_middleware(
+            ProfilingMiddleware,
+            store=profile_store,
+            sample_rate=settings.PROFILING_SAMPLE_RATE,
+            token=settings.PROFILING_TOKEN,
+            fmt=settings.PROFILING_FORMAT,
+        )
+
+    # ── Admission control (inside CORS so 503s stay readable) ──
+    admission_groups = create_admission_groups() if settings.ADMISSION_ENABLED else []
+    if admission_groups:
+        app.add_middleware(
+            AdmissionControlMiddleware,
+            groups=admission_groups,
+            retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS,
+        )
+
+    # ── Rate limiting (before admission: throttled clients take no slot) ──
+    rate_limit_rules = create_rate_limit_rules() if settings.RATE_LIMIT_ENABLED else []
+    if rate_limit_rules:
+        app.add_middleware(RateLimitMiddleware, rules=rate_limit_rules, allowlist=settings.rate_limit_allowlist)
+
+    # ── CORS ───────────────────────────────────────────────
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[settings.FRONTEND_URL],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # ── Request ids (logs + X-Request-ID) ──────────────────
+    app.add_middleware(RequestIdMiddleware)
+
+    # ── Tracing (server span + incoming traceparent) ──────
+    app.add_middleware(TracingMiddleware)
+
+    # ── Metrics ────────────────────────────────────────────
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+
+    # ── Include all v1 routes ──────────────────────────────
+    app.include_router(api_router, prefix="/api/v1")
+
+    # ── JWKS for offline token verification ────────────────
+    @app.get("/.well-known/jwks.json", tags=["System"])
+    def jwks():
+        """
+        Public keys (by kid) that verify access tokens, so other services can
+        check tokens locally instead of calling /auth/validate.
+        Empty when tokens are signed with HS256.
+        """
+        keys = key_ring.jwks() if settings.ALGORITHM in ASYMMETRIC_ALGORITHMS else {"keys": []}
+        return JSONResponse(
+            keys,
+            headers={"Cache-Control": f"public, max-age={settings.JWT_KEY_REFRESH_SECONDS}"},
+        )
+
+    # ── Health check ───────────────────────────────────────
+    @app.get("/health", tags=["System"])
+    def health_check():
+        return {"status": "ok", "service": "Mission OAuth SaaS API"}
+
+    @app.get("/health/token-cache", tags=["System"])
+    def token_cache_stats():
+        """
+        Returns size and hit/miss counters of the verified-token cache.
+        """
+        return token_cache.stats()
+
+    @app.get("/health/user-cache", tags=["System"])
+    def user_cache_stats():
+        """
+        Returns size and hit/miss counters of the user profile cache.
+        """
+        return user_cache.stats()
+
+    @app.get("/health/admission", tags=["System"])
+    def admission_stats():
+        """
+        Returns in-flight and queued requests of each admission group.
+        """
+        return {limiter.name: limiter.stats() for _, limiter in admission_groups}
+
+    @app.get("/health/rate-limit", tags=["System"])
+    def rate_limit_stats():
+        """
+        Returns limits, tracked clients and rejections of each rate limit rule.
+        """
+        return {rule.name: rule.stats() for rule in rate_limit_rules}
+
+    @app.get("/health/db-pool", tags=["System"])
+    def db_pool_stats():
+        """
+        Returns checkout/overflow counters of the primary and replica pools.
+        """
+        return pool_stats()
+
+    # ── Prometheus scrape endpoint ─────────────────────────
+    if settings.METRICS_ENABLED:
+        @app.get(settings.METRICS_PATH, tags=["System"], include_in_schema=False)
+        def metrics():
+            """
+            Request, JWT, OAuth callback and DB metrics of this worker in the
+            Prometheus text exposition format.
+            """
+            return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+    # ── Request profiles (X-Profile token required) ───────
+    if settings.PROFILING_ENABLED:
+        @app.get("/debug/profiles", tags=["System"], include_in_schema=False,
+                 dependencies=[Depends(require_profiling_token)])
+        def list_profiles():
+            """
+            Slowest and most recent profiled requests of this worker.
+            """
+            return profile_store.listing()
+
+        @app.get("/debug/profiles/{profile_id}", tags=["System"], include_in_schema=False,
+                 dependencies=[Depends(require_profiling_token)])
+        def get_profile(profile_id: str):
+            """
+            One profile as text: collapsed stacks (feed to flamegraph.pl or
+            speedscope) or the top cProfile functions by cumulative time.
+            """
+            record = profile_store.get(profile_id)
+            if record is None:
+                raise HTTPException(status_code=404, detail="Profile not found")
+            return PlainTextResponse(render_profile(record))
+
+    return app
+
+
+def __getattr__(name: str):
+    # Module-level `app` for `uvicorn app.main:app`, built on first access
+    if name == "app":
+        app = create_app()
+        globals()["app"] = app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,114 @@
+import logging
+import uuid
+from functools import lru_cache
+from app.core.cache import TTLCache
+from app.core.config import LazyObject, settings
+from app.core.shared_store import SharedStore, get_shared_store
+
+logger = logging.getLogger(__name__)
+
+# --- Cache keys ---
+def _id_key(user_id: uuid.UUID | str) -> str:
+    return f"user:id:{user_id}"
+
+def _email_key(email: str) -> str:
+    return f"user:email:{email.lower()}"
+
+
+class UserCache:
+    """
+        Two-tier read-through cache of serialized UserPublic JSON.
+
+        The in-process tier answers most reads ; the optional shared tier
+        lets workers reuse each other's entries and sees invalidations
+        from every worker. Keep the local TTL short , since other workers
+        can only invalidate the shared tier.
+
+        A failing shared tier is logged and skipped : reads fall through to
+        the local tier and the database instead of failing the request.
+    """
+
+    def __init__(self, local: TTLCache, shared: SharedStore | None, shared_ttl: float):
+        self.local = local
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+
+    async def _get(self, key: str) -> str | None:
+        value = self.local.get(key)
+        if value is not None or self.shared is None:
+            return value
+        try:
+            value = await self.shared.get(key)
+        except Exception as e:
+            logger.warning("Shared user cache read failed, using local tier: %s", e)
+            return None
+        if value is not None:
+            self.local.set(key, value)
+        return value
+
+    async def get_by_id(self, user_id: uuid.UUID) -> str | None:
+        """
+            Returns cached UserPublic JSON for user_id , or None
+        """
+        return await self._get(_id_key(user_id))
+
+    async def get_by_email(self, email: str) -> str | None:
+        """
+            Returns cached UserPublic JSON for email , or None
+        """
+        return await self._get(_email_key(email))
+
+    async def set(self, user_id: uuid.UUID, email: str, payload: str) -> None:
+        """
+            Stores serialized UserPublic JSON under both the id and email keys
+        """
+        keys = (_id_key(user_id), _email_key(email))
+        for key in keys:
+            self.local.set(key, payload)
+        if self.shared is not None:
+            try:
+                for key in keys:
+                    await self.shared.set(key, payload, ttl=self.shared_ttl)
+            except Exception as e:
+                logger.warning("Shared user cache write failed: %s", e)
+
+    async def invalidate(self, user_id: uuid.UUID | None = None, email: str | None = None) -> None:
+        """
+            Drops a user's entries from both tiers. Call after every write
+        """
+        keys = []
+        if user_id is not None:
+            keys.append(_id_key(user_id))
+        if email is not None:
+            keys.append(_email_key(email))
+        for key in keys:
+            self.local.delete(key)
+        if self.shared is not None and keys:
+            try:
+                await self.shared.delete(*keys)
+            except Exception as e:
+                # Other workers may serve the old entry until shared_ttl
+                logger.warning("Shared user cache invalidation failed: %s", e)
+
+    def stats(self) -> dict:
+        """
+            Returns local tier counters and whether a shared tier is configured
+        """
+        return {**self.local.stats(), "shared_tier": self.shared is not None}
+
+
+@lru_cache()
+def get_user_cache() -> UserCache:
+    """
+        Builds the user cache from Settings on first use
+    """
+    return UserCache(
+        local=TTLCache(
+            maxsize=settings.USER_CACHE_MAXSIZE,
+            ttl=settings.USER_CACHE_TTL_SECONDS,
+        ),
+        shared=get_shared_store() if settings.USER_CACHE_SHARED else None,
+        shared_ttl=settings.USER_CACHE_SHARED_TTL_SECONDS,
+    )
+
+user_cache = LazyObject(get_user_cache)
@@ -1,25 +1,79 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from app.core.config import settings
+from app.db.database import DbSession, get_db
 from app.core.security import TokenDep
-from app.users.service import get_user_by_id
-from app.users.schemas import UserPublic
+from app.users.service import export_users_json, get_user_public_by_id, list_users
+from app.users.schemas import UserPage, UserPublic
 import uuid
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
+def require_directory_admin(token_data: TokenDep) -> dict:
+    """
+        Only token subs listed in USERS_DIRECTORY_ADMIN_IDS may read the
+        user directory
+    """
+    if token_data.get("sub") not in settings.users_directory_admin_ids:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed")
+    return token_data
+
+AdminDep = Annotated[dict, Depends(require_directory_admin)]
+PrefixQuery = Annotated[str | None, Query(min_length=1, max_length=254)]
+
+@router.get("", response_model=UserPage)
+async def list_users_page(
+    _admin: AdminDep ,
+    db: DbSession = Depends(get_db) ,
+    limit: int = Query(default=50, ge=1) ,
+    cursor: str | None = None ,
+    email_prefix: PrefixQuery = None ,
+    name_prefix: PrefixQuery = None ,
+):
+    """
+        Lists users a page at a time , ordered by email (by full_name when
+        only name_prefix is given)
+        Pass the previous page's next_cursor to get the next one ; keep
+        the same filters
+    """
+    limit = min(limit, settings.USERS_PAGE_MAX_SIZE)
+    # --- fetch page ---
+    try:
+        users, next_cursor = await list_users(db, limit, cursor, email_prefix, name_prefix)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    page = UserPage(items=users, next_cursor=next_cursor)
+    return Response(content=page.model_dump_json(), media_type="application/json")
+
+@router.get("/export")
+async def export_users(
+    _admin: AdminDep ,
+    email_prefix: PrefixQuery = None ,
+    name_prefix: PrefixQuery = None ,
+):
+    """
+        Streams every matching user as one JSON array of UserPublic ,
+        fetched in keyset batches of USERS_EXPORT_BATCH_SIZE
+    """
+    return StreamingResponse(
+        export_users_json(settings.USERS_EXPORT_BATCH_SIZE, email_prefix, name_prefix),
+        media_type="application/json",
+    )
+
 @router.get("/me" , response_model=UserPublic)
-def get_current_user(
+async def get_current_user(
     token_data: TokenDep , 
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     """
         Returns the currently authenticated user's profile 
+        Served from the user cache as pre-serialized UserPublic JSON
     """
     # --- get user id ---
     user_id = uuid.UUID(token_data["sub"])
-    user = get_user_by_id(db, user_id)
+    payload = await get_user_public_by_id(db, user_id)
     # --- check user ---
-    if not user:
+    if payload is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return Response(content=payload, media_type="application/json")
@@ -27,3 +27,12 @@ class UserPublic(UserBase):
     # --- Condig Mapping --- 
     model_config = ConfigDict(from_attributes=True)
 
+# --- User Page ---
+class UserPage(BaseModel):
+    """
+        One page of the user directory , ordered by (email , id) or by
+        (full_name , id) when only filtering on full_name .
+        next_cursor is None on the last page
+    """
+    items: list[UserPublic]
+    next_cursor: str | None = None
@@ -1,26 +1,38 @@
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from sqlalchemy import and_, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.tracing import traced
+from app.db.database import DbSession, dialect_insert, session_scope
 from app.db.models import User
-from app.users.schemas import UserCreate
-import uuid 
+from app.users.cache import user_cache
+from app.users.schemas import UserCreate, UserPublic
+import base64
+import json
+import uuid
 
-def get_user_by_email(db: Session , email: str) -> User | None:
+# --- Sync service (psycopg2 Session) ---
+
+def get_user_by_email_sync(db: Session , email: str) -> User | None:
     """
-        Fetch a user by email 
-        Returns None if Not Found 
+        Fetch a user by email
+        Returns None if Not Found
     """
     return db.query(User).filter(User.email == email).first()
 
-def get_user_by_id(db: Session , user_id: uuid.UUID) -> User | None:
+def get_user_by_id_sync(db: Session , user_id: uuid.UUID) -> User | None:
     """
-        Fetch a user by ID 
-        Returns None if Not Found 
+        Fetch a user by ID
+        Returns None if Not Found
     """
     return db.query(User).filter(User.id == user_id).first()
 
 
-def create_user(db: Session , user: UserCreate) -> User:
+def create_user_sync(db: Session , user: UserCreate) -> User:
     """
-        Create a new user in the database 
+        Create a new user in the database
     """
     db_user = User(
         email = user.email,
@@ -31,3 +43,294 @@ def create_user(db: Session , user: UserCreate) -> User:
     db.refresh(db_user)
     return db_user
 
+def _upsert_statement(db: DbSession, user: UserCreate):
+    """
+        INSERT ... ON CONFLICT (email) DO UPDATE ... RETURNING users.*
+        Keeps the stored full_name when Google does not report one
+    """
+    stmt = dialect_insert(db)(User).values(email = user.email, full_name = user.full_name)
+    return (
+        stmt.on_conflict_do_update(
+            index_elements=[User.email],
+            set_={"full_name": func.coalesce(stmt.excluded.full_name, User.full_name)},
+        )
+        .returning(User)
+        .execution_options(populate_existing=True)
+    )
+
+def upsert_user_sync(db: Session , user: UserCreate) -> User:
+    """
+        Insert a user , or update full_name if the email already exists ,
+        in a single statement
+    """
+    stmt = _upsert_statement(db, user)
+    db_user = db.execute(stmt).scalars().one()
+    db.commit()
+    return db_user
+
+# --- Async service (used by every route) ---
+# A sync Session is only handed in when DATABASE_ASYNC is disabled ; the
+# sync implementation then runs in the threadpool so the event loop never blocks.
+
+@traced("users.get_by_email")
+async def get_user_by_email(db: DbSession , email: str) -> User | None:
+    """
+        Fetch a user by email
+        Returns None if Not Found
+    """
+    if not isinstance(db, AsyncSession):
+        return await run_in_threadpool(get_user_by_email_sync, db, email)
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+@traced("users.get_by_id")
+async def get_user_by_id(db: DbSession , user_id: uuid.UUID) -> User | None:
+    """
+        Fetch a user by ID
+        Returns None if Not Found
+    """
+    if not isinstance(db, AsyncSession):
+        return await run_in_threadpool(get_user_by_id_sync, db, user_id)
+    return await db.get(User, user_id)
+
+
+@traced("users.create")
+async def create_user(db: DbSession , user: UserCreate) -> User:
+    """
+        Create a new user in the database
+    """
+    if not isinstance(db, AsyncSession):
+        db_user = await run_in_threadpool(create_user_sync, db, user)
+    else:
+        db_user = User(
+            email = user.email,
+            full_name = user.full_name,
+        )
+        db.add(db_user)
+        await db.commit()
+        await db.refresh(db_user)
+    await invalidate_user(db_user)
+    return db_user
+
+@traced("users.upsert")
+async def upsert_user(db: DbSession , user: UserCreate) -> User:
+    """
+        Insert a user , or update full_name if the email already exists.
+        One round trip , and safe against concurrent first logins for the
+        same email (no IntegrityError on the unique index)
+    """
+    if not isinstance(db, AsyncSession):
+        db_user = await run_in_threadpool(upsert_user_sync, db, user)
+    else:
+        stmt = _upsert_statement(db, user)
+        db_user = (await db.execute(stmt)).scalars().one()
+        await db.commit()
+    # Overwrite rather than just drop the cached profile ; the fresh row is
+    # already in hand and /users/me is usually the next request
+    await _serialize_user(db_user)
+    return db_user
+
+# --- Cached reads (serialized UserPublic JSON) ---
+# Every write path must call invalidate_user once it has committed.
+
+async def invalidate_user(user: User) -> None:
+    """
+        Drops a user from the profile cache after a write
+    """
+    await user_cache.invalidate(user.id, user.email)
+
+def public_user(user) -> UserPublic:
+    """
+        UserPublic from a User (or a row with the same columns)
+        Rows were validated on the way into the DB , so in fast JSON mode
+        they are not validated again (EmailStr checks dominate otherwise)
+    """
+    if settings.FAST_JSON_ENABLED:
+        return UserPublic.model_construct(
+            email=user.email , full_name=user.full_name , id=user.id , is_active=user.is_active ,
+        )
+    return UserPublic.model_validate(user)
+
+async def _serialize_user(user: User) -> str:
+    payload = public_user(user).model_dump_json()
+    if settings.USER_CACHE_ENABLED:
+        await user_cache.set(user.id, user.email, payload)
+    return payload
+
+@traced("users.get_public_by_id")
+async def get_user_public_by_id(db: DbSession , user_id: uuid.UUID) -> str | None:
+    """
+        Read-through cached lookup by ID
+        Returns the serialized UserPublic JSON , or None if Not Found
+    """
+    if settings.USER_CACHE_ENABLED:
+        cached = await user_cache.get_by_id(user_id)
+        if cached is not None:
+            return cached
+    user = await get_user_by_id(db, user_id)
+    if not user:
+        return None
+    return await _serialize_user(user)
+
+@traced("users.get_public_by_email")
+async def get_user_public_by_email(db: DbSession , email: str) -> str | None:
+    """
+        Read-through cached lookup by email
+        Returns the serialized UserPublic JSON , or None if Not Found
+    """
+    if settings.USER_CACHE_ENABLED:
+        cached = await user_cache.get_by_email(email)
+        if cached is not None:
+            return cached
+    user = await get_user_by_email(db, email)
+    if not user:
+        return None
+    return await _serialize_user(user)
+
+# --- Directory listing (keyset pagination) ---
+# Pages continue from the last (sort value , id) seen instead of using
+# OFFSET , so every page is one index range scan however deep it is.
+# On Postgres the sort columns use the "C" collation : byte order makes a
+# prefix one contiguous range of the index (see the users directory
+# indexes migration). SQLite compares bytes already.
+
+_DIRECTORY_COLUMNS = (User.id, User.email, User.full_name, User.is_active)
+_users_adapter = TypeAdapter(list[UserPublic])
+_CURSOR_SORTS = ("email", "full_name")
+_MAX_CODE_POINT = 0x10FFFF
+_SURROGATES = range(0xD800, 0xE000)
+
+def encode_cursor(sort: str, value: str, user_id: uuid.UUID) -> str:
+    """
+        Opaque cursor naming the last row of a page
+    """
+    raw = json.dumps([sort, value, str(user_id)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[str, str, uuid.UUID]:
+    """
+        Inverse of encode_cursor
+        Raises ValueError for anything that is not a valid cursor
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        decoded = json.loads(raw)
+    except ValueError as exc:
+        raise ValueError("Invalid cursor") from exc
+    # Anything else decodable (numbers , objects , other sort keys) is
+    # rejected here rather than failing further down as a 500
+    if (
+        not isinstance(decoded, list) or len(decoded) != 3
+        or not all(isinstance(part, str) for part in decoded)
+        or decoded[0] not in _CURSOR_SORTS or "\x00" in decoded[1]
+    ):
+        raise ValueError("Invalid cursor")
+    sort, value, user_id = decoded
+    try:
+        return sort, value, uuid.UUID(user_id)
+    except ValueError as exc:
+        raise ValueError("Invalid cursor") from exc
+
+def _sort_column(db: DbSession , column):
+    return column.collate("C") if db.get_bind().dialect.name == "postgresql" else column
+
+def _prefix_upper_bound(prefix: str) -> str | None:
+    """
+        Smallest string sorting after every string that starts with
+        prefix (code point order) , or None when there is none
+    """
+    # A trailing U+10FFFF cannot be bumped: carry into the character before
+    stem = prefix.rstrip(chr(_MAX_CODE_POINT))
+    if not stem:
+        return None
+    code = ord(stem[-1]) + 1
+    if code in _SURROGATES:
+        # Not encodable , and nothing stored sorts between U+D7FF and U+E000
+        code = _SURROGATES.stop
+    return stem[:-1] + chr(code)
+
+def _prefix_filter(column, prefix: str):
+    """
+        column starts with prefix , as a range the index can seek to
+    """
+    upper = _prefix_upper_bound(prefix)
+    if upper is None:
+        # Only a prefix made of U+10FFFF has no bound: no index range then
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return column.like(escaped + "%", escape="\\")
+    return and_(column >= prefix, column < upper)
+
+def _directory_statement(
+    db: DbSession ,
+    limit: int ,
+    cursor: str | None ,
+    email_prefix: str | None ,
+    name_prefix: str | None ,
+):
+    # Sort by the filtered column so the filter and the order share an index
+    sort = "full_name" if name_prefix and not email_prefix else "email"
+    sort_column = _sort_column(db, getattr(User, sort))
+    stmt = select(*_DIRECTORY_COLUMNS)
+    if email_prefix:
+        stmt = stmt.where(_prefix_filter(_sort_column(db, User.email), email_prefix))
+    if name_prefix:
+        stmt = stmt.where(_prefix_filter(_sort_column(db, User.full_name), name_prefix))
+    if cursor is not None:
+        cursor_sort, value, user_id = decode_cursor(cursor)
+        if cursor_sort != sort:
+            raise ValueError("Cursor does not match the filters")
+        stmt = stmt.where(tuple_(sort_column, User.id) > tuple_(value, user_id))
+    # One extra row tells whether there is a next page
+    return sort, stmt.order_by(sort_column, User.id).limit(limit + 1)
+
+def _fetch_rows_sync(db: Session , stmt) -> list:
+    return db.execute(stmt).all()
+
+@traced("users.list")
+async def list_users(
+    db: DbSession ,
+    limit: int ,
+    cursor: str | None = None ,
+    email_prefix: str | None = None ,
+    name_prefix: str | None = None ,
+) -> tuple[list[UserPublic], str | None]:
+    """
+        One page of users after cursor , optionally filtered by email
+        and/or full_name prefix
+        Returns (users , next cursor or None on the last page)
+        Raises ValueError for a malformed or mismatched cursor
+    """
+    sort, stmt = _directory_statement(db, limit, cursor, email_prefix, name_prefix)
+    if not isinstance(db, AsyncSession):
+        rows = await run_in_threadpool(_fetch_rows_sync, db, stmt)
+    else:
+        rows = (await db.execute(stmt)).all()
+    users = [public_user(row) for row in rows[:limit]]
+    if len(rows) <= limit:
+        return users, None
+    last = users[-1]
+    return users, encode_cursor(sort, getattr(last, sort), last.id)
+
+async def export_users_json(
+    batch_size: int ,
+    email_prefix: str | None = None ,
+    name_prefix: str | None = None ,
+):
+    """
+        Streams every matching user as one JSON array , batch_size rows
+        per query. Each batch has its own short session , so a slow client
+        never pins a connection or a long transaction
+    """
+    yield b"["
+    cursor = None
+    first = True
+    while True:
+        async with session_scope() as db:
+            users, cursor = await list_users(db, batch_size, cursor, email_prefix, name_prefix)
+        if users:
+            chunk = _users_adapter.dump_json(users)[1:-1]
+            yield chunk if first else b"," + chunk
+            first = False
+        if cursor is None:
+            break
+    yield b"]"
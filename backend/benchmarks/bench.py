@@ -0,0 +1,277 @@
+"""
+In-process load benchmark for the auth API.
+
+Runs the FastAPI app inside this process (httpx ASGITransport, lifespan
+included) against a local database and the fake OIDC provider from
+benchmarks.fake_oidc, drives each scenario at a fixed concurrency and
+prints latency percentiles and throughput as JSON.
+
+Usage (from backend/):
+    python -m benchmarks.bench --concurrency 20 --requests 2000
+    python -m benchmarks.bench --output current.json --baseline baseline.json
+
+Scenarios:
+    callback   GET /auth/callback/google (code exchange, id_token, upsert, token issue)
+    validate   GET /auth/validate with a bearer token
+    me         GET /users/me with a bearer token
+
+With --baseline the run exits non-zero if any scenario's p95 grew, or its
+requests/second dropped, by more than --max-regression.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import httpx
+
+from benchmarks.fake_oidc import FakeOIDCProvider
+
+SCENARIOS = ("callback", "validate", "me")
+CLIENT_ID = "bench-client"
+API = "/api/v1"
+LOGIN_PATH = f"{API}/auth/auth/login/google"
+
+
+def _configure_environment(issuer: str, workdir: str) -> None:
+    """
+    Points the app at the fake provider and a throwaway SQLite database.
+    Must run before the app is created (Settings are read on first use,
+    then cached). Variables already set in the environment win, so e.g.
+    DATABASE_URL can point the run at Postgres instead.
+    """
+    defaults = {
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "SECRET_KEY": "bench-secret",
+        "GOOGLE_CLIENT_ID": CLIENT_ID,
+        "GOOGLE_CLIENT_SECRET": "bench-client-secret",
+        "COOKIE_DOMAIN": "",
+        "BACKEND_URL": "http://bench.local",
+        "ENVIRONMENT": "benchmark",
+        # App logs share stdout with the JSON report
+        "LOG_LEVEL": "ERROR",
+        # Every benchmark request comes from one IP
+        "RATE_LIMIT_ENABLED": "false",
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+    # Always talk to the local provider, never to Google
+    os.environ["GOOGLE_ISSUER_URL"] = issuer
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an ascending list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float, concurrency: int) -> dict:
+    latencies = sorted(latencies)
+    total = len(latencies) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+# --- Scenarios ---
+
+async def _seed_tokens(users: int) -> list[str]:
+    """
+    Creates users directly in the database and returns an access token each.
+    """
+    from app.auth.service import create_user_token
+    from app.db.database import session_scope
+    from app.users.schemas import UserCreate
+    from app.users.service import upsert_user
+
+    tokens = []
+    async with session_scope() as db:
+        for index in range(users):
+            user = await upsert_user(db, UserCreate(email=f"seed{index}@example.com", full_name=f"Seed {index}"))
+            tokens.append(create_user_token(user))
+    return tokens
+
+
+def _make_request_factory(scenario: str, asgi_app, provider_client: httpx.AsyncClient, tokens: list[str]):
+    """
+    Returns an async callable(index) -> (timed seconds, ok) running one
+    request of the scenario. Untimed setup (the redirect through the fake
+    provider) happens before the clock starts.
+    """
+    if scenario == "callback":
+        async def run_callback(index: int):
+            transport = httpx.ASGITransport(app=asgi_app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench.local") as client:
+                login = await client.get(LOGIN_PATH)
+                # One identity per login, as if a different user picked an account
+                authorization_url = httpx.URL(login.json()["authorization_url"])
+                authorize = await provider_client.get(
+                    authorization_url.copy_merge_params({"login_hint": f"user{index}@example.com"})
+                )
+                callback = urlsplit(authorize.headers["location"])
+                started = time.perf_counter()
+                response = await client.get(f"{callback.path}?{callback.query}")
+                elapsed = time.perf_counter() - started
+            ok = response.status_code == 307 and "/dashboard" in response.headers.get("location", "")
+            return elapsed, ok
+        return run_callback, None
+
+    path = f"{API}/auth/auth/validate" if scenario == "validate" else f"{API}/users/users/me"
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app), base_url="http://bench.local")
+
+    async def run_authenticated(index: int):
+        headers = {"Authorization": f"Bearer {tokens[index % len(tokens)]}"}
+        started = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        return time.perf_counter() - started, response.status_code == 200
+
+    return run_authenticated, client
+
+
+async def run_scenario(scenario: str, asgi_app, provider_client, tokens, requests: int,
+                       concurrency: int, warmup: int) -> dict:
+    run_one, client = _make_request_factory(scenario, asgi_app, provider_client, tokens)
+    try:
+        for index in range(warmup):
+            await run_one(index)
+
+        latencies: list[float] = []
+        errors = 0
+        counter = iter(range(warmup, warmup + requests))
+
+        async def worker():
+            nonlocal errors
+            for index in counter:
+                try:
+                    elapsed, ok = await run_one(index)
+                except Exception:
+                    errors += 1
+                    continue
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return summarize(latencies, errors, time.perf_counter() - started, concurrency)
+    finally:
+        if client is not None:
+            await client.aclose()
+
+
+@asynccontextmanager
+async def running_app():
+    """
+    Creates the schema and runs the app's lifespan (OIDC warm-up, key
+    ring, revocation sync) around the benchmark.
+    """
+    from sqlalchemy import text
+    from app.db.database import Base, get_engine
+    from app.main import create_app
+
+    app = create_app()
+    engine = get_engine()
+    Base.metadata.create_all(engine)
+    if engine.dialect.name == "sqlite":
+        # WAL (persisted in the file) lets readers run alongside the writer
+        with engine.connect() as connection:
+            connection.execute(text("PRAGMA journal_mode=WAL"))
+    async with app.router.lifespan_context(app):
+        yield app
+
+
+async def main(args) -> dict:
+    with tempfile.TemporaryDirectory() as workdir, FakeOIDCProvider(CLIENT_ID) as provider:
+        _configure_environment(provider.issuer, workdir)
+        async with running_app() as app, httpx.AsyncClient() as provider_client:
+            tokens = await _seed_tokens(args.users) if {"validate", "me"} & set(args.scenarios) else []
+            results = {}
+            for scenario in args.scenarios:
+                results[scenario] = await run_scenario(
+                    scenario, app, provider_client, tokens,
+                    requests=args.requests, concurrency=args.concurrency, warmup=args.warmup,
+                )
+    return {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "users": args.users,
+            "database": os.environ["DATABASE_URL"].split("://", 1)[0],
+            "python": sys.version.split()[0],
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> list[str]:
+    """
+    Returns a message for every scenario that regressed past max_regression
+    (fraction) against the baseline report.
+    """
+    failures = []
+    for scenario, current in report["results"].items():
+        previous = baseline.get("results", {}).get(scenario)
+        if not previous:
+            continue
+        if current["errors"] > previous.get("errors", 0):
+            failures.append(f"{scenario}: errors {previous.get('errors', 0)} -> {current['errors']}")
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + max_regression):
+            failures.append(f"{scenario}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if previous["rps"] and current["rps"] < previous["rps"] * (1 - max_regression):
+            failures.append(f"{scenario}: rps {previous['rps']} -> {current['rps']}")
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help="comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500, help="timed requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent in-flight requests")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per scenario")
+    parser.add_argument("--users", type=int, default=100, help="distinct users for validate/me")
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="allowed p95/rps regression vs the baseline (fraction)")
+    args = parser.parse_args(argv)
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(main(args))
+    rendered = json.dumps(report, indent=2)
+    print(rendered)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(rendered + "\n")
+    if args.baseline:
+        with open(args.baseline) as handle:
+            failures = compare(report, json.load(handle), args.max_regression)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        sys.exit(1 if failures else 0)
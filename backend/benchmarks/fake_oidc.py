@@ -0,0 +1,194 @@
+"""
+Local stand-in for Google's OpenID Connect provider.
+
+Serves discovery, authorize, token, userinfo and JWKS endpoints on
+127.0.0.1 from a background thread, signing ID tokens with a throwaway
+RS256 key. The identity of each login comes from the login_hint passed to
+the authorize endpoint, so a benchmark can log in as many distinct users.
+"""
+import json
+import secrets
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+KID = "bench-1"
+
+
+class FakeOIDCProvider:
+    """
+    Usage:
+        with FakeOIDCProvider(client_id="bench") as provider:
+            provider.issuer  # -> "http://127.0.0.1:<port>"
+    """
+
+    def __init__(self, client_id: str):
+        self.client_id = client_id
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.private_pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ).decode()
+        public_pem = private_key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        ).decode()
+        # Parsed once: handing jose the PEM would re-parse it on every sign
+        self.signing_key = jwk.construct(self.private_pem, "RS256")
+        public = jwk.construct(public_pem, "RS256").to_dict()
+        public.update({"kid": KID, "alg": "RS256", "use": "sig"})
+        self.jwks = {"keys": [public]}
+        # Issued codes and access tokens -> the login they belong to
+        self.codes: dict[str, dict] = {}
+        self.access_tokens: dict[str, dict] = {}
+        # Requests served per path, e.g. to count discovery/JWKS fetches
+        self.requests: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+
+    @property
+    def issuer(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def discovery(self) -> dict:
+        return {
+            "issuer": self.issuer,
+            "authorization_endpoint": f"{self.issuer}/authorize",
+            "token_endpoint": f"{self.issuer}/token",
+            "userinfo_endpoint": f"{self.issuer}/userinfo",
+            "jwks_uri": f"{self.issuer}/jwks",
+            "id_token_signing_alg_values_supported": ["RS256"],
+        }
+
+    # --- Protocol ---
+    def authorize(self, params: dict) -> str:
+        """
+        Approves the login immediately and returns the redirect back to the
+        client carrying a fresh code.
+        """
+        email = params.get("login_hint") or "bench@example.com"
+        code = secrets.token_urlsafe(16)
+        with self._lock:
+            self.codes[code] = {
+                "email": email,
+                "nonce": params.get("nonce"),
+                "client_id": params.get("client_id"),
+            }
+        query = urlencode({"code": code, "state": params.get("state", "")})
+        return f"{params['redirect_uri']}?{query}"
+
+    def token(self, params: dict) -> dict | None:
+        with self._lock:
+            login = self.codes.pop(params.get("code"), None)
+        if login is None:
+            return None
+        access_token = secrets.token_urlsafe(24)
+        claims = self._claims(login["email"])
+        with self._lock:
+            self.access_tokens[access_token] = claims
+        id_claims = dict(claims, aud=self.client_id, iss=self.issuer,
+                         iat=int(time.time()), exp=int(time.time()) + 3600)
+        if login["nonce"]:
+            id_claims["nonce"] = login["nonce"]
+        id_token = jwt.encode(id_claims, self.signing_key, algorithm="RS256", headers={"kid": KID})
+        return {
+            "access_token": access_token,
+            "token_type": "Bearer",
+            "expires_in": 3600,
+            "scope": "openid email profile",
+            "id_token": id_token,
+        }
+
+    def userinfo(self, access_token: str) -> dict | None:
+        with self._lock:
+            return self.access_tokens.get(access_token)
+
+    @staticmethod
+    def _claims(email: str) -> dict:
+        return {
+            "sub": email.split("@")[0],
+            "email": email,
+            "email_verified": True,
+            "name": email.split("@")[0].replace(".", " ").title(),
+        }
+
+    # --- Server ---
+    def start(self) -> "FakeOIDCProvider":
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; with Nagle on,
+            # keep-alive clients stall ~40ms on delayed ACKs
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: dict | None = None, headers: dict | None = None):
+                data = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                if body is not None:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                with provider._lock:
+                    provider.requests[url.path] += 1
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                if url.path == "/.well-known/openid-configuration":
+                    self._send(200, provider.discovery(), {"Cache-Control": "public, max-age=3600"})
+                elif url.path == "/jwks":
+                    self._send(200, provider.jwks, {"Cache-Control": "public, max-age=3600"})
+                elif url.path == "/authorize":
+                    self._send(302, headers={"Location": provider.authorize(params)})
+                elif url.path == "/userinfo":
+                    scheme, _, access_token = self.headers.get("Authorization", "").partition(" ")
+                    claims = provider.userinfo(access_token) if scheme.lower() == "bearer" else None
+                    self._send(200, claims) if claims else self._send(401, {"error": "invalid_token"})
+                else:
+                    self._send(404, {"error": "not_found"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                form = parse_qs(self.rfile.read(length).decode())
+                params = {key: values[0] for key, values in form.items()}
+                path = urlsplit(self.path).path
+                with provider._lock:
+                    provider.requests[path] += 1
+                if path != "/token":
+                    self._send(404, {"error": "not_found"})
+                    return
+                token = provider.token(params)
+                if token is None:
+                    self._send(400, {"error": "invalid_grant"})
+                else:
+                    self._send(200, token, {"Cache-Control": "no-store"})
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self) -> "FakeOIDCProvider":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,160 @@
+"""
+Response serialization benchmark: fast JSON mode vs FastAPI's default path.
+
+Times, per response, the work between a handler's result and the bytes
+sent, for the payloads of the hot routes:
+
+    validate      GET /auth/validate: dict validated against
+                  TokenValidationResponse and dumped, vs orjson on the dict
+    validate_batch POST /auth/validate/batch (100 results): model
+                  re-validated and dumped, vs dumped once
+    user_public   /users/me cache miss: UserPublic.model_validate(row),
+                  vs built from the row without re-validating it
+    user_page     GET /users (50 rows): the same, per row
+    plain_dict    routes without a response_model (/health/*):
+                  JSONResponse vs FastJSONResponse rendering
+
+"current" is what FAST_JSON_ENABLED=false does, "fast" the default.
+For end-to-end numbers run bench.py both ways:
+
+    FAST_JSON_ENABLED=false python -m benchmarks.bench --output current.json
+    python -m benchmarks.bench --baseline current.json
+
+Usage (from backend/):
+    python -m benchmarks.serialization --iterations 20000
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+import uuid
+from types import SimpleNamespace
+
+from benchmarks.bench import _configure_environment
+
+CASES = ("validate", "validate_batch", "user_public", "user_page", "plain_dict")
+
+
+def _cases() -> dict:
+    """
+    Returns {case: (current, fast)}, two zero-argument callables producing
+    the response body bytes.
+    """
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+
+    from app.auth.schemas import BatchTokenValidationResponse, TokenValidationResponse, TokenValidationResult
+    from app.core.config import settings
+    from app.core.responses import FastJSONResponse, dumps
+    from app.users.schemas import UserPage
+    from app.users.service import public_user
+
+    def with_mode(enabled: bool, build):
+        def run():
+            settings.FAST_JSON_ENABLED = enabled
+            return build()
+        return run
+
+    validation = {"valid": True, "user_id": str(uuid.uuid4()), "expires_at": 1_900_000_000}
+    validation_adapter = TypeAdapter(TokenValidationResponse)
+
+    batch = BatchTokenValidationResponse(results=[
+        TokenValidationResult(valid=True, user_id=str(uuid.uuid4()), expires_at=1_900_000_000)
+        for _ in range(100)
+    ])
+    batch_adapter = TypeAdapter(BatchTokenValidationResponse)
+
+    rows = [
+        SimpleNamespace(id=uuid.uuid4(), email=f"user{index}@example.com", full_name=f"User {index}", is_active=True)
+        for index in range(50)
+    ]
+
+    health = {"size": 1234, "maxsize": 10_000, "hits": 98_765, "misses": 4_321, "evictions": 0, "hit_ratio": 0.958}
+    stdlib_response = JSONResponse.__new__(JSONResponse)
+    fast_response = FastJSONResponse.__new__(FastJSONResponse)
+
+    return {
+        "validate": (
+            lambda: validation_adapter.dump_json(validation_adapter.validate_python(validation)),
+            lambda: dumps(validation),
+        ),
+        "validate_batch": (
+            lambda: batch_adapter.dump_json(batch_adapter.validate_python(batch)),
+            lambda: batch.__pydantic_serializer__.to_json(batch),
+        ),
+        "user_public": (
+            with_mode(False, lambda: public_user(rows[0]).model_dump_json()),
+            with_mode(True, lambda: public_user(rows[0]).model_dump_json()),
+        ),
+        "user_page": (
+            with_mode(False, lambda: UserPage(items=[public_user(row) for row in rows]).model_dump_json()),
+            with_mode(True, lambda: UserPage(items=[public_user(row) for row in rows]).model_dump_json()),
+        ),
+        "plain_dict": (
+            lambda: stdlib_response.render(jsonable_encoder(health)),
+            # FastAPI runs jsonable_encoder before either response class
+            lambda: fast_response.render(jsonable_encoder(health)),
+        ),
+    }
+
+
+def _time(fn, iterations: int) -> float:
+    fn()  # warm-up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main(args) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        # Settings only; nothing here talks to the provider or the DB
+        _configure_environment("http://127.0.0.1:9", workdir)
+        cases = _cases()
+        from app.core.responses import ORJSON_AVAILABLE
+
+        results = {}
+        for name in args.cases:
+            current, fast = cases[name]
+            if json.loads(current()) != json.loads(fast()):
+                raise AssertionError(f"{name}: fast and current bodies differ")
+            current_us = _time(current, args.iterations)
+            fast_us = _time(fast, args.iterations)
+            results[name] = {
+                "current_us": round(current_us, 2),
+                "fast_us": round(fast_us, 2),
+                "speedup": round(current_us / fast_us, 2),
+            }
+    return {
+        "config": {
+            "iterations": args.iterations,
+            "orjson": ORJSON_AVAILABLE,
+            "python": sys.version.split()[0],
+        },
+        "results": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", default=",".join(CASES), help="comma-separated subset of: " + ", ".join(CASES))
+    parser.add_argument("--iterations", type=int, default=10_000, help="timed responses per case and path")
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    args = parser.parse_args(argv)
+    args.cases = [name.strip() for name in args.cases.split(",") if name.strip()]
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = main(args)
+    rendered = json.dumps(report, indent=2)
+    print(rendered)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(rendered + "\n")
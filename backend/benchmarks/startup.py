@@ -0,0 +1,196 @@
+"""
+Cold-start benchmark for the auth API.
+
+Starts a fresh interpreter per repeat (so nothing is already imported)
+and times each phase of bringing a worker up:
+
+    import        import app.main
+    create_app    create_app(): Settings, middleware stack, routers
+    lifespan      lifespan startup: engines, OIDC warm-up, key ring,
+                  revocation list, audit writer
+    first_request GET /health through the ASGI app
+    process       interpreter start to exit, as seen by the parent
+
+The app talks to a throwaway SQLite database and the fake OIDC provider
+from benchmarks.fake_oidc, and prints the median/min/max of each phase
+as JSON.
+
+Usage (from backend/):
+    python -m benchmarks.startup --repeats 10
+    python -m benchmarks.startup --top 15
+    python -m benchmarks.startup --output current.json --baseline baseline.json
+
+--top N adds the N top-level packages with the most import time (from
+`python -X importtime`). With --baseline the run exits non-zero if any
+phase's median grew by more than --max-regression.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+# Only the stdlib at module level: children run this module too, and
+# anything imported here would already be loaded when they time imports
+
+PHASES = ("import", "create_app", "lifespan", "first_request", "process")
+
+
+async def _child_run() -> dict:
+    """
+    Runs in the fresh interpreter: times each phase and returns them (ms).
+    """
+    timings = {}
+    started = time.perf_counter()
+    from app.main import create_app
+    timings["import"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    app = create_app()
+    timings["create_app"] = time.perf_counter() - started
+
+    import httpx
+
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        timings["lifespan"] = time.perf_counter() - started
+        started = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench.local") as client:
+            response = await client.get("/health")
+            response.raise_for_status()
+        timings["first_request"] = time.perf_counter() - started
+    return {phase: round(seconds * 1000, 2) for phase, seconds in timings.items()}
+
+
+def _create_schema() -> None:
+    from app.db.database import Base, get_engine
+    from app.main import create_app
+
+    # Building the app imports the routers, and with them every model
+    create_app()
+    Base.metadata.create_all(get_engine())
+
+
+def _spawn(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        capture_output=True, text=True, check=True, env=os.environ.copy(),
+    )
+
+
+def _run_once() -> dict:
+    started = time.perf_counter()
+    completed = _spawn("-m", "benchmarks.startup", "--child")
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    timings["process"] = round((time.perf_counter() - started) * 1000, 2)
+    return timings
+
+
+def import_profile(top: int) -> list[dict]:
+    """
+    Self import time per top-level package for `import app.main`,
+    largest first.
+    """
+    completed = _spawn("-X", "importtime", "-c", "import app.main")
+    by_package: dict[str, int] = defaultdict(int)
+    for line in completed.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        by_package[name.strip().split(".")[0]] += int(self_us)
+    ranked = sorted(by_package.items(), key=lambda item: -item[1])[:top]
+    return [{"package": package, "self_ms": round(us / 1000, 1)} for package, us in ranked]
+
+
+def summarize(runs: list[dict]) -> dict:
+    summary = {}
+    for phase in PHASES:
+        values = [run[phase] for run in runs]
+        summary[phase] = {
+            "median_ms": round(statistics.median(values), 2),
+            "min_ms": min(values),
+            "max_ms": max(values),
+        }
+    return summary
+
+
+def main(args) -> dict:
+    from benchmarks.bench import CLIENT_ID, _configure_environment
+    from benchmarks.fake_oidc import FakeOIDCProvider
+
+    with tempfile.TemporaryDirectory() as workdir, FakeOIDCProvider(CLIENT_ID) as provider:
+        _configure_environment(provider.issuer, workdir)
+        # Children find the app package from backend/
+        os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")]))
+        _spawn("-m", "benchmarks.startup", "--create-schema")
+        runs = [_run_once() for _ in range(args.repeats)]
+        report = {
+            "config": {
+                "repeats": args.repeats,
+                "database": os.environ["DATABASE_URL"].split("://", 1)[0],
+                "python": sys.version.split()[0],
+            },
+            "results": summarize(runs),
+        }
+        if args.top:
+            report["imports"] = import_profile(args.top)
+    return report
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> list[str]:
+    """
+    Returns a message for every phase whose median grew past
+    max_regression (fraction) against the baseline report.
+    """
+    failures = []
+    for phase, current in report["results"].items():
+        previous = baseline.get("results", {}).get(phase)
+        if not previous or not previous["median_ms"]:
+            continue
+        if current["median_ms"] > previous["median_ms"] * (1 + max_regression):
+            failures.append(f"{phase}: median {previous['median_ms']}ms -> {current['median_ms']}ms")
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5, help="fresh processes to start")
+    parser.add_argument("--top", type=int, default=0, help="report the N slowest packages to import")
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="allowed median regression per phase vs the baseline (fraction)")
+    # Internal: what the spawned interpreters run
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--create-schema", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.child:
+        print(json.dumps(asyncio.run(_child_run())))
+        sys.exit(0)
+    if args.create_schema:
+        _create_schema()
+        sys.exit(0)
+
+    report = main(args)
+    rendered = json.dumps(report, indent=2)
+    print(rendered)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(rendered + "\n")
+    if args.baseline:
+        with open(args.baseline) as handle:
+            failures = compare(report, json.load(handle), args.max_regression)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        sys.exit(1 if failures else 0)
@@ -0,0 +1,148 @@
+"""
+Shared fixtures. The app runs in-process (httpx ASGITransport, lifespan
+included) against a throwaway SQLite database and the fake OIDC provider
+from benchmarks.fake_oidc, so nothing leaves the machine.
+
+Async tests use the anyio pytest plugin: mark them with pytest.mark.anyio.
+"""
+import tempfile
+import uuid
+from urllib.parse import urlsplit
+
+import httpx
+import pytest
+
+from benchmarks.bench import CLIENT_ID, _configure_environment
+from app.core.shared_store import SharedStore
+from benchmarks.fake_oidc import FakeOIDCProvider
+
+API = "/api/v1"
+LOGIN_PATH = f"{API}/auth/auth/login/google"
+
+_workdir: tempfile.TemporaryDirectory | None = None
+_provider: FakeOIDCProvider | None = None
+
+
+def pytest_configure(config):
+    # Settings are built once per process, so the environment has to be in
+    # place before the first test touches the app
+    global _workdir, _provider
+    _workdir = tempfile.TemporaryDirectory()
+    _provider = FakeOIDCProvider(CLIENT_ID).start()
+    _configure_environment(_provider.issuer, _workdir.name)
+
+
+def pytest_unconfigure(config):
+    if _provider is not None:
+        _provider.stop()
+    if _workdir is not None:
+        _workdir.cleanup()
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def provider() -> FakeOIDCProvider:
+    return _provider
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app.db.database import Base, get_engine
+    from app.main import create_app
+
+    application = create_app()
+    Base.metadata.create_all(get_engine())
+    return application
+
+
+@pytest.fixture
+async def client(app):
+    """
+    Client for the app with its lifespan running (key ring, revocation
+    sync, audit writer) for the duration of the test.
+    """
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test.local") as http_client:
+            yield http_client
+
+
+@pytest.fixture(params=[True, False], ids=["async-db", "sync-db"])
+def database_async(request, client, monkeypatch):
+    """
+    Runs the test against AsyncSession and against the sync Session
+    (DATABASE_ASYNC=false). The engines are built by the client's lifespan
+    with both session factories; only the one session_scope() hands out
+    changes.
+    """
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "DATABASE_ASYNC", request.param)
+    return request.param
+
+
+@pytest.fixture
+def create_user():
+    """
+    Returns an async factory creating a user with a unique email, which
+    returns (user, access token).
+    """
+    from app.auth.service import create_user_token
+    from app.db.database import session_scope
+    from app.users.schemas import UserCreate
+    from app.users.service import upsert_user
+
+    async def factory(email: str | None = None, full_name: str | None = "Test User"):
+        email = email or f"user-{uuid.uuid4().hex[:12]}@example.com"
+        async with session_scope() as db:
+            user = await upsert_user(db, UserCreate(email=email, full_name=full_name))
+        return user, create_user_token(user)
+
+    return factory
+
+
+@pytest.fixture
+def google_login(app, client):
+    """
+    Returns an async function running a Google login through the fake
+    provider for the given email, which returns the callback response.
+    Each login has its own cookie jar, like a separate browser.
+    """
+    async def login(email: str, headers: dict | None = None) -> httpx.Response:
+        transport = httpx.ASGITransport(app=app)
+        async with (
+            httpx.AsyncClient(transport=transport, base_url=str(client.base_url)) as browser,
+            httpx.AsyncClient() as provider_client,
+        ):
+            started = await browser.get(LOGIN_PATH)
+            authorization_url = httpx.URL(started.json()["authorization_url"])
+            authorize = await provider_client.get(authorization_url.copy_merge_params({"login_hint": email}))
+            callback = urlsplit(authorize.headers["location"])
+            return await browser.get(f"{callback.path}?{callback.query}", headers=headers)
+
+    return login
+
+
+class UnavailableStore(SharedStore):
+    """
+    Shared store whose backend is down: every call fails.
+    """
+
+    async def get(self, key):
+        raise ConnectionError("shared store down")
+
+    async def set(self, key, value, ttl=None):
+        raise ConnectionError("shared store down")
+
+    async def delete(self, *keys):
+        raise ConnectionError("shared store down")
+
+    async def pop(self, key):
+        raise ConnectionError("shared store down")
+
+    async def incr(self, key, ttl=None):
+        raise ConnectionError("shared store down")
@@ -0,0 +1,185 @@
+import asyncio
+import re
+
+import httpx
+import pytest
+
+from app.core.admission import LOGIN_ROUTES, READ_ROUTES, AdmissionControlMiddleware, AdmissionLimiter
+from app.core.ratelimit import VALIDATE_ROUTE, RateLimitMiddleware, RateLimitRule, SlidingWindowLimiter
+from tests.conftest import API
+
+pytestmark = pytest.mark.anyio
+
+CALLBACK_PATH = f"{API}/auth/auth/callback/google"
+VALIDATE_PATH = f"{API}/auth/auth/validate"
+
+
+# --- Limiter ---
+
+async def test_queue_full_is_rejected_immediately():
+    limiter = AdmissionLimiter("login", max_concurrency=1, max_queue=1, queue_timeout=5)
+    assert await limiter.acquire()
+    queued = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+
+    assert not await limiter.acquire()
+    assert limiter.rejected == 1
+    assert limiter.stats()["queued"] == 1
+
+    limiter.release()
+    assert await queued
+    assert limiter.active == 1
+
+
+async def test_queued_request_times_out():
+    limiter = AdmissionLimiter("login", max_concurrency=1, max_queue=5, queue_timeout=0.01)
+    assert await limiter.acquire()
+
+    assert not await limiter.acquire()
+    assert limiter.rejected == 1
+    assert limiter.queue_depth == 0
+
+
+async def test_slot_handed_over_at_the_deadline_is_kept(monkeypatch):
+    limiter = AdmissionLimiter("read", max_concurrency=1, max_queue=5, queue_timeout=5)
+    assert await limiter.acquire()
+
+    async def release_as_deadline_fires(waiter, timeout):
+        # What wait_for does on 3.12+ when the result and the deadline
+        # land in the same loop iteration
+        limiter.release()
+        raise asyncio.TimeoutError
+
+    monkeypatch.setattr(asyncio, "wait_for", release_as_deadline_fires)
+    assert await limiter.acquire()
+    monkeypatch.undo()
+
+    assert limiter.rejected == 0
+    limiter.release()
+    assert (limiter.active, limiter.queue_depth) == (0, 0)
+
+
+async def test_release_at_the_deadline_does_not_leak_slots():
+    loop = asyncio.get_running_loop()
+    for _ in range(20):
+        limiter = AdmissionLimiter("read", max_concurrency=1, max_queue=5, queue_timeout=0.01)
+        assert await limiter.acquire()
+        # Due in the same loop iteration as the waiter's deadline
+        loop.call_at(loop.time() + 0.01, limiter.release)
+        if await limiter.acquire():
+            limiter.release()
+        assert limiter.active == 0
+
+
+async def test_release_hands_slots_to_waiters_in_order():
+    limiter = AdmissionLimiter("read", max_concurrency=1, max_queue=5, queue_timeout=5)
+    assert await limiter.acquire()
+    admitted = []
+
+    async def wait(name):
+        if await limiter.acquire():
+            admitted.append(name)
+
+    waiters = [asyncio.create_task(wait(name)) for name in ("first", "second")]
+    await asyncio.sleep(0)
+    limiter.release()
+    await asyncio.sleep(0)
+    limiter.release()
+    await asyncio.gather(*waiters)
+    limiter.release()
+
+    assert admitted == ["first", "second"]
+    assert limiter.active == 0
+
+
+async def test_cancelled_waiter_leaves_the_queue():
+    limiter = AdmissionLimiter("read", max_concurrency=1, max_queue=1, queue_timeout=5)
+    assert await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    limiter.release()
+
+    assert (limiter.active, limiter.queue_depth) == (0, 0)
+
+
+# --- Middleware ---
+
+class BlockingApp:
+    """
+    Holds every request until release is set.
+    """
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.served = 0
+
+    async def __call__(self, scope, receive, send):
+        await self.release.wait()
+        self.served += 1
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+
+def _groups(max_concurrency=1, max_queue=1) -> list[tuple[re.Pattern, AdmissionLimiter]]:
+    return [
+        (LOGIN_ROUTES, AdmissionLimiter("login", max_concurrency, max_queue, 5)),
+        (READ_ROUTES, AdmissionLimiter("read", max_concurrency, max_queue, 5)),
+    ]
+
+
+def _client(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test.local")
+
+
+async def test_full_queue_returns_503_with_retry_after():
+    inner = BlockingApp()
+    async with _client(AdmissionControlMiddleware(inner, _groups(), retry_after=3)) as client:
+        # One running, one queued
+        pending = [asyncio.create_task(client.get(CALLBACK_PATH)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+
+        response = await client.get(CALLBACK_PATH)
+        inner.release.set()
+        completed = await asyncio.gather(*pending)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
+    assert response.json() == {"detail": "Server is busy, retry later"}
+    assert [item.status_code for item in completed] == [200, 200]
+
+
+async def test_login_burst_does_not_starve_reads():
+    inner = BlockingApp()
+    groups = _groups()
+    async with _client(AdmissionControlMiddleware(inner, groups, retry_after=1)) as client:
+        pending = [asyncio.create_task(client.get(CALLBACK_PATH)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        assert (await client.get(CALLBACK_PATH)).status_code == 503
+
+        read = asyncio.create_task(client.get(VALIDATE_PATH))
+        health = asyncio.create_task(client.get("/health"))
+        await asyncio.sleep(0.01)
+        inner.release.set()
+        responses = await asyncio.gather(read, health, *pending)
+
+    assert [response.status_code for response in responses] == [200] * 4
+    assert groups[1][1].rejected == 0
+
+
+async def test_rate_limited_requests_take_no_admission_slot():
+    inner = BlockingApp()
+    inner.release.set()
+    groups = _groups(max_concurrency=1, max_queue=0)
+    per_ip = RateLimitRule("validate_ip", VALIDATE_ROUTE, "ip", SlidingWindowLimiter(1, 3600, 100))
+    app = RateLimitMiddleware(AdmissionControlMiddleware(inner, groups, retry_after=1), [per_ip])
+    async with _client(app) as client:
+        statuses = [(await client.get(VALIDATE_PATH)).status_code for _ in range(3)]
+
+    assert statuses == [200, 429, 429]
+    assert inner.served == 1
+    assert groups[1][1].rejected == 0
+    assert groups[1][1].active == 0
@@ -0,0 +1,136 @@
+import uuid
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.core import audit as audit_module
+from app.core.audit import AuditLog, audit_events_dropped_total
+from app.db.database import session_scope
+from app.db.models import AuditEvent, User
+
+pytestmark = pytest.mark.anyio
+
+
+async def _events_for(user_id: uuid.UUID) -> int:
+    async with session_scope() as db:
+        return (await db.execute(select(func.count()).where(AuditEvent.user_id == user_id))).scalar_one()
+
+
+async def _last_login(user_id: uuid.UUID):
+    async with session_scope() as db:
+        return (await db.execute(select(User.last_login_at).where(User.id == user_id))).scalar_one()
+
+
+async def test_flush_skips_last_login_of_unknown_user(client, create_user):
+    user, _ = await create_user()
+    unknown = uuid.uuid4()
+    audit = AuditLog()
+    audit.record("login", user.id)
+    audit.record("login", unknown)
+
+    assert await audit.flush() == 2
+
+    assert len(audit) == 0
+    assert await _events_for(unknown) == 1
+    assert await _last_login(user.id) is not None
+
+
+def _dropped() -> float:
+    return audit_events_dropped_total._values.get((), 0.0)
+
+
+def _failing_database(exc: Exception):
+    @asynccontextmanager
+    async def session_scope():
+        raise exc
+        yield
+
+    return session_scope
+
+
+async def test_flush_writes_the_batch(client, create_user):
+    user, _ = await create_user()
+    audit = AuditLog()
+    audit.record("login", user.id)
+    audit.record("logout", str(user.id))
+
+    assert await audit.flush() == 2
+    assert await audit.flush() == 0
+    assert await _events_for(user.id) == 2
+
+
+async def test_last_login_is_the_latest_login_of_the_batch(client, create_user):
+    user, _ = await create_user()
+    other, _ = await create_user()
+    audit = AuditLog()
+    for _ in range(3):
+        audit.record("login", user.id)
+    audit.record("logout", user.id)
+    audit.record("login", other.id)
+    latest = max(
+        event["occurred_at"] for event in audit._events
+        if event["event"] == "login" and event["user_id"] == user.id
+    )
+
+    # One last_login_at update per user, however many logins
+    (_, updates), = audit._statements(audit._events, audit._last_logins)[1:]
+    assert sorted(update["user_id"] for update in updates) == sorted([user.id, other.id])
+
+    await audit.flush()
+    assert (await _last_login(user.id)).replace(tzinfo=None) == latest.replace(tzinfo=None)
+
+
+async def test_batch_is_requeued_while_the_database_is_unreachable(client, create_user, monkeypatch):
+    user, _ = await create_user()
+    audit = AuditLog()
+    audit.record("login", user.id)
+    first_login = audit._last_logins[user.id]
+
+    monkeypatch.setattr(audit_module, "session_scope", _failing_database(
+        OperationalError("INSERT", {}, ConnectionRefusedError("database down")),
+    ))
+    with pytest.raises(OperationalError):
+        await audit.flush()
+    # Recorded during the outage: after the requeued batch, and newer
+    audit.record("login", user.id)
+    assert len(audit) == 2
+    assert audit._events[0]["occurred_at"] == first_login
+    assert audit._last_logins[user.id] > first_login
+
+    monkeypatch.undo()
+    assert await audit.flush() == 2
+    assert await _events_for(user.id) == 2
+
+
+async def test_batch_rejected_by_the_database_is_dropped(client, create_user, monkeypatch):
+    user, _ = await create_user()
+    audit = AuditLog()
+    audit.record("login", user.id)
+    audit.record("logout", user.id)
+    dropped = _dropped()
+
+    monkeypatch.setattr(audit_module, "session_scope", _failing_database(
+        IntegrityError("INSERT", {}, ValueError("bad row")),
+    ))
+    with pytest.raises(IntegrityError):
+        await audit.flush()
+
+    assert len(audit) == 0
+    assert _dropped() == dropped + 2
+    monkeypatch.undo()
+    assert await audit.flush() == 0
+
+
+async def test_full_queue_drops_new_events(client, create_user):
+    user, _ = await create_user()
+    audit = AuditLog()
+    audit.max_queue = 2
+    dropped = _dropped()
+
+    for _ in range(3):
+        audit.record("login", user.id)
+
+    assert len(audit) == 2
+    assert _dropped() == dropped + 1
@@ -0,0 +1,238 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.concurrency import run_in_threadpool
+from jose import jwt
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.refresh import issue_refresh_token
+from app.core.config import settings
+from app.core.revocation import RevocationList, revocation_list
+from app.core.security import create_access_token
+from app.db.database import session_scope
+from app.db.models import RevokedToken
+from tests.conftest import API
+
+pytestmark = pytest.mark.anyio
+
+LOGOUT_PATH = f"{API}/auth/auth/logout"
+REFRESH_PATH = f"{API}/auth/auth/refresh"
+VALIDATE_PATH = f"{API}/auth/auth/validate"
+VALIDATE_BATCH_PATH = f"{VALIDATE_PATH}/batch"
+
+
+# --- Revocation list sync ---
+
+async def _add(row) -> None:
+    async with session_scope() as db:
+        db.add(row)
+        if isinstance(db, AsyncSession):
+            await db.commit()
+        else:
+            await run_in_threadpool(db.commit)
+
+
+async def _insert_revocation(row_id: int, jti: str, revoked_at: datetime) -> None:
+    await _add(RevokedToken(
+        id=row_id, jti=jti, revoked_at=revoked_at,
+        expires_at=datetime.now(timezone.utc) + timedelta(hours=1),
+    ))
+
+
+async def test_sync_picks_up_rows_committed_out_of_id_order(database_async):
+    base = 1_000_000 + uuid.uuid4().int % 1_000_000
+    early, late = f"early-{uuid.uuid4().hex}", f"late-{uuid.uuid4().hex}"
+    revocations = RevocationList()
+    async with session_scope() as db:
+        await revocations.sync(db)
+
+    # The higher id commits first; the lower one was inserted a moment
+    # before the next sync but only becomes visible after it
+    await _insert_revocation(base + 1, early, datetime.now(timezone.utc))
+    async with session_scope() as db:
+        await revocations.sync(db)
+    await _insert_revocation(base, late, datetime.now(timezone.utc) - timedelta(seconds=2))
+    async with session_scope() as db:
+        await revocations.sync(db)
+
+    assert revocations.is_revoked(early)
+    assert revocations.is_revoked(late)
+
+
+async def test_sync_ignores_expired_rows(database_async):
+    jti = f"expired-{uuid.uuid4().hex}"
+    await _add(RevokedToken(jti=jti, expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+    revocations = RevocationList()
+    async with session_scope() as db:
+        await revocations.sync(db)
+    assert not revocations.is_revoked(jti)
+
+
+# --- Logout ---
+
+async def test_logout_revokes_access_token(client, create_user):
+    _, token = await create_user()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = await client.post(LOGOUT_PATH, headers=headers)
+
+    assert response.status_code == 200
+    assert revocation_list.is_revoked(jwt.get_unverified_claims(token)["jti"])
+    assert (await client.get(VALIDATE_PATH, headers=headers)).status_code == 401
+
+
+async def test_logout_revokes_access_token_even_if_refresh_revoke_fails(client, create_user, monkeypatch):
+    async def failing_revoke(db, token):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr("app.auth.router.revoke_refresh_token", failing_revoke)
+    _, token = await create_user()
+    client.cookies.set("refresh_token", "some-refresh-token")
+
+    response = await client.post(LOGOUT_PATH, headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 503
+    assert "set-cookie" not in response.headers
+    assert revocation_list.is_revoked(jwt.get_unverified_claims(token)["jti"])
+
+
+async def test_logout_fails_when_revocation_is_not_saved(client, create_user, monkeypatch):
+    async def failing_revoke(db, jti, expires_at):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(revocation_list, "revoke", failing_revoke)
+    _, token = await create_user()
+
+    response = await client.post(LOGOUT_PATH, headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 503
+    assert response.json()["detail"] == "Logout could not be completed, please retry"
+
+
+
+# --- Google callback ---
+
+@pytest.mark.parametrize("source, userinfo_calls", [("id_token", 0), ("userinfo", 1)])
+async def test_callback_userinfo_source(google_login, provider, monkeypatch, source, userinfo_calls):
+    calls = []
+    original = provider.userinfo
+
+    def counting_userinfo(access_token):
+        calls.append(access_token)
+        return original(access_token)
+
+    monkeypatch.setattr(provider, "userinfo", counting_userinfo)
+    monkeypatch.setattr(settings, "GOOGLE_USERINFO_SOURCE", source)
+
+    response = await google_login(f"user-{uuid.uuid4().hex[:12]}@example.com")
+
+    assert response.status_code == 307
+    assert "/dashboard" in response.headers["location"]
+    assert len(calls) == userinfo_calls
+
+
+# --- Refresh tokens ---
+
+async def _login_refresh_token(create_user) -> str:
+    user, _ = await create_user()
+    async with session_scope() as db:
+        return await issue_refresh_token(db, user.id)
+
+
+async def _refresh(client, token: str):
+    return await client.post(REFRESH_PATH, json={"refresh_token": token})
+
+
+async def test_refresh_rotates_token(client, create_user):
+    first = await _login_refresh_token(create_user)
+
+    response = await _refresh(client, first)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["refresh_token"] != first
+    assert (await client.get(VALIDATE_PATH, headers={"Authorization": f"Bearer {body['access_token']}"})).status_code == 200
+    assert (await _refresh(client, body["refresh_token"])).status_code == 200
+
+
+async def test_refresh_replay_revokes_family(client, create_user, monkeypatch):
+    monkeypatch.setattr(settings, "REFRESH_TOKEN_REUSE_GRACE_SECONDS", 0)
+    first = await _login_refresh_token(create_user)
+    second = (await _refresh(client, first)).json()["refresh_token"]
+
+    assert (await _refresh(client, first)).status_code == 401
+    # The legitimate holder's token went with the rest of the family
+    assert (await _refresh(client, second)).status_code == 401
+
+
+async def test_refresh_replay_of_previous_token_within_grace(client, create_user):
+    first = await _login_refresh_token(create_user)
+    second = (await _refresh(client, first)).json()["refresh_token"]
+
+    # A second tab refreshing with the token the first tab just rotated
+    replayed = await _refresh(client, first)
+
+    assert replayed.status_code == 200
+    assert replayed.json()["refresh_token"] not in (first, second)
+    assert (await _refresh(client, second)).status_code == 200
+    assert (await _refresh(client, replayed.json()["refresh_token"])).status_code == 200
+
+
+async def test_refresh_grace_covers_only_previous_token(client, create_user):
+    first = await _login_refresh_token(create_user)
+    second = (await _refresh(client, first)).json()["refresh_token"]
+    third = (await _refresh(client, second)).json()["refresh_token"]
+
+    assert (await _refresh(client, first)).status_code == 401
+    assert (await _refresh(client, third)).status_code == 401
+
+
+async def test_refresh_grace_does_not_outlive_logout(client, create_user):
+    user, access_token = await create_user()
+    async with session_scope() as db:
+        first = await issue_refresh_token(db, user.id)
+    second = (await _refresh(client, first)).json()["refresh_token"]
+    client.cookies.set("refresh_token", second)
+
+    assert (await client.post(LOGOUT_PATH, headers={"Authorization": f"Bearer {access_token}"})).status_code == 200
+    assert (await _refresh(client, first)).status_code == 401
+
+
+# --- Batch validation ---
+
+@pytest.mark.parametrize("fast_json", [True, False])
+async def test_batch_validate_reports_each_token(client, create_user, monkeypatch, fast_json):
+    monkeypatch.setattr(settings, "FAST_JSON_ENABLED", fast_json)
+    user, valid = await create_user()
+    expired = create_access_token({"sub": str(user.id)}, expires_delta=timedelta(seconds=-1))
+    tokens = [valid, "not-a-jwt", expired, valid[:-4] + "AAAA"]
+
+    response = await client.post(VALIDATE_BATCH_PATH, json={"tokens": tokens})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [(result["valid"], result["error"]) for result in results] == [
+        (True, None), (False, "invalid_token"), (False, "expired"), (False, "invalid_token"),
+    ]
+    assert results[0]["user_id"] == str(user.id)
+    assert results[0]["expires_at"] == jwt.get_unverified_claims(valid)["exp"]
+
+
+async def test_batch_validate_reports_revoked_tokens(client, create_user):
+    _, access_token = await create_user()
+    assert (await client.post(LOGOUT_PATH, headers={"Authorization": f"Bearer {access_token}"})).status_code == 200
+
+    response = await client.post(VALIDATE_BATCH_PATH, json={"tokens": [access_token]})
+
+    assert response.json()["results"] == [
+        {"valid": False, "user_id": None, "expires_at": None, "error": "revoked"},
+    ]
+
+
+async def test_batch_validate_rejects_oversized_batches(client, monkeypatch):
+    monkeypatch.setattr(settings, "VALIDATE_BATCH_MAX_SIZE", 2)
+
+    response = await client.post(VALIDATE_BATCH_PATH, json={"tokens": ["a", "b", "c"]})
+
+    assert response.status_code == 413
@@ -0,0 +1,51 @@
+import httpx
+import pytest
+
+from benchmarks.bench import SCENARIOS, compare, parse_args, percentile, run_scenario, summarize
+
+
+def test_percentile_is_nearest_rank():
+    values = [float(n) for n in range(1, 101)]
+
+    assert percentile(values, 0.50) == 50.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([0.2], 0.99) == 0.2
+    assert percentile([], 0.5) == 0.0
+
+
+def test_summary_counts_errors_as_requests():
+    summary = summarize([0.003, 0.001, 0.002], errors=1, elapsed=2.0, concurrency=2)
+
+    assert summary["requests"] == 4
+    assert summary["rps"] == 2.0
+    assert (summary["p50_ms"], summary["max_ms"]) == (2.0, 3.0)
+
+
+def test_compare_flags_regressions_only():
+    baseline = {"results": {"me": {"errors": 0, "p95_ms": 10.0, "rps": 1000.0}}}
+    within = {"results": {"me": {"errors": 0, "p95_ms": 11.0, "rps": 900.0}}}
+    slower = {"results": {"me": {"errors": 2, "p95_ms": 13.0, "rps": 700.0}}}
+
+    assert compare(within, baseline, max_regression=0.2) == []
+    assert len(compare(slower, baseline, max_regression=0.2)) == 3
+
+
+def test_unknown_scenario_is_rejected():
+    assert parse_args(["--scenarios", "me,validate"]).scenarios == ["me", "validate"]
+    with pytest.raises(SystemExit):
+        parse_args(["--scenarios", "me,nope"])
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("scenario", SCENARIOS)
+async def test_scenario_runs_against_the_app(app, client, create_user, scenario):
+    tokens = [(await create_user())[1] for _ in range(2)]
+
+    async with httpx.AsyncClient() as provider_client:
+        result = await run_scenario(
+            scenario, app, provider_client, tokens, requests=6, concurrency=3, warmup=1,
+        )
+
+    assert (result["requests"], result["errors"], result["concurrency"]) == (6, 0, 3)
+    assert 0 < result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"] <= result["max_ms"]
+    assert result["rps"] > 0
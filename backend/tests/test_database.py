@@ -0,0 +1,122 @@
+import threading
+
+import pytest
+from sqlalchemy import select, text, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.auth.refresh import issue_refresh_token_sync, revoke_refresh_token, rotate_refresh_token_sync
+from app.core.metrics import db_queries_total, db_query_duration_seconds
+from app.core.config import settings
+from app.db.database import Base, RoutingSession, _create_engine, init_engines, session_scope, use_primary
+from app.db.models import RefreshToken, User
+
+
+def _observed(name: str) -> float:
+    # Observation count of one engine's duration histogram
+    series = db_query_duration_seconds._values.get((name,))
+    return sum(series[:-1]) if series else 0
+
+
+def test_failed_statements_leave_no_timing_state(tmp_path):
+    engine = _create_engine(f"sqlite:///{tmp_path / 'timing.db'}", "timing-test")
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+        conn.execute(text("SELECT 1"))
+        info = dict(conn.info)
+    engine.dispose()
+
+    assert not info.get("query_started")
+    assert db_queries_total._values[("timing-test",)] == 1
+    assert _observed("timing-test") == 1
+
+
+@pytest.mark.anyio
+async def test_sync_session_scope_closes_off_the_event_loop(app, monkeypatch):
+    # Build the engines first: ones built while DATABASE_ASYNC is off would
+    # have no async session factory and be kept for the tests that follow
+    init_engines()
+    monkeypatch.setattr(settings, "DATABASE_ASYNC", False)
+    closed_on = []
+    close = Session.close
+
+    def recording_close(self):
+        closed_on.append(threading.get_ident())
+        close(self)
+
+    monkeypatch.setattr(Session, "close", recording_close)
+    async with session_scope() as db:
+        assert isinstance(db, Session)
+        assert db.execute(text("SELECT 1")).scalar_one() == 1
+
+    assert closed_on and threading.get_ident() not in closed_on
+
+
+# --- Read/write routing ---
+
+@pytest.fixture
+def routed(tmp_path):
+    """
+    Session factory over a primary and one replica that lags: each has
+    its own SQLite file, so a read shows which one answered.
+    """
+    primary = _create_engine(f"sqlite:///{tmp_path / 'primary.db'}", "routing-primary")
+    replica = _create_engine(f"sqlite:///{tmp_path / 'replica.db'}", "routing-replica")
+    for engine, name in ((primary, "primary"), (replica, "replica")):
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE source (name TEXT)"))
+            conn.execute(text("INSERT INTO source VALUES (:name)"), {"name": name})
+    yield sessionmaker(class_=RoutingSession, primary=primary, replicas=[replica], expire_on_commit=False)
+    primary.dispose()
+    replica.dispose()
+
+
+def _source(db) -> str:
+    return db.execute(text("SELECT name FROM source")).scalar_one()
+
+
+def test_plain_reads_go_to_a_replica(routed):
+    with routed() as db:
+        assert _source(db) == "replica"
+        assert _source(db) == "replica"
+
+
+def test_reads_after_a_write_go_to_the_primary(routed):
+    with routed() as db:
+        assert _source(db) == "replica"
+        db.execute(update(User).where(User.email == "nobody@example.com").values(is_active=False))
+        assert _source(db) == "primary"
+
+
+def test_reads_after_a_flush_go_to_the_primary(routed):
+    with routed() as db:
+        db.add(User(email="flushed@example.com"))
+        db.flush()
+        assert _source(db) == "primary"
+        assert db.execute(select(User.email)).scalar_one() == "flushed@example.com"
+
+
+def test_use_primary_pins_reads(routed):
+    with routed() as db:
+        use_primary(db)
+        assert _source(db) == "primary"
+
+
+@pytest.mark.anyio
+async def test_logout_revokes_family_despite_lagging_replica(routed):
+    with routed() as db:
+        user = User(email="lagging@example.com")
+        db.add(user)
+        db.commit()
+        token = issue_refresh_token_sync(db, user.id)
+
+    # The replica has never seen the token
+    with routed() as db:
+        await revoke_refresh_token(db, token)
+    with routed() as db:
+        assert rotate_refresh_token_sync(db, token) is None
+        revoked = db.execute(select(RefreshToken.revoked_at)).scalars().all()
+    assert revoked and all(revoked_at is not None for revoked_at in revoked)
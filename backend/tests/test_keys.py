@@ -0,0 +1,105 @@
+import logging
+import threading
+import time
+from types import SimpleNamespace
+
+import anyio
+import pytest
+
+from app.core.keys import KeyRing
+
+
+def _rings(keys_dir) -> tuple[KeyRing, KeyRing]:
+    # Two workers sharing one key directory
+    return tuple(KeyRing("ES256", 3600, 60, 600, str(keys_dir)) for _ in range(2))
+
+
+def _next_period_kid(ring: KeyRing) -> str:
+    # Created by the other worker ahead of time, not yet seen by this one
+    later = time.time() + ring.rotation_interval
+    ring.refresh(later)
+    return ring._kid(ring._period_start(later))
+
+
+@pytest.mark.anyio
+async def test_kid_miss_reloads_off_the_event_loop(tmp_path, monkeypatch):
+    creator, verifier = _rings(tmp_path)
+    verifier.refresh()
+    kid = _next_period_kid(creator)
+
+    reload_threads = []
+    refresh = verifier.refresh
+
+    def recording_refresh(now=None):
+        reload_threads.append(threading.get_ident())
+        refresh(now)
+
+    monkeypatch.setattr(verifier, "refresh", recording_refresh)
+
+    assert verifier.verification_key(kid) is None
+    with anyio.fail_after(5):
+        while verifier.verification_key(kid) is None:
+            await anyio.sleep(0.01)
+    assert reload_threads
+    assert threading.get_ident() not in reload_threads
+
+
+def test_kid_miss_off_the_loop_reloads_inline(tmp_path):
+    creator, verifier = _rings(tmp_path)
+    verifier.refresh()
+    kid = _next_period_kid(creator)
+
+    assert verifier.verification_key(kid).kid == kid
+
+
+def test_unknown_kid_reloads_at_most_once_per_interval(tmp_path, monkeypatch):
+    _, verifier = _rings(tmp_path)
+    verifier.refresh()
+    calls = []
+    monkeypatch.setattr(verifier, "refresh", lambda now=None: calls.append(now))
+
+    for _ in range(3):
+        assert verifier.verification_key("es256-0") is None
+    assert len(calls) == 1
+
+
+# --- Signing ---
+
+def _unpublished_ring(keys_dir) -> KeyRing:
+    # No prepublishing: the next period's key only appears once it starts
+    return KeyRing("ES256", 3600, 0, 600, str(keys_dir))
+
+
+def test_signing_before_start_loads_keys_inline(tmp_path, caplog):
+    ring = _unpublished_ring(tmp_path)
+
+    with caplog.at_level(logging.INFO, logger="app.core.keys"):
+        key = ring.signing_key()
+
+    assert key.kid == ring._kid(ring._period_start(time.time()))
+    assert "inline" in caplog.text
+    assert ring.jwks()["keys"] == [key.public_jwk]
+
+
+@pytest.mark.anyio
+async def test_signing_after_start_leaves_rotation_to_the_background_task(tmp_path, monkeypatch, caplog):
+    ring = _unpublished_ring(tmp_path)
+    ring.start(3600)
+    try:
+        current = ring.signing_key()
+        calls = []
+        monkeypatch.setattr(ring, "refresh", lambda now=None: calls.append(now))
+        # The next period starts before the background task got to it
+        later = current.not_after + 1
+        monkeypatch.setattr("app.core.keys.time", SimpleNamespace(time=lambda: later, monotonic=time.monotonic))
+
+        with caplog.at_level(logging.WARNING, logger="app.core.keys"):
+            keys = [ring.signing_key() for _ in range(3)]
+            jwks = ring.jwks()
+
+        assert keys == [current] * 3
+        assert jwks["keys"] == [current.public_jwk]
+        assert not calls
+        assert len([r for r in caplog.records if "not rotated in yet" in r.getMessage()]) == 1
+    finally:
+        await ring.stop()
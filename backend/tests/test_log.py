@@ -0,0 +1,139 @@
+import io
+import json
+import logging
+import queue
+import threading
+import uuid
+from logging.handlers import QueueListener
+
+import pytest
+
+from app.core.log import (
+    ContextFilter,
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    SamplingFilter,
+    log_records_dropped_total,
+    parse_sample_rates,
+    request_id_var,
+)
+
+
+@pytest.fixture
+def pipeline():
+    """
+    A private logger wired like setup_logging(): a queue handler stamping
+    the request id, and JSON written by a listener thread.
+    Yields (logger, handler, lines); lines() stops the listener, which
+    drains the queue, and returns the JSON records written.
+    """
+    output = io.StringIO()
+    stream = logging.StreamHandler(output)
+    stream.setFormatter(JsonFormatter())
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=100))
+    handler.addFilter(ContextFilter())
+    logger = logging.getLogger(f"tests.log.{uuid.uuid4().hex}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    listener = QueueListener(handler.queue, stream)
+    listener.start()
+
+    def lines() -> list[dict]:
+        listener.stop()
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    yield logger, handler, lines
+    if listener._thread is not None:
+        listener.stop()
+
+
+def test_records_are_json_with_request_id_and_extra_fields(pipeline):
+    logger, _, lines = pipeline
+    token = request_id_var.set("req-123")
+    try:
+        logger.info("User %s logged in", "a@example.com", extra={"event": "auth.login_succeeded"})
+    finally:
+        request_id_var.reset(token)
+    logger.warning("No request here")
+
+    first, second = lines()
+    assert first["message"] == "User a@example.com logged in"
+    assert first["request_id"] == "req-123"
+    assert first["event"] == "auth.login_succeeded"
+    assert first["level"] == "INFO" and first["ts"].endswith("Z")
+    assert "request_id" not in second
+
+
+def test_message_is_formatted_on_the_listener_thread(pipeline):
+    logger, handler, lines = pipeline
+    formatted_on = []
+
+    class Argument:
+        def __str__(self):
+            formatted_on.append(threading.get_ident())
+            return "argument"
+
+    # Straight to the handler: pytest's own log capture formats on this thread
+    handler.handle(logger.makeRecord(logger.name, logging.INFO, __file__, 0, "Lazy %s", (Argument(),), None))
+    assert not formatted_on
+
+    assert lines()[0]["message"] == "Lazy argument"
+    assert formatted_on and threading.get_ident() not in formatted_on
+
+
+def test_tracebacks_are_kept(pipeline):
+    logger, _, lines = pipeline
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Failed")
+
+    assert "ValueError: boom" in lines()[0]["exc"]
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    logger = logging.getLogger(f"tests.log.{uuid.uuid4().hex}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    dropped = log_records_dropped_total._values.get((), 0.0)
+
+    for _ in range(3):
+        logger.warning("burst")
+
+    assert handler.queue.qsize() == 1
+    assert log_records_dropped_total._values[()] == dropped + 2
+
+
+def test_sampling_only_thins_listed_success_events():
+    sampler = SamplingFilter({"auth.login_succeeded": 0.0, "auth.logout": 1.0})
+
+    def record(level, event=None):
+        made = logging.makeLogRecord({"levelno": level})
+        if event:
+            made.event = event
+        return made
+
+    assert not sampler.filter(record(logging.INFO, "auth.login_succeeded"))
+    assert sampler.filter(record(logging.WARNING, "auth.login_succeeded"))
+    assert sampler.filter(record(logging.INFO, "auth.logout"))
+    assert sampler.filter(record(logging.INFO, "other"))
+    assert sampler.filter(record(logging.INFO))
+
+
+def test_sample_rates_are_parsed_and_clamped():
+    assert parse_sample_rates("a=0.1, b=2,c=-1,junk,") == {"a": 0.1, "b": 1.0, "c": 0.0}
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("incoming, echoed", [("trace-42.a:b", True), ("bad id!", False), (None, False)])
+async def test_request_id_header(client, incoming, echoed):
+    headers = {"X-Request-ID": incoming} if incoming else {}
+
+    response = await client.get("/health", headers=headers)
+
+    request_id = response.headers["x-request-id"]
+    assert (request_id == incoming) is echoed
+    assert request_id
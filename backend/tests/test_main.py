@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter, so nothing the test session loaded counts
+_PROBE = textwrap.dedent("""
+    import json
+    import sys
+
+    import app.main
+
+    heavy = ("jose", "authlib", "cryptography", "sqlalchemy", "httpx", "app.db.database", "app.auth.service")
+    report = {"imported": sorted(name for name in heavy if name in sys.modules)}
+
+    from app.core.config import get_settings
+    report["settings_at_import"] = get_settings.cache_info().currsize
+
+    application = app.main.create_app()
+
+    from app.auth.service import get_google_client
+    from app.db import database
+    report["settings_after_create"] = get_settings.cache_info().currsize
+    report["engines_after_create"] = database._engines is not None
+    report["oauth_client_after_create"] = get_google_client.cache_info().currsize
+    report["module_app_is_cached"] = app.main.app is app.main.app
+    print(json.dumps(report))
+""")
+
+
+@pytest.fixture(scope="module")
+def probe() -> dict:
+    # The session's environment (fake provider, throwaway database) is
+    # inherited by the child
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=BACKEND_DIR, env=dict(os.environ),
+        capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_importing_the_app_has_no_side_effects(probe):
+    assert probe["imported"] == []
+    assert probe["settings_at_import"] == 0
+
+
+def test_create_app_leaves_engines_and_oauth_client_to_the_lifespan(probe):
+    assert probe["settings_after_create"] == 1
+    assert probe["engines_after_create"] is False
+    assert probe["oauth_client_after_create"] == 0
+
+
+def test_module_level_app_is_built_once(probe):
+    assert probe["module_app_is_cached"] is True
+
+
+@pytest.mark.anyio
+async def test_lifespan_builds_the_engines(app):
+    from app.db import database
+
+    async with app.router.lifespan_context(app):
+        assert database._engines is not None
+    assert database._engines is None
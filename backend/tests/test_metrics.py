@@ -0,0 +1,51 @@
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI
+
+from app.core.metrics import MetricsMiddleware, http_requests_total
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def metered():
+    router = APIRouter()
+
+    @router.get("/shelves/{shelf}/items/{item}")
+    async def get_item(shelf: str, item: str):
+        return {"shelf": shelf, "item": item}
+
+    application = FastAPI()
+    application.add_middleware(MetricsMiddleware)
+    application.include_router(router, prefix="/metered")
+    transport = httpx.ASGITransport(app=application)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test.local") as http_client:
+        yield http_client
+
+
+def _requests(route: str) -> float:
+    return sum(
+        value for (method, label, status), value in http_requests_total._values.items()
+        if label == route
+    )
+
+
+async def test_requests_are_labelled_by_route_template(metered):
+    route = "/metered/shelves/{shelf}/items/{item}"
+    before = _requests(route)
+    labels = {label for _, label, _ in http_requests_total._values}
+
+    # Parameter values that collide with static segments, or with each other
+    for path in ("/metered/shelves/items/items/items", "/metered/shelves/metered/items/metered"):
+        response = await metered.get(path)
+        assert response.status_code == 200
+
+    assert _requests(route) == before + 2
+    assert {label for _, label, _ in http_requests_total._values} - labels <= {route}
+
+
+async def test_unmatched_paths_share_a_label(metered):
+    before = _requests("unmatched")
+    response = await metered.get("/metered/nowhere/123")
+    assert response.status_code == 404
+    assert _requests("unmatched") == before + 1
@@ -0,0 +1,114 @@
+import uuid
+from contextlib import AsyncExitStack
+from urllib.parse import urlsplit
+
+import anyio
+import httpx
+import pytest
+
+from app.auth.state import DatabaseStateStore, MemoryStateStore, SharedStateStore
+from app.core.shared_store import InMemorySharedStore
+from tests.conftest import LOGIN_PATH
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(params=["memory", "database", "shared"])
+def store(request, app):
+    if request.param == "memory":
+        return MemoryStateStore()
+    if request.param == "database":
+        return DatabaseStateStore()
+    return SharedStateStore(InMemorySharedStore())
+
+
+def _state() -> str:
+    return uuid.uuid4().hex
+
+
+# --- Stores ---
+
+async def test_state_is_handed_out_once(store):
+    state = _state()
+    await store.save(state, {"nonce": "n"}, ttl=60)
+
+    assert await store.pop(state) == {"nonce": "n"}
+    assert await store.pop(state) is None
+
+
+async def test_concurrent_pops_get_the_state_once(store):
+    state = _state()
+    await store.save(state, {"nonce": "n"}, ttl=60)
+    popped = []
+
+    async def pop():
+        popped.append(await store.pop(state))
+
+    async with anyio.create_task_group() as tg:
+        for _ in range(5):
+            tg.start_soon(pop)
+
+    assert popped.count({"nonce": "n"}) == 1
+    assert popped.count(None) == 4
+
+
+async def test_state_expires(store):
+    state = _state()
+    await store.save(state, {"nonce": "n"}, ttl=0.05)
+    await anyio.sleep(0.1)
+
+    assert await store.pop(state) is None
+
+
+async def test_unknown_state_is_none(store):
+    assert await store.pop(_state()) is None
+
+
+# --- Cookie binding ---
+
+@pytest.fixture
+async def browsers(app, client):
+    """
+    Returns a factory of clients with their own cookie jars.
+    """
+    async with AsyncExitStack() as stack:
+        def browser() -> httpx.AsyncClient:
+            transport = httpx.ASGITransport(app=app)
+            http_client = httpx.AsyncClient(transport=transport, base_url=str(client.base_url))
+            stack.push_async_callback(http_client.aclose)
+            return http_client
+
+        yield browser
+
+
+async def _authorize(browser: httpx.AsyncClient) -> str:
+    # Starts a login and lets the provider approve it; returns the callback URL
+    started = await browser.get(LOGIN_PATH)
+    authorization_url = httpx.URL(started.json()["authorization_url"])
+    async with httpx.AsyncClient() as provider_client:
+        hint = {"login_hint": f"user-{uuid.uuid4().hex[:12]}@example.com"}
+        authorize = await provider_client.get(authorization_url.copy_merge_params(hint))
+    callback = urlsplit(authorize.headers["location"])
+    return f"{callback.path}?{callback.query}"
+
+
+def _logged_in(response: httpx.Response) -> bool:
+    return response.status_code == 307 and response.headers["location"].endswith("/dashboard")
+
+
+async def test_callback_in_another_browser_is_rejected(browsers):
+    victim, attacker = browsers(), browsers()
+    callback = await _authorize(victim)
+    await attacker.get(LOGIN_PATH)
+
+    assert not _logged_in(await attacker.get(callback))
+    # The rejected attempt did not consume the victim's login
+    assert _logged_in(await victim.get(callback))
+
+
+async def test_callback_replay_is_rejected(browsers):
+    browser = browsers()
+    callback = await _authorize(browser)
+
+    assert _logged_in(await browser.get(callback))
+    assert not _logged_in(await browser.get(callback))
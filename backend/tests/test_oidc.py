@@ -0,0 +1,61 @@
+import uuid
+
+import anyio
+import httpx
+import pytest
+
+from app.auth.oidc import OIDCMetadataCache, cache_lifetime
+from app.auth.service import get_google_metadata
+
+pytestmark = pytest.mark.anyio
+
+DISCOVERY_PATH = "/.well-known/openid-configuration"
+
+
+async def test_concurrent_callbacks_reuse_prefetched_metadata(google_login, provider):
+    # The lifespan warmed the cache; callbacks must not fetch either document
+    assert get_google_metadata().jwks == provider.jwks
+    provider.requests.clear()
+
+    responses = []
+
+    async def login():
+        responses.append(await google_login(f"user-{uuid.uuid4().hex[:12]}@example.com"))
+
+    async with anyio.create_task_group() as group:
+        for _ in range(5):
+            group.start_soon(login)
+
+    assert [response.status_code for response in responses] == [307] * 5
+    assert provider.requests["/token"] == 5
+    assert provider.requests[DISCOVERY_PATH] == 0
+    assert provider.requests["/jwks"] == 0
+
+
+async def test_failed_refresh_keeps_last_good_copy(client, provider):
+    updates = []
+    cache = OIDCMetadataCache(
+        f"{provider.issuer}{DISCOVERY_PATH}", 300, 86_400, 3_600, 30, 5.0,
+        on_update=lambda metadata, jwks: updates.append(jwks),
+    )
+    # The provider's Cache-Control max-age, within the configured bounds
+    assert await cache.refresh() == 3_600
+
+    cache.discovery_url = f"{provider.issuer}/missing"
+    with pytest.raises(httpx.HTTPStatusError):
+        await cache.refresh()
+
+    assert cache.jwks == provider.jwks
+    assert cache.metadata["issuer"] == provider.issuer
+    assert len(updates) == 1
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"Cache-Control": "public, max-age=600"}, 600),
+    ({"Cache-Control": "max-age=600", "Age": "100"}, 500),
+    ({"Cache-Control": "no-store"}, 0),
+    ({"Expires": "Thu, 01 Jan 1970 00:00:00 GMT"}, 0),
+    ({}, 42),
+])
+def test_cache_lifetime(headers, expected):
+    assert cache_lifetime(httpx.Headers(headers), 42) == expected
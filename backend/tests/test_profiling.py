@@ -0,0 +1,95 @@
+import os
+import time
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.core.profiling import ProfileStore
+
+pytestmark = pytest.mark.anyio
+
+TOKEN = "profile-me"
+
+
+@pytest.fixture
+def profiled_app(tmp_path, monkeypatch):
+    """
+    Returns a factory building an app with profiling enabled for the
+    given format and sample rate, profiles written under tmp_path.
+    """
+    from app.main import create_app
+
+    def build(fmt: str = "cprofile", sample_rate: float = 0.0):
+        monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+        monkeypatch.setattr(settings, "PROFILING_TOKEN", TOKEN)
+        monkeypatch.setattr(settings, "PROFILING_FORMAT", fmt)
+        monkeypatch.setattr(settings, "PROFILING_SAMPLE_RATE", sample_rate)
+        monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+        application = create_app()
+
+        @application.get("/busy")
+        async def busy_endpoint():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+            return {}
+
+        return application
+
+    return build
+
+
+def _client(application) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=application), base_url="http://test.local")
+
+
+async def test_header_profiles_a_request(profiled_app):
+    async with _client(profiled_app()) as client:
+        plain = await client.get("/health")
+        wrong = await client.get("/health", headers={"X-Profile": "guess"})
+        profiled = await client.get("/health", headers={"X-Profile": TOKEN})
+        profile_id = profiled.headers["x-profile-id"]
+
+        listing = (await client.get("/debug/profiles", headers={"X-Profile": TOKEN})).json()
+        profile = await client.get(f"/debug/profiles/{profile_id}", headers={"X-Profile": TOKEN})
+
+    assert "x-profile-id" not in plain.headers and "x-profile-id" not in wrong.headers
+    record, = listing["recent"]
+    assert (record["id"], record["trigger"], record["path"], record["status"]) == (profile_id, "header", "/health", 200)
+    assert os.path.exists(record["file"])
+    assert profile.status_code == 200
+    assert "cumulative" in profile.text
+
+
+async def test_sampled_requests_are_profiled_as_collapsed_stacks(profiled_app):
+    async with _client(profiled_app(fmt="collapsed", sample_rate=1.0)) as client:
+        response = await client.get("/busy")
+        profile = await client.get(f"/debug/profiles/{response.headers['x-profile-id']}", headers={"X-Profile": TOKEN})
+
+    # "frame;frame;frame count" lines, for flamegraph.pl or speedscope
+    lines = profile.text.splitlines()
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("busy_endpoint" in line for line in lines)
+
+
+async def test_profiles_require_the_token(profiled_app):
+    async with _client(profiled_app()) as client:
+        assert (await client.get("/debug/profiles")).status_code == 403
+        assert (await client.get("/debug/profiles", headers={"X-Profile": "guess"})).status_code == 403
+        missing = await client.get("/debug/profiles/nope", headers={"X-Profile": TOKEN})
+    assert missing.status_code == 404
+
+
+def test_store_keeps_slowest_and_latest(tmp_path):
+    store = ProfileStore(str(tmp_path), top_n=2)
+    for index, duration in enumerate([50.0, 1.0, 40.0, 2.0, 3.0]):
+        record = {"id": str(index), "duration_ms": duration, "file": str(tmp_path / f"{index}.prof")}
+        store.add(record, b"profile")
+
+    listing = store.listing()
+    assert [item["id"] for item in listing["slowest"]] == ["0", "2"]
+    assert [item["id"] for item in listing["recent"]] == ["4", "3"]
+    # Profiles that left both lists are deleted from disk
+    assert sorted(os.listdir(tmp_path)) == ["0.prof", "2.prof", "3.prof", "4.prof"]
+    assert store.get("1") is None
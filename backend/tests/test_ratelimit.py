@@ -0,0 +1,150 @@
+import httpx
+import pytest
+
+from app.core.config import Settings
+from app.core.ratelimit import (
+    VALIDATE_ROUTE,
+    VALIDATE_SINGLE_ROUTE,
+    RateLimitMiddleware,
+    RateLimitRule,
+    SharedWindowLimiter,
+    SlidingWindowLimiter,
+)
+from app.core.security import create_access_token
+from app.core.shared_store import InMemorySharedStore
+from tests.conftest import API, UnavailableStore
+
+pytestmark = pytest.mark.anyio
+
+VALIDATE_PATH = f"{API}/auth/auth/validate"
+BATCH_PATH = f"{API}/auth/auth/validate/batch"
+
+
+# --- Sliding window ---
+
+def test_limiter_rejects_over_limit_without_counting():
+    limiter = SlidingWindowLimiter(limit=2, window=60, max_keys=10)
+
+    assert limiter.hit("a", now=0) == 0
+    assert limiter.hit("a", now=1) == 0
+    assert limiter.hit("a", now=2) == 58
+    assert limiter.hit("b", now=2) == 0
+    # Rejected hits are not counted: the previous window holds two hits,
+    # weighted down to one halfway through the next
+    assert limiter.hit("a", now=90) == 0
+    assert limiter.hit("a", now=90) == 30
+
+
+def test_check_counts_nothing():
+    limiter = SlidingWindowLimiter(limit=1, window=60, max_keys=10)
+
+    assert limiter.check("a", now=0) == 0
+    assert limiter.check("a", now=0) == 0
+    assert len(limiter) == 0
+    limiter.record("a", now=0)
+    assert limiter.check("a", now=0) == 60
+
+
+def test_limiter_evicts_least_recently_seen_key():
+    limiter = SlidingWindowLimiter(limit=1, window=60, max_keys=2)
+    for key in ("a", "b", "a", "c"):
+        limiter.record(key, now=0)
+
+    assert len(limiter) == 2
+    assert limiter.evictions == 1
+    assert limiter.check("b", now=0) == 0
+    assert limiter.check("a", now=0) == 60
+
+
+async def test_shared_limiter_counts_across_limiters():
+    store = InMemorySharedStore()
+    first = SharedWindowLimiter(store, SlidingWindowLimiter(2, 3600, 10))
+    second = SharedWindowLimiter(store, SlidingWindowLimiter(2, 3600, 10))
+
+    assert await first.check("a") == 0
+    await first.record("a")
+    await second.record("a")
+
+    assert await first.check("a") > 0
+    assert await second.check("a") > 0
+
+
+async def test_shared_limiter_falls_back_to_local_counts():
+    limiter = SharedWindowLimiter(UnavailableStore(), SlidingWindowLimiter(1, 3600, 10))
+
+    assert await limiter.check("a") == 0
+    await limiter.record("a")
+    assert await limiter.check("a") > 0
+
+
+# --- Middleware ---
+
+async def _ok(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def _rule(name, pattern, key, limit) -> RateLimitRule:
+    return RateLimitRule(name, pattern, key, SlidingWindowLimiter(limit, 3600, 100))
+
+
+def _client(middleware: RateLimitMiddleware, ip: str = "203.0.113.7") -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=middleware, client=(ip, 4321))
+    return httpx.AsyncClient(transport=transport, base_url="http://test.local")
+
+
+def _bearer(sub: str) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': sub})}"}
+
+
+async def test_request_rejected_by_one_rule_is_not_counted_by_others():
+    per_ip = _rule("validate_ip", VALIDATE_ROUTE, "ip", 3)
+    per_sub = _rule("validate_sub", VALIDATE_SINGLE_ROUTE, "sub", 1)
+    async with _client(RateLimitMiddleware(_ok, [per_ip, per_sub])) as client:
+        alice, bob = _bearer("alice"), _bearer("bob")
+        assert (await client.get(VALIDATE_PATH, headers=alice)).status_code == 200
+        assert (await client.get(VALIDATE_PATH, headers=alice)).status_code == 429
+        assert (await client.get(VALIDATE_PATH, headers=alice)).status_code == 429
+
+        # Alice's rejected requests left the per-IP budget untouched
+        assert (await client.get(VALIDATE_PATH, headers=bob)).status_code == 200
+        assert (await client.post(BATCH_PATH)).status_code == 200
+        response = await client.post(BATCH_PATH)
+
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    assert (per_ip.rejected, per_sub.rejected) == (1, 2)
+
+
+async def test_forged_sub_does_not_use_the_victims_bucket():
+    per_sub = _rule("validate_sub", VALIDATE_SINGLE_ROUTE, "sub", 1)
+    forged = create_access_token({"sub": "victim"})[:-4] + "AAAA"
+    async with _client(RateLimitMiddleware(_ok, [per_sub])) as client:
+        for _ in range(3):
+            await client.get(VALIDATE_PATH, headers={"Authorization": f"Bearer {forged}"})
+        response = await client.get(VALIDATE_PATH, headers=_bearer("victim"))
+
+    assert response.status_code == 200
+
+
+async def test_per_sub_rule_skips_batch_route():
+    per_sub = _rule("validate_sub", VALIDATE_SINGLE_ROUTE, "sub", 1)
+    async with _client(RateLimitMiddleware(_ok, [per_sub])) as client:
+        statuses = [(await client.post(BATCH_PATH, headers=_bearer("gateway"))).status_code for _ in range(3)]
+
+    assert statuses == [200, 200, 200]
+
+
+async def test_allowlisted_clients_are_not_limited():
+    rules = [_rule("validate_ip", VALIDATE_ROUTE, "ip", 1)]
+    allowlist = Settings(RATE_LIMIT_ALLOWLIST="10.0.0.0/8, 192.0.2.1").rate_limit_allowlist
+    middleware = RateLimitMiddleware(_ok, rules, allowlist)
+
+    async with _client(middleware, "10.1.2.3") as client:
+        assert [(await client.get(VALIDATE_PATH)).status_code for _ in range(3)] == [200, 200, 200]
+    async with _client(middleware, "203.0.113.7") as client:
+        assert [(await client.get(VALIDATE_PATH)).status_code for _ in range(2)] == [200, 429]
+
+
+def test_rate_limiting_is_off_by_default():
+    assert Settings.model_fields["RATE_LIMIT_ENABLED"].default is False
@@ -0,0 +1,70 @@
+import json
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from app.auth.schemas import TokenValidationResponse
+from app.core import responses
+from app.core.config import settings
+from app.core.responses import FastJSONResponse, dumps, json_response, model_response
+from benchmarks.serialization import _cases
+from tests.conftest import API
+
+ME_PATH = f"{API}/users/users/me"
+VALIDATE_PATH = f"{API}/auth/auth/validate"
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_is_compact_json(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(responses, "orjson", None)
+    user_id = uuid.uuid4()
+    at = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+    body = dumps({"id": user_id, "at": at, "name": "Zoë", "n": [1, 2.5, None, True]})
+
+    assert b" " not in body
+    decoded = json.loads(body)
+    assert decoded["id"] == str(user_id)
+    assert decoded["at"] == "2026-01-02T03:04:05+00:00"
+    assert (decoded["name"], decoded["n"]) == ("Zoë", [1, 2.5, None, True])
+
+
+def test_model_response_serializes_the_model_once():
+    model = TokenValidationResponse(valid=True, user_id="abc", expires_at=1_900_000_000)
+
+    response = model_response(model, status_code=201, headers={"X-Test": "1"})
+
+    assert response.body == model.model_dump_json().encode()
+    assert (response.status_code, response.media_type, response.headers["x-test"]) == (201, "application/json", "1")
+
+
+def test_json_response_and_default_class_render_the_same_bytes():
+    content = {"valid": False, "user_id": None}
+
+    assert json_response(content).body == FastJSONResponse(content).body == dumps(content)
+
+
+def test_benchmark_cases_agree(monkeypatch):
+    # The cases flip FAST_JSON_ENABLED; restored afterwards
+    monkeypatch.setattr(settings, "FAST_JSON_ENABLED", settings.FAST_JSON_ENABLED)
+
+    for name, (current, fast) in _cases().items():
+        assert json.loads(current()) == json.loads(fast()), name
+
+
+@pytest.mark.anyio
+async def test_hot_endpoints_return_the_same_body_either_way(client, create_user, monkeypatch):
+    _, token = await create_user()
+    headers = {"Authorization": f"Bearer {token}"}
+    bodies = {}
+    for enabled in (False, True):
+        monkeypatch.setattr(settings, "FAST_JSON_ENABLED", enabled)
+        me = await client.get(ME_PATH, headers=headers)
+        validate = await client.get(VALIDATE_PATH, headers=headers)
+        assert me.status_code == validate.status_code == 200
+        assert me.headers["content-type"] == validate.headers["content-type"] == "application/json"
+        bodies[enabled] = (me.json(), validate.json())
+
+    assert bodies[True] == bodies[False]
@@ -0,0 +1,79 @@
+import time
+from datetime import timedelta
+
+import pytest
+from jose import jwt
+
+from app.core import security
+from app.core.cache import TTLCache
+from app.core.revocation import revocation_list
+from app.core.security import TokenRevokedError, create_access_token, decode_access_token
+from app.db.database import session_scope
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = TTLCache(maxsize=2, ttl=300)
+    monkeypatch.setattr(security, "token_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def verifications(monkeypatch):
+    # Tokens that went through the full signature check
+    verified = []
+    verify = security._verify_signature
+
+    def counting_verify(token):
+        verified.append(token)
+        return verify(token)
+
+    monkeypatch.setattr(security, "_verify_signature", counting_verify)
+    return verified
+
+
+def _remaining_ttl(cache: TTLCache) -> float:
+    (expires_at, _), = cache._data.values()
+    return expires_at - time.monotonic()
+
+
+def test_repeated_token_is_verified_once(cache, verifications):
+    token = create_access_token({"sub": "a@example.com"})
+
+    for _ in range(3):
+        assert decode_access_token(token)["sub"] == "a@example.com"
+
+    assert verifications == [token]
+    assert cache.hits == 2
+
+
+def test_cache_entry_does_not_outlive_the_token(cache):
+    decode_access_token(create_access_token({"sub": "a@example.com"}, timedelta(seconds=30)))
+
+    assert 0 < _remaining_ttl(cache) <= 30
+
+
+def test_least_recently_used_token_is_evicted(cache, verifications):
+    first, second, third = (create_access_token({"sub": f"{n}@example.com"}) for n in range(3))
+    for token in (first, second, first, third):
+        decode_access_token(token)
+
+    assert cache.evictions == 1
+    # second was the least recently used: only it is verified again
+    decode_access_token(first)
+    decode_access_token(second)
+    assert verifications == [first, second, third, second]
+
+
+@pytest.mark.anyio
+async def test_revocation_is_checked_after_a_cache_hit(app, cache):
+    token = create_access_token({"sub": "a@example.com"})
+    decode_access_token(token)
+
+    claims = jwt.get_unverified_claims(token)
+    async with session_scope() as db:
+        await revocation_list.revoke(db, claims["jti"], claims["exp"])
+
+    with pytest.raises(TokenRevokedError):
+        decode_access_token(token)
+    assert cache.hits == 1
@@ -0,0 +1,117 @@
+import asyncio
+import uuid
+from urllib.parse import urlsplit
+
+import httpx
+import pytest
+
+from app.core.singleflight import SingleFlight
+from tests.conftest import LOGIN_PATH
+
+pytestmark = pytest.mark.anyio
+
+
+async def _gather(count: int, fn) -> list:
+    return await asyncio.gather(*(fn() for _ in range(count)))
+
+
+async def test_concurrent_callers_share_one_call():
+    flights = SingleFlight()
+    calls = []
+    release = asyncio.Event()
+
+    async def fetch():
+        calls.append(1)
+        await release.wait()
+        return "result"
+
+    callers = [asyncio.create_task(flights.do("key", fetch)) for _ in range(10)]
+    await asyncio.sleep(0.01)
+    release.set()
+    results = await asyncio.gather(*callers)
+
+    assert len(calls) == 1
+    assert [result for result, _ in results] == ["result"] * 10
+    assert [shared for _, shared in results] == [False] + [True] * 9
+    assert len(flights) == 0
+
+
+async def test_error_reaches_every_waiter_and_releases_the_key():
+    flights = SingleFlight(remember=60)
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream failed")
+
+    results = await asyncio.gather(*(flights.do("key", failing) for _ in range(5)), return_exceptions=True)
+
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(flights) == 0
+
+    async def succeeding():
+        return "recovered"
+
+    # Failures are not remembered: the next caller runs fn again
+    assert await flights.do("key", succeeding) == ("recovered", False)
+
+
+async def test_finished_key_runs_again_unless_remembered():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+
+    plain = SingleFlight()
+    assert await plain.do("key", fetch) == (1, False)
+    assert await plain.do("key", fetch) == (2, False)
+
+    remembering = SingleFlight(remember=60)
+    assert await remembering.do("key", fetch) == (3, False)
+    assert await remembering.do("key", fetch) == (3, True)
+
+
+async def test_cancelled_caller_does_not_cancel_the_others():
+    flights = SingleFlight()
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return "result"
+
+    starter = asyncio.create_task(flights.do("key", fetch))
+    await asyncio.sleep(0)
+    joiner = asyncio.create_task(flights.do("key", fetch))
+    await asyncio.sleep(0)
+    # The caller that started the work goes away (client disconnect)
+    starter.cancel()
+    release.set()
+
+    assert await joiner == ("result", True)
+    with pytest.raises(asyncio.CancelledError):
+        await starter
+
+
+# --- Duplicate callbacks ---
+
+async def test_replayed_callback_exchanges_the_code_once(app, client, provider):
+    transport = httpx.ASGITransport(app=app)
+    async with (
+        httpx.AsyncClient(transport=transport, base_url=str(client.base_url)) as browser,
+        httpx.AsyncClient() as provider_client,
+    ):
+        started = await browser.get(LOGIN_PATH)
+        authorization_url = httpx.URL(started.json()["authorization_url"])
+        email = f"user-{uuid.uuid4().hex[:12]}@example.com"
+        authorize = await provider_client.get(authorization_url.copy_merge_params({"login_hint": email}))
+        callback = urlsplit(authorize.headers["location"])
+        provider.requests.clear()
+
+        # A double click: the browser sends the same callback several times
+        responses = await _gather(5, lambda: browser.get(f"{callback.path}?{callback.query}"))
+
+    assert [response.status_code for response in responses] == [307] * 5
+    assert provider.requests["/token"] == 1
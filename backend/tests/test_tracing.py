@@ -0,0 +1,138 @@
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.tracing import InMemorySpanExporter, Tracer, configure_tracing, parse_traceparent
+from tests.conftest import API
+
+pytestmark = pytest.mark.anyio
+
+CALLBACK_PATH = f"{API}/auth/auth/callback/google"
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture
+def spans(client):
+    """
+    In-memory exporter recording every span while the test runs (the
+    lifespan switches tracing back off on shutdown).
+    """
+    exporter = InMemorySpanExporter()
+    configure_tracing(exporter, 1.0)
+    return exporter
+
+
+def _only(spans: InMemorySpanExporter, name: str):
+    found = spans.find(name)
+    assert len(found) == 1, f"expected one {name!r} span, got {len(found)}"
+    return found[0]
+
+
+def _email() -> str:
+    return f"user-{uuid.uuid4().hex[:12]}@example.com"
+
+
+# --- Callback span tree ---
+
+async def test_callback_span_tree(google_login, spans):
+    response = await google_login(_email())
+    assert response.status_code == 307
+
+    server = _only(spans, f"GET {CALLBACK_PATH}")
+    handle = _only(spans, "oauth.handle_callback")
+    exchange = _only(spans, "oauth.exchange_code")
+    verify = _only(spans, "oauth.verify_id_token")
+    token_request = next(span for span in spans.spans if span.kind == "CLIENT" and span.parent_id == exchange.span_id)
+
+    assert server.kind == "SERVER"
+    assert server.attributes["http.response.status_code"] == 307
+    assert handle.parent_id == server.span_id
+    assert exchange.parent_id == handle.span_id
+    assert verify.parent_id == exchange.span_id
+    assert _only(spans, "users.upsert").parent_id == handle.span_id
+    assert _only(spans, "auth.issue_refresh_token").parent_id == server.span_id
+    assert {span.trace_id for span in (server, handle, exchange, verify, token_request)} == {server.trace_id}
+    assert all(span.status == "UNSET" for span in spans.spans)
+
+
+async def test_callback_continues_incoming_trace(google_login, spans):
+    response = await google_login(_email(), headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"})
+    assert response.status_code == 307
+
+    server = _only(spans, f"GET {CALLBACK_PATH}")
+    assert server.trace_id == TRACE_ID
+    assert server.parent_id == PARENT_ID
+    assert _only(spans, "oauth.handle_callback").trace_id == TRACE_ID
+
+
+async def test_callback_ignores_malformed_traceparent(google_login, spans):
+    response = await google_login(_email(), headers={"traceparent": f"00-{'0' * 32}-{PARENT_ID}-01"})
+    assert response.status_code == 307
+
+    server = _only(spans, f"GET {CALLBACK_PATH}")
+    assert server.parent_id is None
+    assert server.trace_id != "0" * 32
+
+
+async def test_callback_client_error_marks_failing_span(client, spans):
+    response = await client.get(CALLBACK_PATH, params={"state": "unknown", "code": "code"})
+    assert response.status_code == 400
+
+    handle = _only(spans, "oauth.handle_callback")
+    assert handle.status == "ERROR"
+    assert handle.status_message.startswith("HTTPException")
+    # A 4xx is the caller's fault, not the server's
+    server = _only(spans, f"GET {CALLBACK_PATH}")
+    assert server.status == "UNSET"
+    assert server.attributes["http.response.status_code"] == 400
+
+
+async def test_callback_server_error_marks_server_span(google_login, spans, monkeypatch):
+    async def failing_issue(db, user_id):
+        raise HTTPException(status_code=503, detail="Refresh tokens unavailable")
+
+    monkeypatch.setattr("app.auth.router.issue_refresh_token", failing_issue)
+    response = await google_login(_email())
+    assert response.status_code == 503
+
+    assert _only(spans, "auth.issue_refresh_token").status == "ERROR"
+    assert _only(spans, "oauth.handle_callback").status == "UNSET"
+    assert _only(spans, f"GET {CALLBACK_PATH}").status == "ERROR"
+
+
+# --- Trace context ---
+
+def test_traceparent_round_trip():
+    tracer = Tracer(InMemorySpanExporter(), 1.0)
+    with tracer.start_span("outer") as outer:
+        with tracer.start_span("inner") as inner:
+            header = inner.traceparent()
+
+    assert parse_traceparent(header) == (outer.trace_id, inner.span_id, True)
+    with tracer.start_span("remote", remote_parent=parse_traceparent(header)) as remote:
+        assert (remote.trace_id, remote.parent_id) == (outer.trace_id, inner.span_id)
+
+
+@pytest.mark.parametrize("header", [
+    "",
+    "garbage",
+    f"01-{TRACE_ID}-{PARENT_ID}-01",
+    f"00-{TRACE_ID.upper()}-{PARENT_ID}-01",
+    f"00-{'0' * 32}-{PARENT_ID}-01",
+    f"00-{TRACE_ID}-{'0' * 16}-01",
+])
+def test_parse_traceparent_rejects_invalid(header):
+    assert parse_traceparent(header) is None
+
+
+def test_unsampled_remote_parent_is_not_exported():
+    exporter = InMemorySpanExporter()
+    tracer = Tracer(exporter, 1.0)
+    with tracer.start_span("root", remote_parent=(TRACE_ID, PARENT_ID, False)):
+        with tracer.start_span("child") as child:
+            pass
+
+    assert child.trace_id == TRACE_ID
+    assert not exporter.spans
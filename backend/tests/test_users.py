@@ -0,0 +1,229 @@
+import base64
+import json
+import threading
+import uuid
+
+import anyio
+import pytest
+from sqlalchemy import func, select
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.database import session_scope
+from app.db.models import User
+from app.users.cache import UserCache, user_cache
+from app.users.schemas import UserCreate
+from app.users import service
+from app.users.service import encode_cursor, get_user_by_email, upsert_user
+from tests.conftest import API, UnavailableStore
+
+pytestmark = pytest.mark.anyio
+
+USERS_PATH = f"{API}/users/users"
+ME_PATH = f"{USERS_PATH}/me"
+
+
+@pytest.fixture
+async def admin_headers(create_user, monkeypatch):
+    admin, token = await create_user()
+    monkeypatch.setattr(settings, "USERS_DIRECTORY_ADMIN_IDS", str(admin.id))
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _all_pages(client, headers, **params) -> list[list[dict]]:
+    pages, cursor = [], None
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        response = await client.get(USERS_PATH, params=query, headers=headers)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        pages.append(body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def _cursor(parts) -> str:
+    return base64.urlsafe_b64encode(json.dumps(parts).encode()).decode().rstrip("=")
+
+
+# --- First-login upsert ---
+
+async def _upsert(email: str, full_name: str | None) -> User:
+    async with session_scope() as db:
+        return await upsert_user(db, UserCreate(email=email, full_name=full_name))
+
+
+async def _rows_for(email: str) -> int:
+    async with session_scope() as db:
+        return (await db.execute(select(func.count()).where(User.email == email))).scalar_one()
+
+
+async def test_concurrent_first_logins_create_one_user(client):
+    email = f"first-{uuid.uuid4().hex[:12]}@example.com"
+    users = []
+
+    async def login():
+        users.append(await _upsert(email, "First Login"))
+
+    async with anyio.create_task_group() as tg:
+        for _ in range(8):
+            tg.start_soon(login)
+
+    assert len({user.id for user in users}) == 1
+    assert await _rows_for(email) == 1
+
+
+async def test_upsert_keeps_name_when_none_is_reported(client):
+    email = f"name-{uuid.uuid4().hex[:12]}@example.com"
+    created = await _upsert(email, "Ada Lovelace")
+
+    unnamed = await _upsert(email, None)
+    renamed = await _upsert(email, "Ada King")
+
+    assert unnamed.id == renamed.id == created.id
+    assert unnamed.full_name == "Ada Lovelace"
+    assert renamed.full_name == "Ada King"
+
+
+
+async def test_user_service_on_either_database_layer(database_async, monkeypatch):
+    email = f"layer-{uuid.uuid4().hex[:12]}@example.com"
+    sync_threads = []
+    upsert_sync = service.upsert_user_sync
+
+    def recording_upsert_sync(db, user):
+        sync_threads.append(threading.get_ident())
+        return upsert_sync(db, user)
+
+    monkeypatch.setattr(service, "upsert_user_sync", recording_upsert_sync)
+
+    created = await _upsert(email, "Layered")
+    async with session_scope() as db:
+        found = await get_user_by_email(db, email)
+
+    assert found.id == created.id
+    if database_async:
+        assert not sync_threads
+    else:
+        # The sync implementation runs in the threadpool, never on the loop
+        assert sync_threads and threading.get_ident() not in sync_threads
+
+# --- Directory paging ---
+
+async def test_pages_by_email_are_stable(client, create_user, admin_headers):
+    prefix = f"page-{uuid.uuid4().hex[:8]}-"
+    emails = [f"{prefix}{letter}@example.com" for letter in "gbfcaed"]
+    for email in emails:
+        await create_user(email)
+
+    first = await client.get(USERS_PATH, params={"email_prefix": prefix, "limit": 3}, headers=admin_headers)
+    # A row sorting before the cursor appears mid-walk: later pages neither
+    # repeat nor skip anything
+    await create_user(f"{prefix}0@example.com")
+    rest = await _all_pages(
+        client, admin_headers, email_prefix=prefix, limit=3, cursor=first.json()["next_cursor"],
+    )
+
+    pages = [first.json()["items"], *rest]
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [user["email"] for page in pages for user in page] == sorted(emails)
+
+
+async def test_pages_by_name_prefix(client, create_user, admin_headers):
+    prefix = f"Page {uuid.uuid4().hex[:8]} "
+    names = [f"{prefix}Bravo", f"{prefix}Alpha", f"{prefix}Alpha", f"{prefix}Charlie", f"{prefix}Alpha"]
+    users = [(await create_user(full_name=name))[0] for name in names]
+    await create_user(full_name=f"Other {prefix}Alpha")
+
+    pages = await _all_pages(client, admin_headers, name_prefix=prefix, limit=2)
+
+    listed = [(user["full_name"], user["id"]) for page in pages for user in page]
+    # Equal names are ordered by id, across page boundaries too
+    assert listed == sorted((user.full_name, str(user.id)) for user in users)
+    assert [len(page) for page in pages] == [2, 2, 1]
+
+
+
+@pytest.mark.parametrize("last", ["\ud7ff", "\U0010ffff"])
+async def test_name_prefix_ending_at_an_edge_code_point(client, create_user, admin_headers, last):
+    stem = f"Edge {uuid.uuid4().hex[:8]} "
+    prefix = stem + last
+    matching = [prefix, f"{prefix}Alpha", f"{prefix}{last}"]
+    for name in matching:
+        await create_user(full_name=name)
+    # Either side of the surrogate block, and past the stem itself
+    for name in (f"{stem}\ud7fe", f"{stem}\ue000", f"{stem[:-1]}!"):
+        await create_user(full_name=name)
+
+    pages = await _all_pages(client, admin_headers, name_prefix=prefix)
+
+    assert [user["full_name"] for page in pages for user in page] == sorted(matching)
+
+
+async def test_name_prefix_without_upper_bound(client, create_user, admin_headers):
+    prefix = "\U0010ffff" * 2
+    name = f"{prefix}{uuid.uuid4().hex[:8]}"
+    await create_user(full_name=name)
+    await create_user(full_name="\U0010ffff" + uuid.uuid4().hex[:8])
+
+    pages = await _all_pages(client, admin_headers, name_prefix=prefix)
+
+    assert name in [user["full_name"] for page in pages for user in page]
+    assert all(user["full_name"].startswith(prefix) for page in pages for user in page)
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor!",
+    _cursor(["email", "a", 5]),
+    _cursor({"email": 1, "value": 2, "id": 3}),
+    _cursor(["email", "a"]),
+    _cursor(["id", "a", str(uuid.uuid4())]),
+    _cursor(["email", "a", "not-a-uuid"]),
+    _cursor(["email", "a\x00", str(uuid.uuid4())]),
+])
+async def test_bad_cursor_is_rejected(client, admin_headers, cursor):
+    response = await client.get(USERS_PATH, params={"cursor": cursor}, headers=admin_headers)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+async def test_cursor_from_other_filters_is_rejected(client, admin_headers):
+    cursor = encode_cursor("full_name", "Alpha", uuid.uuid4())
+
+    response = await client.get(USERS_PATH, params={"cursor": cursor, "email_prefix": "a"}, headers=admin_headers)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cursor does not match the filters"
+
+
+async def test_directory_requires_admin(client, create_user):
+    _, token = await create_user()
+
+    response = await client.get(USERS_PATH, headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 403
+
+
+# --- User cache ---
+
+async def test_cache_survives_unavailable_shared_tier():
+    cache = UserCache(TTLCache(maxsize=10, ttl=60), UnavailableStore(), shared_ttl=60)
+    user_id = uuid.uuid4()
+
+    assert await cache.get_by_id(user_id) is None
+    await cache.set(user_id, "a@example.com", '{"cached": true}')
+    assert await cache.get_by_email("a@example.com") == '{"cached": true}'
+    await cache.invalidate(user_id, "a@example.com")
+    assert await cache.get_by_id(user_id) is None
+
+
+async def test_profile_served_when_shared_tier_is_down(client, create_user, monkeypatch):
+    monkeypatch.setattr(user_cache, "shared", UnavailableStore())
+    user, token = await create_user()
+    user_cache.local.clear()
+
+    response = await client.get(ME_PATH, headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert response.json()["email"] == user.email